@@ -0,0 +1,142 @@
+import collections                                                  as _collections
+import os                                                           as _os
+import shutil                                                       as _shutil
+import subprocess
+
+
+BenchmarkRepoInfo                                                   = _collections.namedtuple("BenchmarkRepoInfo", ["name"])
+
+
+class BenchmarkRepoBundle():
+
+    '''
+    Stand-in for a Conway :class:`RepoBundle`, for the synthetic repos created by a :class:`BareRepoBundleFixture`.
+
+    :param list[str] repo_names: names of the repos in the bundle.
+    '''
+    def __init__(self, repo_names):
+        self.repo_names                                 = repo_names
+
+    def bundled_repos(self):
+        '''
+        :return: the repos comprising this bundle.
+        :rtype: list[BenchmarkRepoInfo]
+        '''
+        return [BenchmarkRepoInfo(name) for name in self.repo_names]
+
+
+class BareRepoBundleFixture():
+
+    '''
+    Generates a bundle of synthetic bare GIT repos in the local file system, to act as the "remote" for benchmarks.
+
+    Each repo gets an initial commit with ``nb_files`` files, followed by ``nb_commits`` commits to the master branch
+    that each change a few files. The integration and operate branches point to the last commit, and
+    ``nb_branches`` additional feature branches (named "story_<n>") each add one commit on top of some earlier commit.
+
+    Commits are generated with ``git fast-import``, so that creating hundreds of repos with thousands of commits
+    takes seconds rather than minutes.
+
+    Each bare repo is created in ``<root_folder>/remote/<repo_name>.git``, with a symbolic link
+    ``<root_folder>/remote/<repo_name>`` to it, so that it can be found both as a GIT remote URL and as a folder.
+
+    :param str root_folder: folder under which the fixture is created. Anything already in it is removed.
+    :param int nb_repos: number of repos to generate.
+    :param int nb_commits: number of commits in each repo's master branch, after the initial commit.
+    :param int nb_files: number of files in each repo.
+    :param int nb_branches: number of feature branches in each repo.
+    :param int files_per_commit: number of files changed by each commit.
+    '''
+    def __init__(self, root_folder, nb_repos, nb_commits=50, nb_files=100, nb_branches=5, files_per_commit=3):
+        self.root_folder                                = root_folder
+        self.nb_repos                                   = nb_repos
+        self.nb_commits                                 = nb_commits
+        self.nb_files                                   = nb_files
+        self.nb_branches                                = nb_branches
+        self.files_per_commit                           = files_per_commit
+
+        self.remote_root                                = root_folder + "/remote"
+        self.local_root                                 = root_folder + "/local"
+        self.repo_names                                 = [f"bench_repo_{idx:04d}" for idx in range(nb_repos)]
+
+    BRANCHES_TO_CREATE                                  = ["integration", "operate"]
+
+    def create(self):
+        '''
+        Creates all the bare repos of the fixture.
+
+        :return: the bundle with the names of the repos created
+        :rtype: BenchmarkRepoBundle
+        '''
+        if _os.path.exists(self.root_folder):
+            _shutil.rmtree(self.root_folder)
+        _os.makedirs(self.remote_root)
+        _os.makedirs(self.local_root)
+
+        # All repos have the same content, so build the fast-import stream only once
+        stream                                          = self._fast_import_stream()
+
+        for repo_name in self.repo_names:
+            repo_path                                   = f"{self.remote_root}/{repo_name}.git"
+            subprocess.run(["git", "init", "--quiet", "--bare", "--initial-branch=master", repo_path], check=True)
+            subprocess.run(["git", "fast-import", "--quiet"], cwd=repo_path, input=stream, check=True)
+            _os.symlink(repo_path, f"{self.remote_root}/{repo_name}")
+
+        return BenchmarkRepoBundle(self.repo_names)
+
+    def parameters(self):
+        '''
+        :return: the parameters of this fixture, to be recorded with benchmark results
+        :rtype: dict
+        '''
+        return {"nb_repos":             self.nb_repos,
+                "nb_commits":           self.nb_commits,
+                "nb_files":             self.nb_files,
+                "nb_branches":          self.nb_branches,
+                "files_per_commit":     self.files_per_commit}
+
+    def _fast_import_stream(self):
+        '''
+        :return: the input for ``git fast-import`` that creates the content of each repo.
+        :rtype: bytes
+        '''
+        chunks_l                                        = []
+        timestamp                                       = 1700000000 # Fixed, so that all repos get the same hashes
+
+        def _data(content):
+            encoded                                     = content.encode()
+            chunks_l.append(b"data %d\n" % len(encoded) + encoded + b"\n")
+
+        def _commit(ref, mark, parent_mark, message, files_l):
+            chunks_l.append(f"commit {ref}\nmark :{mark}\n".encode())
+            chunks_l.append(f"committer Bench Robot <bench@example.com> {timestamp + mark} +0000\n".encode())
+            _data(message)
+            if not parent_mark is None:
+                chunks_l.append(f"from :{parent_mark}\n".encode())
+            for path, content in files_l:
+                chunks_l.append(f"M 644 inline {path}\n".encode())
+                _data(content)
+
+        def _path(file_idx):
+            return f"src/module_{file_idx % 10}/file_{file_idx:05d}.txt"
+
+        _commit("refs/heads/master", 1, None, "Initial commit",
+                [(_path(idx), f"file {idx}, version 0\n") for idx in range(self.nb_files)])
+
+        for mark in range(2, self.nb_commits + 2):
+            files_l                                     = [(_path((mark * self.files_per_commit + idx) % self.nb_files),
+                                                            f"version {mark}\n")
+                                                            for idx in range(self.files_per_commit)]
+            _commit("refs/heads/master", mark, mark - 1, f"Change number {mark - 1}", files_l)
+
+        last_mark                                       = self.nb_commits + 1
+        for branch in self.BRANCHES_TO_CREATE:
+            chunks_l.append(f"reset refs/heads/{branch}\nfrom :{last_mark}\n\n".encode())
+
+        for idx in range(self.nb_branches):
+            mark                                        = last_mark + idx + 1
+            parent_mark                                 = 1 + (idx * self.nb_commits) // max(self.nb_branches, 1)
+            _commit(f"refs/heads/story_{idx}", mark, parent_mark, f"Work on story {idx}",
+                    [(f"stories/story_{idx}.txt", f"story {idx}\n")])
+
+        return b"".join(chunks_l)
@@ -0,0 +1,301 @@
+import argparse
+import datetime                                                     as _datetime
+import json
+import os                                                           as _os
+import platform                                                     as _platform
+import statistics                                                   as _statistics
+import subprocess
+import sys
+import time
+
+from limon_ops.benchmarks.bare_repo_fixtures                        import BareRepoBundleFixture, BenchmarkRepoBundle
+from limon_ops.benchmarks.fake_github_api                           import FakeGitHubAPI
+
+
+class BenchmarkProfile():
+
+    '''
+    Stand-in for a Conway :class:`UserProfile`, exposing the same properties that :class:`RepoSetup` reads, but with
+    values pointing to a :class:`BareRepoBundleFixture` instead of values parsed from a ``profile.toml`` file.
+
+    :param BareRepoBundleFixture fixture: the fixture whose repos are to be set up.
+    :param str project: name of the project under which the fixture's repos are set up.
+    '''
+    def __init__(self, fixture, project):
+        self.fixture                                    = fixture
+        self.project                                    = project
+
+        self.USER                                       = "bench-robot"
+        self.USER_EMAIL                                 = "bench@example.com"
+        self.BC_PATH                                    = "/mnt/c/Program Files/Beyond Compare 4/BCompare.exe"
+        self.WIN_CRED_PATH                              = None
+        self.GH_ORGANIZATION                            = "bench-org"
+        self.REMOTE_ROOT                                = fixture.remote_root
+
+    def REPO_LIST(self, project):
+        return list(self.fixture.repo_names)
+
+    def BRANCHES_TO_CREATE(self, operate):
+        return list(BareRepoBundleFixture.BRANCHES_TO_CREATE)
+
+    def LOCAL_ROOT(self, operate, root_folder):
+        return self.fixture.local_root if root_folder is None else root_folder
+
+    def OK_TO_DISPLAY_TOKEN(self):
+        return False
+
+
+class BenchmarkRunner():
+
+    '''
+    Times limon's main operations against bundles of synthetic repos of increasing size, and produces JSON results
+    that can be compared across commits.
+
+    For each bundle size, a fresh :class:`BareRepoBundleFixture` is created as the "remote", a :class:`FakeGitHubAPI`
+    is started as a stand-in for GitHub, and then these are timed, in this order (since the workflows build on each
+    other's effects):
+
+    * ``RepoSetup.setup``
+    * ``RepoAdministration.repo_stats`` and ``RepoAdministration.create_repo_report``
+    * each ``BranchLifecycleManager`` workflow, for a feature branch created by the benchmark
+
+    A failing operation is recorded with its error and does not stop the rest of the benchmark.
+
+    :param str work_folder: folder under which fixtures and reports are created. Its content is overwritten.
+    :param list[int] sizes: the bundle sizes (number of repos) to benchmark.
+    :param dict fixture_kwargs: optional parameters for the :class:`BareRepoBundleFixture` (like ``nb_commits``).
+    :param float api_latency_s: simulated latency of each GitHub API call, in seconds.
+    :param int repeat: number of times that read-only operations are timed, for each bundle size.
+    '''
+    def __init__(self, work_folder, sizes, fixture_kwargs=None, api_latency_s=0.0, repeat=3):
+        self.work_folder                                = _os.path.abspath(work_folder)
+        self.sizes                                      = sizes
+        self.fixture_kwargs                             = {} if fixture_kwargs is None else fixture_kwargs
+        self.api_latency_s                              = api_latency_s
+        self.repeat                                     = repeat
+
+    PROJECT                                             = "bench"
+    FEATURE_BRANCH                                      = "story_bench"
+    SCHEMA_VERSION                                      = 1
+
+    def run(self):
+        '''
+        Runs the benchmark for all bundle sizes.
+
+        :return: the benchmark results, including enough information about the environment and the code
+            benchmarked to compare results across commits.
+        :rtype: dict
+        '''
+        from scratch_nb_apps                                        import ensure_application
+
+        # Branch workflows need a running application
+        ensure_application()
+
+        started_at                                      = _datetime.datetime.now(_datetime.timezone.utc).isoformat()
+        results_l                                       = []
+        for nb_repos in self.sizes:
+            results_l.extend(self._run_size(nb_repos))
+
+        return {"schema_version":       self.SCHEMA_VERSION,
+                "started_at":           started_at,
+                "code":                 self._code_version(),
+                "environment":          {"python":          _platform.python_version(),
+                                         "platform":        _platform.platform(),
+                                         "git":             self._git_version()},
+                "parameters":           {"sizes":           self.sizes,
+                                         "fixture":         self.fixture_kwargs,
+                                         "api_latency_s":   self.api_latency_s,
+                                         "repeat":          self.repeat},
+                "results":              results_l}
+
+    def _run_size(self, nb_repos):
+        from limon_ops.onboarding.repo_setup                        import RepoSetup
+        from limon_ops.repo_admin.branch_lifecycle_manager          import BranchLifecycleManager
+
+        class BenchmarkRepoSetup(RepoSetup):
+            def __init__(self, profile):
+                self.profile_path                       = None
+                self.profile                            = profile
+
+        fixture                                         = BareRepoBundleFixture(f"{self.work_folder}/{nb_repos}_repos",
+                                                                                nb_repos, **self.fixture_kwargs)
+        results_l                                       = []
+
+        def _time(operation, fn, repeat=1, expect_api_calls=False):
+            result                                      = self._time(operation, nb_repos, fn, repeat, api)
+            if expect_api_calls and result["ok"] and result["api_calls"] == 0:
+                # The operation silently took a path that doesn't call GitHub, so its timing is not what it claims
+                result["ok"]                            = False
+                result["error"]                         = "ValueError: made no GitHub API calls"
+            results_l.append(result)
+            print(f"{nb_repos:>5} repos | {operation:<45} | "
+                  + (f"{result['median_s']:9.3f} s" if result["ok"] else f"FAILED: {result['error'][:80]}"),
+                  file=sys.stderr)
+
+        api                                             = None
+        _time("fixture.create", lambda: fixture.create())
+        bundle                                          = BenchmarkRepoBundle(fixture.repo_names)
+
+        previous_api_url                                = _os.environ.get("LIMON_GITHUB_API_URL")
+        with FakeGitHubAPI(fixture.remote_root, latency_s=self.api_latency_s) as api:
+            _os.environ["LIMON_GITHUB_API_URL"]         = api.url
+            try:
+                profile                                 = BenchmarkProfile(fixture, self.PROJECT)
+                setup                                   = BenchmarkRepoSetup(profile)
+                _time("RepoSetup.setup",                lambda: setup.setup(self.PROJECT))
+
+                # With an organization and a token, the manager takes its GitHub paths (like the batched pull
+                # requests of PullRequestService), which then call the stand-in. The remote itself is local, so
+                # no user is given, and the token is never handed to GIT
+                manager                                 = BranchLifecycleManager(
+                                                                local_root              = f"{fixture.local_root}/{self.PROJECT}",
+                                                                remote_root             = fixture.remote_root,
+                                                                repo_bundle             = bundle,
+                                                                remote_gh_user          = None,
+                                                                remote_gh_organization  = profile.GH_ORGANIZATION,
+                                                                gh_secrets_path         = self._secrets_file(fixture))
+
+                REPORTS_FOLDER                          = f"{fixture.root_folder}/reports"
+                FEATURE                                 = self.FEATURE_BRANCH
+                INTEGRATION                             = BareRepoBundleFixture.BRANCHES_TO_CREATE[0]
+
+                _time("RepoAdministration.repo_stats",  lambda: manager.repo_stats(), repeat=self.repeat)
+                _time("RepoAdministration.create_repo_report",
+                                                        lambda: manager.create_repo_report(REPORTS_FOLDER),
+                                                        repeat=self.repeat)
+                _time("BranchLifecycleManager.work_on_feature (new branch)",
+                                                        lambda: manager.work_on_feature(FEATURE))
+                self._change_working_trees(manager, fixture)
+                _time("BranchLifecycleManager.commit_feature",
+                                                        lambda: manager.commit_feature(FEATURE, "Benchmark change"))
+                _time("BranchLifecycleManager.complete_feature",
+                                                        lambda: manager.complete_feature(FEATURE))
+                _time("BranchLifecycleManager.refresh_from_integration",
+                                                        lambda: manager.refresh_from_integration(FEATURE))
+                _time("BranchLifecycleManager.refresh_from_remote",
+                                                        lambda: manager.refresh_from_remote(FEATURE))
+                _time("BranchLifecycleManager.work_on_feature (existing branch)",
+                                                        lambda: manager.work_on_feature(INTEGRATION))
+                _time("BranchLifecycleManager.remove_feature_branch",
+                                                        lambda: manager.remove_feature_branch(FEATURE))
+                _time("BranchLifecycleManager.pull_request_integration_to_master",
+                                                        lambda: manager.pull_request_integration_to_master(),
+                                                        expect_api_calls=True)
+                _time("BranchLifecycleManager.publish_release",
+                                                        lambda: manager.publish_release())
+                _time("BranchLifecycleManager.publish_hot_fix",
+                                                        lambda: manager.publish_hot_fix())
+            finally:
+                if previous_api_url is None:
+                    _os.environ.pop("LIMON_GITHUB_API_URL", None)
+                else:
+                    _os.environ["LIMON_GITHUB_API_URL"] = previous_api_url
+
+        return results_l
+
+    def _time(self, operation, nb_repos, fn, repeat, api):
+        '''
+        Times ``fn``, ``repeat`` times.
+
+        :return: the timings, together with whether ``fn`` succeeded and how many GitHub API calls it made.
+        :rtype: dict
+        '''
+        runs_l                                          = []
+        api_calls_before                                = 0 if api is None else api.total_calls()
+        error                                           = None
+        for _ in range(repeat):
+            start                                       = time.perf_counter()
+            try:
+                fn()
+            except Exception as ex:
+                error                                   = f"{type(ex).__name__}: {ex}"
+                break
+            runs_l.append(time.perf_counter() - start)
+
+        api_calls                                       = 0 if api is None else api.total_calls() - api_calls_before
+        return {"operation":            operation,
+                "nb_repos":             nb_repos,
+                "ok":                   error is None,
+                "error":                error,
+                "runs_s":               runs_l,
+                "min_s":                min(runs_l) if len(runs_l) > 0 else None,
+                "median_s":             _statistics.median(runs_l) if len(runs_l) > 0 else None,
+                "api_calls":            api_calls}
+
+    # Token given to the benchmarked manager. Only the GitHub stand-in ever sees it
+    TOKEN                                               = "bench-token"
+
+    def _secrets_file(self, fixture):
+        '''
+        :return: path of a secrets file, in the format read by :class:`RepoAdministration`, with :attr:`TOKEN`
+        :rtype: str
+        '''
+        path                                            = f"{fixture.root_folder}/bench_secrets.yaml"
+        with open(path, "w") as file:
+            file.write(f"secrets:\n  github_token: {self.TOKEN}\n")
+        return path
+
+    def _change_working_trees(self, manager, fixture):
+        '''
+        Modifies a file in each local repo, so that there is work to commit.
+        '''
+        for repo_name in manager.repo_names():
+            with open(f"{manager.local_root}/{repo_name}/BENCHMARK.txt", "a") as file:
+                file.write(f"Benchmark change at {time.time()}\n")
+
+    def _code_version(self):
+        '''
+        :return: the commit of the code being benchmarked, and whether there were uncommitted changes to it
+        :rtype: dict
+        '''
+        here                                            = _os.path.dirname(_os.path.abspath(__file__))
+        try:
+            commit                                      = subprocess.run(["git", "rev-parse", "HEAD"], cwd=here,
+                                                                         capture_output=True, text=True,
+                                                                         check=True).stdout.strip()
+            status                                      = subprocess.run(["git", "status", "--porcelain", "--", "."],
+                                                                         cwd=here, capture_output=True, text=True,
+                                                                         check=True).stdout
+            return {"commit": commit, "dirty": status.strip() != ""}
+        except (OSError, subprocess.CalledProcessError):
+            return {"commit": None, "dirty": None}
+
+    def _git_version(self):
+        return subprocess.run(["git", "--version"], capture_output=True, text=True).stdout.strip()
+
+
+def main(argv=None):
+    parser                                              = argparse.ArgumentParser(
+                                                            description = "Times limon operations against synthetic "
+                                                                          + "bundles of local bare repos")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 50, 200],
+                        help="bundle sizes (number of repos) to benchmark")
+    parser.add_argument("--nb-commits", type=int, default=50, help="commits per repo")
+    parser.add_argument("--nb-files", type=int, default=100, help="files per repo")
+    parser.add_argument("--nb-branches", type=int, default=5, help="feature branches per repo")
+    parser.add_argument("--api-latency-ms", type=float, default=0, help="simulated latency of GitHub API calls")
+    parser.add_argument("--repeat", type=int, default=3, help="times to repeat read-only operations")
+    parser.add_argument("--work-folder", default="/tmp/limon_bench", help="folder for fixtures and reports")
+    parser.add_argument("--output", default=None, help="file to write JSON results to. Defaults to stdout")
+    args                                                = parser.parse_args(argv)
+
+    runner                                              = BenchmarkRunner(
+                                                            work_folder     = args.work_folder,
+                                                            sizes           = args.sizes,
+                                                            fixture_kwargs  = {"nb_commits":    args.nb_commits,
+                                                                               "nb_files":      args.nb_files,
+                                                                               "nb_branches":   args.nb_branches},
+                                                            api_latency_s   = args.api_latency_ms / 1000,
+                                                            repeat          = args.repeat)
+    results                                             = json.dumps(runner.run(), indent=4)
+
+    if args.output is None:
+        print(results)
+    else:
+        with open(args.output, "w") as file:
+            file.write(results)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,195 @@
+import collections                                                  as _collections
+import json
+import re                                                           as _re
+import subprocess
+import threading                                                    as _threading
+import time
+
+from http.server                                                    import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse                                                   import urlsplit
+
+
+class FakeGitHubAPI():
+
+    '''
+    Local HTTP stand-in for the subset of the GitHub REST API used by limon, so that benchmarks can exercise the
+    code paths that call GitHub without network access, credentials or rate limits.
+
+    Repos are backed by the bare repos of a :class:`BareRepoBundleFixture`, so that responses about branches and
+    commit comparisons reflect the actual content of the "remote" repos. Pull requests are kept in memory.
+
+    It is used as a context manager, which starts the server in a background thread on a free local port::
+
+        with FakeGitHubAPI(fixture.remote_root) as api:
+            async with GitHub_Client("my-org", api_url=api.url) as client:
+                ...
+
+    :param str remote_root: folder containing the bare repos, named "<repo_name>.git"
+    :param float latency_s: optional delay, in seconds, added to every response to mimic network round trips.
+    '''
+    def __init__(self, remote_root, latency_s=0.0):
+        self.remote_root                                = remote_root
+        self.latency_s                                  = latency_s
+        self.url                                        = None # Set when the server is started
+
+        self.call_counts                                = _collections.Counter()
+        self.pull_requests                              = _collections.defaultdict(list)
+        self._lock                                      = _threading.Lock()
+        self._server                                    = None
+        self._thread                                    = None
+
+    def __enter__(self):
+        api                                             = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                api._handle(self, "GET")
+
+            def do_POST(self):
+                api._handle(self, "POST")
+
+            def do_PUT(self):
+                api._handle(self, "PUT")
+
+            def do_DELETE(self):
+                api._handle(self, "DELETE")
+
+            def log_message(self, format, *args):
+                pass # Keep benchmark output clean
+
+        self._server                                    = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self._server.daemon_threads                     = True
+        self.url                                        = f"http://127.0.0.1:{self._server.server_address[1]}"
+        self._thread                                    = _threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    def total_calls(self):
+        '''
+        :return: number of API calls served so far
+        :rtype: int
+        '''
+        return sum(self.call_counts.values())
+
+    def _handle(self, request, method):
+        if self.latency_s > 0:
+            time.sleep(self.latency_s)
+
+        path                                            = urlsplit(request.path).path
+        length                                          = int(request.headers.get("Content-Length", 0))
+        body                                            = json.loads(request.rfile.read(length)) if length > 0 else None
+
+        try:
+            route, status, payload                      = self._route(method, path, body)
+        except Exception as ex:
+            route, status, payload                      = "error", 500, {"message": str(ex)}
+
+        with self._lock:
+            self.call_counts[f"{method} {route}"]       += 1
+
+        encoded                                         = json.dumps(payload).encode()
+        request.send_response(status)
+        request.send_header("Content-Type", "application/json")
+        request.send_header("Content-Length", str(len(encoded)))
+        request.send_header("X-RateLimit-Remaining", "5000")
+        request.end_headers()
+        request.wfile.write(encoded)
+
+    def _route(self, method, path, body):
+        '''
+        :return: a tuple with the name of the route that matched, the HTTP status and the JSON payload to respond with
+        '''
+        if path in ["", "/"]:
+            return "meta", 200, {"current_user_url": f"{self.url}/user"}
+        if path == "/rate_limit":
+            return "rate_limit", 200, {"resources": {"core": {"limit": 5000, "remaining": 5000, "reset": 0}}}
+        if path == "/graphql" and method == "POST":
+            return "graphql", 200, self._graphql(body.get("variables", {}))
+
+        match                                           = _re.match(r"^/repos/(?P<owner>[^/]+)/(?P<repo>[^/]+)(?P<rest>/.*)?$",
+                                                                    path)
+        if match is None:
+            return "unknown", 404, {"message": "Not Found"}
+
+        repo                                            = match.group("repo")
+        rest                                            = match.group("rest") or ""
+
+        if rest == "/branches" and method == "GET":
+            return "branches", 200, [{"name": name, "commit": {"sha": sha}}
+                                        for name, sha in self._branches(repo).items()]
+
+        compare_match                                   = _re.match(r"^/compare/(?P<base>[^.]+)\.\.\.(?P<head>.+)$", rest)
+        if not compare_match is None and method == "GET":
+            base, head                                  = compare_match.group("base"), compare_match.group("head")
+            behind_by, ahead_by                         = self._rev_list_counts(repo, base, head)
+            status                                      = "identical" if ahead_by == behind_by == 0 \
+                                                                else "ahead" if behind_by == 0 \
+                                                                else "behind" if ahead_by == 0 \
+                                                                else "diverged"
+            return "compare", 200, {"status": status, "ahead_by": ahead_by, "behind_by": behind_by}
+
+        if rest == "/pulls" and method == "GET":
+            return "pulls", 200, [pr for pr in self.pull_requests[repo] if pr["state"] == "open"]
+
+        if rest == "/pulls" and method == "POST":
+            with self._lock:
+                number                                  = len(self.pull_requests[repo]) + 1
+                pr                                      = {"number":    number,
+                                                           "state":     "open",
+                                                           "title":     body.get("title"),
+                                                           "body":      body.get("body"),
+                                                           "head":      {"ref": body.get("head")},
+                                                           "base":      {"ref": body.get("base")},
+                                                           "html_url":  f"{self.url}/{repo}/pull/{number}"}
+                self.pull_requests[repo].append(pr)
+            return "create_pull", 201, pr
+
+        return "unknown", 404, {"message": "Not Found"}
+
+    def _graphql(self, variables):
+        '''
+        Answers the queries made by :class:`PullRequestService`. Rather than parsing GraphQL, it relies on the
+        query's variables: for each "repo<N>", the variables "base<N>" and "head<N>" name the branches to compare,
+        and the answer goes under the alias "q<N>".
+        '''
+        data                                            = {}
+        for name, repo in variables.items():
+            match                                       = _re.match(r"^repo(?P<idx>\d+)$", name)
+            if match is None:
+                continue
+            idx                                         = match.group("idx")
+            base                                        = variables[f"base{idx}"].removeprefix("refs/heads/")
+            head                                        = variables[f"head{idx}"].removeprefix("refs/heads/")
+            behind_by, ahead_by                         = self._rev_list_counts(repo, base, head)
+            open_pr_l                                   = [{"number": pr["number"], "url": pr["html_url"]}
+                                                            for pr in self.pull_requests[repo]
+                                                            if pr["state"] == "open" and pr["base"]["ref"] == base
+                                                                and pr["head"]["ref"] == head]
+            data[f"q{idx}"]                             = {"ref":           {"compare": {"aheadBy":     ahead_by,
+                                                                                         "behindBy":    behind_by}},
+                                                           "pullRequests":  {"nodes": open_pr_l[:1]}}
+        return {"data": data}
+
+    def _git(self, repo, argv):
+        completed                                       = subprocess.run(["git"] + argv,
+                                                                         cwd                = f"{self.remote_root}/{repo}.git",
+                                                                         capture_output     = True,
+                                                                         text               = True,
+                                                                         check              = True)
+        return completed.stdout
+
+    def _branches(self, repo):
+        output                                          = self._git(repo, ["for-each-ref", "--format=%(refname:short) %(objectname)",
+                                                                           "refs/heads"])
+        return dict(line.split(" ") for line in output.splitlines())
+
+    def _rev_list_counts(self, repo, base, head):
+        output                                          = self._git(repo, ["rev-list", "--left-right", "--count",
+                                                                           f"{base}...{head}"])
+        behind_by, ahead_by                             = output.split()
+        return int(behind_by), int(ahead_by)
@@ -0,0 +1,127 @@
+import argparse
+import json
+import subprocess
+import sys
+
+
+class ImportTimeBudget():
+
+    '''
+    Measures the import cost of modules with ``python -X importtime`` in a fresh interpreter, and checks it
+    against a budget.
+
+    The budget has two parts:
+
+    * A time budget for the cumulative import time of each module measured.
+    * A list of heavy modules (pandas, xlsxwriter, httpx, GitPython) that must *not* be imported as a side effect
+      of importing the module measured, since they should only be imported on first use.
+
+    Example, from the command line::
+
+        python -m limon_ops.benchmarks.import_time --budget-ms 500
+
+    :param float budget_ms: maximum cumulative import time, in milliseconds, allowed for each module.
+    :param list[str] forbidden: names of top-level modules that must not be imported eagerly.
+    :param str python: the Python interpreter to measure with. Defaults to the one running this code.
+    '''
+    DEFAULT_MODULES                                     = ["scratch_nb_apps",
+                                                           "limon_ops.cli.limon_cli",
+                                                           "limon_ops.onboarding.repo_setup",
+                                                           "limon_ops.repo_admin.repo_administration",
+                                                           "limon_ops.repo_admin.branch_lifecycle_manager",
+                                                          ]
+
+    DEFAULT_FORBIDDEN                                   = ["pandas", "xlsxwriter", "httpx", "git"]
+
+    def __init__(self, budget_ms=500, forbidden=None, python=None):
+        self.budget_ms                                  = budget_ms
+        self.forbidden                                  = self.DEFAULT_FORBIDDEN if forbidden is None else forbidden
+        self.python                                     = sys.executable if python is None else python
+
+    def measure(self, module_name):
+        '''
+        Imports ``module_name`` in a fresh interpreter with ``-X importtime`` and parses the timings it reports.
+
+        :param str module_name: fully qualified name of the module to measure.
+        :return: a dictionary with the cumulative import time (in milliseconds) of ``module_name``, and with the
+            names of all modules that got imported as a consequence.
+        :rtype: dict
+        '''
+        completed                                       = subprocess.run([self.python, "-X", "importtime",
+                                                                          "-c", f"import {module_name}"],
+                                                                         capture_output     = True,
+                                                                         text               = True)
+        if completed.returncode != 0:
+            raise ValueError(f"Could not import '{module_name}':\n{completed.stderr}")
+
+        # Each line of stderr looks like
+        #
+        #       import time:       412 |       1533 |   limon_ops.util.lazy_import
+        #
+        # where the numbers are the self and cumulative times in microseconds, and the module name is indented
+        # to show its nesting under the module that imported it.
+        #
+        imported_l                                      = []
+        cumulative_us                                   = 0
+        for line in completed.stderr.splitlines():
+            if not line.startswith("import time:"):
+                continue
+            fields                                      = line[len("import time:"):].split("|")
+            if len(fields) != 3 or not fields[1].strip().isdigit():
+                continue # This is the header line
+            name                                        = fields[2].strip()
+            imported_l.append(name)
+            if name == module_name:
+                cumulative_us                           = int(fields[1])
+
+        return {"module":           module_name,
+                "cumulative_ms":    cumulative_us / 1000,
+                "imported":         imported_l}
+
+    def check(self, module_name):
+        '''
+        Measures ``module_name`` and checks it against this budget.
+
+        :param str module_name: fully qualified name of the module to check.
+        :return: the measurement, enriched with the list of budget violations (empty if the budget was met).
+        :rtype: dict
+        '''
+        result                                          = self.measure(module_name)
+        violations_l                                    = []
+
+        if result["cumulative_ms"] > self.budget_ms:
+            violations_l.append(f"took {result['cumulative_ms']:.1f} ms to import, over the budget of "
+                                + f"{self.budget_ms} ms")
+
+        eager_l                                         = sorted({name.split(".")[0] for name in result["imported"]
+                                                                    if name.split(".")[0] in self.forbidden})
+        if len(eager_l) > 0:
+            violations_l.append(f"eagerly imported {eager_l}")
+
+        result["violations"]                            = violations_l
+        # The full list of imported modules is long, so only keep how many there were
+        result["imported"]                              = len(result["imported"])
+        return result
+
+
+def main(argv=None):
+    parser                                              = argparse.ArgumentParser(
+                                                            description = "Checks import time of limon_ops modules "
+                                                                          + "against a budget")
+    parser.add_argument("modules", nargs="*", default=ImportTimeBudget.DEFAULT_MODULES,
+                        help="modules to measure")
+    parser.add_argument("--budget-ms", type=float, default=500,
+                        help="maximum cumulative import time for each module, in milliseconds")
+    args                                                = parser.parse_args(argv)
+
+    budget                                              = ImportTimeBudget(budget_ms=args.budget_ms)
+    results_l                                           = [budget.check(module) for module in args.modules]
+
+    print(json.dumps(results_l, indent=4))
+
+    failed                                              = any(len(r["violations"]) > 0 for r in results_l)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
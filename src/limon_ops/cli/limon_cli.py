@@ -0,0 +1,300 @@
+import argparse
+import os                                                           as _os
+import re                                                           as _re
+import sys
+
+
+DEFAULT_BUNDLE                                                      = "scratch_ops.onboarding.scratch_repo_bundle:ScratchRepoBundle"
+
+# Arguments that name files or folders. They are made absolute before a command is run, since a daemon serving the
+# command does not share the caller's current directory
+#
+PATH_ARGUMENTS                                                      = ["sdlc_root", "root_folder", "repo_path", "local_root",
+                                                                       "remote_root", "gh_secrets_path",
+                                                                       "publications_folder"]
+
+
+def _setup(context, args):
+    return context.repo_setup(args.sdlc_root, args.profile).setup(project          = args.project,
+                                                                  filter           = args.filter,
+                                                                  operate          = args.operate,
+                                                                  root_folder      = args.root_folder,
+                                                                  journaled        = args.journaled)
+
+def _configure(context, args):
+    import asyncio
+
+    return asyncio.run(context.repo_setup(args.sdlc_root, args.profile).configure(args.repo_path))
+
+def _manager(context, args):
+    return context.manager(local_root              = args.local_root,
+                           remote_root             = args.remote_root,
+                           bundle                  = args.bundle,
+                           remote_gh_user          = args.gh_user,
+                           remote_gh_organization  = args.gh_organization,
+                           gh_secrets_path         = args.gh_secrets_path)
+
+def _branches(context, args):
+    import asyncio
+
+    return asyncio.run(_manager(context, args).branches(args.repo))
+
+def _current_branch(context, args):
+    return _manager(context, args).current_local_branch(args.repo)
+
+def _stats(context, args):
+    return _manager(context, args).repo_stats(repos_in_scope_l = args.repos)
+
+def _report(context, args):
+    return _manager(context, args).create_repo_report(args.publications_folder, repos_in_scope_l = args.repos)
+
+def _maintain(context, args):
+    return _manager(context, args).maintain(repos_in_scope_l = args.repos, force = args.force)
+
+
+# Each CLI command is described by (handler, arguments, help), where arguments are themselves (flags, kwargs) pairs
+# for argparse
+#
+SETUP_COMMANDS                                                      = {
+    "setup":                    (_setup,
+                                 [(["project"],                 {"help": "project whose repos are set up"}),
+                                  (["--filter"],                {"nargs": "*", "help": "only set up these repos"}),
+                                  (["--operate"],               {"action": "store_true",
+                                                                 "help": "set up an operate installation"}),
+                                  (["--root-folder"],           {"help": "overrides the profile's local root"}),
+                                  (["--journaled"],             {"action": "store_true",
+                                                                 "help": "record progress, so a rerun resumes it"})],
+                                 "clone and configure the repos of a project"),
+    "configure":                (_configure,
+                                 [(["repo_path"],               {"help": "local repo to configure"})],
+                                 "configure an existing local repo as per the profile"),
+}
+
+ADMIN_COMMANDS                                                      = {
+    "branches":                 (_branches,
+                                 [(["repo"],                    {"help": "name of the repo"})],
+                                 "list the local branches of a repo"),
+    "current-branch":           (_current_branch,
+                                 [(["repo"],                    {"help": "name of the repo"})],
+                                 "show the branch checked out in a local repo"),
+    "stats":                    (_stats,
+                                 [(["--repos"],                 {"nargs": "*", "help": "only these repos"})],
+                                 "show stats for the repos in the bundle"),
+    "report":                   (_report,
+                                 [(["publications_folder"],     {"help": "root folder for the Excel report"}),
+                                  (["--repos"],                 {"nargs": "*", "help": "only these repos"})],
+                                 "create the Excel repo report"),
+    "maintain":                 (_maintain,
+                                 [(["--repos"],                 {"nargs": "*", "help": "only these repos"}),
+                                  (["--force"],                 {"action": "store_true",
+                                                                 "help": "maintain repos even if not due"})],
+                                 "write commit-graphs and repack the local repos that are due"),
+    "work-on-feature":          (lambda context, args: _manager(context, args).work_on_feature(args.branch),
+                                 [(["branch"],                  {"help": "feature branch"})],
+                                 "switch all repos to a feature branch, creating it if needed"),
+    "commit-feature":           (lambda context, args: _manager(context, args).commit_feature(args.branch, args.message,
+                                                                                              optimized=args.optimized),
+                                 [(["branch"],                  {"help": "feature branch"}),
+                                  (["-m", "--message"],         {"required": True, "help": "commit message"}),
+                                  (["--optimized"],             {"action": "store_true",
+                                                                 "help": "only stage changed paths, skip clean repos"})],
+                                 "commit and push all work in a feature branch"),
+    "commit-hot-fix":           (lambda context, args: _manager(context, args).commit_hot_fix(args.message,
+                                                                                              optimized=args.optimized),
+                                 [(["-m", "--message"],         {"required": True, "help": "commit message"}),
+                                  (["--optimized"],             {"action": "store_true",
+                                                                 "help": "only stage changed paths, skip clean repos"})],
+                                 "commit and push all work in the operate branch"),
+    "complete-feature":         (lambda context, args: _manager(context, args).complete_feature(args.branch,
+                                                                                                fast=not args.no_fast,
+                                                                                                use_worktrees=args.worktrees),
+                                 [(["branch"],                  {"help": "feature branch"}),
+                                  (["--no-fast"],               {"action": "store_true",
+                                                                 "help": "always check out and merge, even for "
+                                                                         + "fast-forwards"}),
+                                  (["--worktrees"],             {"action": "store_true",
+                                                                 "help": "merge in managed worktrees, leaving the "
+                                                                         + "checked out branch alone"})],
+                                 "merge a feature branch into integration and push"),
+    "predict-conflicts":        (lambda context, args: _manager(context, args).predict_merge_conflicts(args.branch),
+                                 [(["branch"],                  {"help": "feature branch"})],
+                                 "show the conflicts that complete-feature would hit, without changing anything"),
+    "remove-feature-branch":    (lambda context, args: _manager(context, args).remove_feature_branch(args.branch),
+                                 [(["branch"],                  {"help": "feature branch"})],
+                                 "remove a merged feature branch, locally and in the remote"),
+    "refresh-from-integration": (lambda context, args: _manager(context, args).refresh_from_integration(args.branch,
+                                                                                                use_worktrees=args.worktrees),
+                                 [(["branch"],                  {"help": "feature branch"}),
+                                  (["--worktrees"],             {"action": "store_true",
+                                                                 "help": "merge in managed worktrees, leaving the "
+                                                                         + "checked out branch alone"})],
+                                 "merge the remote integration branch into a feature branch"),
+    "refresh-from-remote":      (lambda context, args: _manager(context, args).refresh_from_remote(args.branch),
+                                 [(["branch"],                  {"help": "feature branch"})],
+                                 "update a local feature branch from the remote"),
+    "pr-integration-to-master": (lambda context, args: _manager(context, args).pull_request_integration_to_master(),
+                                 [],
+                                 "create pull requests between integration and master"),
+    "publish-release":          (lambda context, args: _manager(context, args).publish_release(),
+                                 [],
+                                 "publish master to the operate branch"),
+    "publish-hot-fix":          (lambda context, args: _manager(context, args).publish_hot_fix(),
+                                 [],
+                                 "publish operate to master and integration"),
+}
+
+
+def build_parser():
+    '''
+    :return: the parser for the ``limon`` command line.
+    :rtype: :class:`argparse.ArgumentParser`
+    '''
+    from limon_ops.cli.limon_daemon                                 import LimonDaemon
+
+    parser                                              = argparse.ArgumentParser(
+                                                            prog        = "limon",
+                                                            description = "Set up and manage the GIT repos of a project")
+    parser.add_argument("--socket", default=_os.environ.get("LIMON_SOCKET", LimonDaemon.default_socket_path()),
+                        help="Unix socket of the limon daemon. Commands are sent to the daemon if it is running")
+    parser.add_argument("--no-daemon", action="store_true",
+                        help="run the command in this process even if a daemon is running")
+    parser.add_argument("--trace", default=None,
+                        help="file to save a trace of the GIT commands and API calls made. It is saved in the "
+                             + "OpenTelemetry JSON format if it ends in '.otlp.json', and as a Chrome trace otherwise")
+
+    setup_parent                                        = argparse.ArgumentParser(add_help=False)
+    setup_parent.add_argument("--sdlc-root", required=True,
+                              help="folder under which CCL SDLC profiles and tools exist")
+    setup_parent.add_argument("--profile", required=True, help="name of the user profile")
+
+    admin_parent                                        = argparse.ArgumentParser(add_help=False)
+    admin_parent.add_argument("--local-root", required=True, help="parent folder of the local repos")
+    admin_parent.add_argument("--remote-root", required=True, help="parent folder or URL of the remote repos")
+    admin_parent.add_argument("--bundle", default=DEFAULT_BUNDLE, help="RepoBundle class, as '<module>:<class>'")
+    admin_parent.add_argument("--gh-user", default=None, help="GitHub user with rights to the remote repos")
+    admin_parent.add_argument("--gh-organization", default=None, help="owner of the remote GitHub repos")
+    admin_parent.add_argument("--gh-secrets-path", default=None, help="file with the GitHub token for --gh-user")
+
+    subparsers                                          = parser.add_subparsers(dest="command", required=True)
+
+    for commands_dict, parent in [(SETUP_COMMANDS, setup_parent), (ADMIN_COMMANDS, admin_parent)]:
+        for name, (handler, arguments_l, help) in commands_dict.items():
+            subparser                                   = subparsers.add_parser(name, parents=[parent], help=help)
+            for flags, kwargs in arguments_l:
+                subparser.add_argument(*flags, **kwargs)
+
+    daemon_parser                                       = subparsers.add_parser("daemon",
+                                                                                help="manage the limon daemon")
+    daemon_parser.add_argument("action", choices=["start", "stop", "status"])
+
+    return parser
+
+
+def run_command(context, command, arguments, trace_path=None):
+    '''
+    Runs a CLI command in this process. It is used both by the CLI (when no daemon is running) and by the
+    :class:`LimonDaemon` when serving a request.
+
+    :param LimonContext context: holds the objects that commands act on.
+    :param str command: name of the command. Example: "work-on-feature"
+    :param dict arguments: the parsed arguments for the command, as produced by :func:`build_parser`
+    :param str trace_path: optional file in which to save a trace of the command. By default it is None, in which
+        case the command is not traced.
+    :return: printable output of the command
+    :rtype: str
+    '''
+    from limon_ops.observability.tracer                             import Tracer
+
+    commands_dict                                       = SETUP_COMMANDS | ADMIN_COMMANDS
+    if not command in commands_dict:
+        raise ValueError(f"Unknown command '{command}'")
+
+    handler, _, _                                       = commands_dict[command]
+
+    if trace_path is None:
+        return _to_printable(handler(context, argparse.Namespace(**arguments)))
+
+    tracer                                              = Tracer.tracer()
+    tracer.clear()
+    tracer.enable()
+    try:
+        with tracer.span(command, "cli"):
+            result                                      = handler(context, argparse.Namespace(**arguments))
+    finally:
+        tracer.disable()
+        tracer.export(trace_path)
+
+    return _to_printable(result)
+
+def _to_printable(result):
+    if result is None:
+        return ""
+    if hasattr(result, "to_string"): # A DataFrame
+        return result.to_string()
+    if isinstance(result, (list, tuple)):
+        return "\n".join(str(x) for x in result)
+    return str(result)
+
+
+def _is_url(path):
+    '''
+    :return: True if ``path`` is a URL (like "https://github.com/my-org") or an scp-like GIT remote (like
+        "git@github.com:my-org") as opposed to a path in the local file system.
+    :rtype: bool
+    '''
+    return "://" in path or _re.match(r"^[\w.-]+@[\w.-]+:", path) is not None
+
+
+def main(argv=None):
+    from limon_ops.cli.limon_context                                import LimonContext
+    from limon_ops.cli.limon_daemon                                 import LimonDaemon, LimonDaemonClient
+
+    args                                                = build_parser().parse_args(argv)
+    arguments                                           = vars(args)
+    command                                             = arguments.pop("command")
+    socket_path                                         = arguments.pop("socket")
+    no_daemon                                           = arguments.pop("no_daemon")
+    trace_path                                          = arguments.pop("trace")
+    if not trace_path is None:
+        trace_path                                      = _os.path.abspath(trace_path)
+
+    client                                              = LimonDaemonClient(socket_path)
+
+    if command == "daemon":
+        match args.action:
+            case "start":
+                LimonDaemon(socket_path).serve_forever()
+            case "stop":
+                if not client.is_running():
+                    print("not running", file=sys.stderr)
+                    return 1
+                client.request({"command": LimonDaemon.STOP})
+            case "status":
+                print("running" if client.is_running() else "not running")
+        return 0
+
+    for name in PATH_ARGUMENTS:
+        if arguments.get(name) is not None and not _is_url(arguments[name]):
+            arguments[name]                             = _os.path.abspath(arguments[name])
+
+    if not no_daemon and client.is_running():
+        response                                        = client.request({"command":     command,
+                                                                          "arguments":   arguments,
+                                                                          "trace":       trace_path})
+        # The daemon's log messages, which would have been printed here had the command run without a daemon
+        if response.get("log", "") != "":
+            print(response["log"])
+        if not response["ok"]:
+            print(response["error"], file=sys.stderr)
+            return 1
+        output                                          = response["output"]
+    else:
+        output                                          = run_command(LimonContext(), command, arguments, trace_path)
+
+    if output != "":
+        print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
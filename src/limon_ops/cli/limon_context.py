@@ -0,0 +1,82 @@
+import importlib                                                    as _importlib
+
+
+class LimonContext():
+
+    '''
+    Holds the long-lived objects that CLI commands act on, so that they are only built once per process.
+
+    When the CLI runs a single command this makes no difference. But when commands are served by the
+    :class:`LimonDaemon`, the same :class:`LimonContext` is used for every request, so the application, the
+    parsed user profiles, and the :class:`RepoSetup` and :class:`BranchLifecycleManager` objects (and any state
+    they cache, like opened repos and HTTP sessions) stay warm across CLI invocations.
+    '''
+    def __init__(self):
+        self.application                                = None
+        self._repo_setups                               = {}
+        self._managers                                  = {}
+
+    def ensure_application(self):
+        '''
+        Starts the global application needed by Conway services, unless it was already started.
+        '''
+        if self.application is None:
+            from scratch_nb_apps                                    import ensure_application
+
+            self.application                            = ensure_application()
+        return self.application
+
+    def repo_setup(self, sdlc_root, profile_name):
+        '''
+        :return: the :class:`RepoSetup` for the given profile, creating it on first use.
+        :rtype: :class:`limon_ops.onboarding.repo_setup.RepoSetup`
+        '''
+        from limon_ops.onboarding.repo_setup                        import RepoSetup
+
+        key                                             = (sdlc_root, profile_name)
+        if not key in self._repo_setups:
+            self.ensure_application()
+            self._repo_setups[key]                      = RepoSetup(sdlc_root, profile_name)
+        return self._repo_setups[key]
+
+    def manager(self, local_root, remote_root, bundle, remote_gh_user, remote_gh_organization, gh_secrets_path):
+        '''
+        :param str bundle: the :class:`RepoBundle` to manage, given as "<module>:<class>". Example:
+            "scratch_ops.onboarding.scratch_repo_bundle:ScratchRepoBundle"
+        :return: the :class:`BranchLifecycleManager` for the given parameters, creating it on first use. Since
+            :class:`BranchLifecycleManager` extends :class:`RepoAdministration`, it also serves administration
+            commands.
+        :rtype: :class:`limon_ops.repo_admin.branch_lifecycle_manager.BranchLifecycleManager`
+        '''
+        from limon_ops.repo_admin.branch_lifecycle_manager          import BranchLifecycleManager
+
+        key                                             = (local_root, remote_root, bundle, remote_gh_user,
+                                                           remote_gh_organization, gh_secrets_path)
+        if not key in self._managers:
+            self.ensure_application()
+            self._managers[key]                         = BranchLifecycleManager(
+                                                                local_root              = local_root,
+                                                                remote_root             = remote_root,
+                                                                repo_bundle             = self._load_bundle(bundle),
+                                                                remote_gh_user          = remote_gh_user,
+                                                                remote_gh_organization  = remote_gh_organization,
+                                                                gh_secrets_path         = gh_secrets_path)
+        return self._managers[key]
+
+    def managers(self):
+        '''
+        :return: the :class:`BranchLifecycleManager` objects created so far
+        :rtype: list
+        '''
+        return list(self._managers.values())
+
+    def _load_bundle(self, bundle):
+        '''
+        :param str bundle: a :class:`RepoBundle` class given as "<module>:<class>"
+        :return: an instance of that class
+        '''
+        module_name, _, class_name                      = bundle.partition(":")
+        if class_name == "":
+            raise ValueError(f"Bundle '{bundle}' should be given as '<module>:<class>'")
+        bundle_class                                    = getattr(_importlib.import_module(module_name), class_name)
+        return bundle_class()
@@ -0,0 +1,202 @@
+import asyncio
+import json
+import os                                                           as _os
+import socket                                                       as _socket
+import traceback                                                    as _traceback
+
+from limon_ops.cli.limon_context                                    import LimonContext
+from limon_ops.observability.structured_log                         import StructuredLog
+
+
+class LimonDaemon():
+
+    '''
+    Long-running server for CLI commands, so that repeated ``limon`` invocations skip start-up costs: imports,
+    starting the application, parsing user profiles, opening repos and HTTP sessions.
+
+    It listens on a Unix socket, which makes it reachable only from the local machine, and the socket file is
+    only accessible by the user that started the daemon.
+
+    The protocol is one JSON request per connection, terminated by a new line, answered by one JSON response. A
+    request looks like ``{"command": "work-on-feature", "arguments": {...}}`` and the response like
+    ``{"ok": true, "output": "...", "log": "..."}`` or ``{"ok": false, "error": "...", "log": "..."}``, where
+    ``log`` has the messages logged while the command ran (see :class:`StructuredLog`), for the CLI to print as it
+    would have without a daemon.
+
+    Commands are run one at a time, since branch workflows change the current directory of the process and
+    the working trees of the repos they act on.
+
+    :param str socket_path: location in the file system of the Unix socket to listen on.
+    '''
+    def __init__(self, socket_path):
+        self.socket_path                                = socket_path
+        self.context                                    = LimonContext()
+        # These are created in the event loop, in serve_forever
+        self._lock                                      = None
+        self._stopped                                   = None
+
+    STOP                                                = "__stop__"
+    PING                                                = "__ping__"
+
+    # How often the daemon maintains the repos of the managers it holds, in seconds (see RepoMaintenance: only repos
+    # that are due get maintained). Can be overridden with the LIMON_MAINTENANCE_PERIOD_S environment variable, where
+    # 0 disables it
+    MAINTENANCE_PERIOD_S                                = float(_os.environ.get("LIMON_MAINTENANCE_PERIOD_S", 3600))
+
+    def default_socket_path():
+        '''
+        :return: the socket to use when none is given: under ``$XDG_RUNTIME_DIR`` if it is set, else under ``~/.limon``
+        :rtype: str
+        '''
+        runtime_dir                                     = _os.environ.get("XDG_RUNTIME_DIR")
+        if runtime_dir is None:
+            runtime_dir                                 = _os.path.expanduser("~/.limon")
+        return runtime_dir + "/limon.sock"
+
+    def serve_forever(self):
+        '''
+        Starts listening on ``self.socket_path``, and serves requests until a stop request is received.
+        '''
+        return asyncio.run(self._supervisor())
+
+    async def _supervisor(self):
+        if LimonDaemonClient(self.socket_path).is_running():
+            raise ValueError(f"A limon daemon is already listening on '{self.socket_path}'")
+
+        _os.makedirs(_os.path.dirname(self.socket_path), mode=0o700, exist_ok=True)
+        if _os.path.exists(self.socket_path): # Left over by a daemon that did not stop cleanly
+            _os.remove(self.socket_path)
+
+        self._lock                                      = asyncio.Lock()
+        self._stopped                                   = asyncio.Event()
+
+        # GOTCHA:
+        #   Restrict the umask while the socket is created, so that there is no window during which other users could
+        #   connect to it
+        #
+        previous_umask                                  = _os.umask(0o177)
+        try:
+            server                                      = await asyncio.start_unix_server(self._handle, path=self.socket_path)
+        finally:
+            _os.umask(previous_umask)
+
+        maintenance_task                                = None
+        if self.MAINTENANCE_PERIOD_S > 0:
+            maintenance_task                            = asyncio.ensure_future(self._maintain_periodically())
+        try:
+            async with server:
+                await self._stopped.wait()
+        finally:
+            if not maintenance_task is None:
+                maintenance_task.cancel()
+            if _os.path.exists(self.socket_path):
+                _os.remove(self.socket_path)
+
+    async def _handle(self, reader, writer):
+        try:
+            request                                     = json.loads(await reader.readline())
+            command                                     = request.get("command")
+
+            if command == self.STOP:
+                response                                = {"ok": True, "output": ""}
+                # Let the response go out before the server stops
+                asyncio.get_running_loop().call_soon(self._stopped.set)
+            elif command == self.PING:
+                response                                = {"ok": True, "output": ""}
+            else:
+                async with self._lock:
+                    response                            = await asyncio.to_thread(self._run, command,
+                                                                                  request.get("arguments", {}),
+                                                                                  request.get("trace"))
+        except Exception as ex:
+            response                                    = {"ok": False, "error": f"Bad request: {ex}"}
+
+        writer.write((json.dumps(response) + "\n").encode())
+        await writer.drain()
+        writer.close()
+        await writer.wait_closed()
+
+    def _run(self, command, arguments, trace_path):
+        '''
+        Runs a command in a worker thread. Commands use :func:`asyncio.run` internally, which is not allowed in the
+        thread running the daemon's event loop.
+        '''
+        from limon_ops.cli.limon_cli                                import run_command
+
+        log                                             = StructuredLog.logger()
+        with log.capture() as record_l:
+            try:
+                response                                = {"ok": True, "output": run_command(self.context, command,
+                                                                                             arguments, trace_path)}
+            except Exception as ex:
+                response                                = {"ok": False, "error": "".join(_traceback.format_exception(ex))}
+        response["log"]                                 = "\n".join(log.format(record) for record in record_l)
+        return response
+
+
+    async def _maintain_periodically(self):
+        '''
+        Maintains repos every :attr:`MAINTENANCE_PERIOD_S` seconds, between commands, so that repos slowed down by
+        big workflows are sped up again without anyone having to ask.
+        '''
+        while True:
+            await asyncio.sleep(self.MAINTENANCE_PERIOD_S)
+            async with self._lock:
+                await asyncio.to_thread(self._maintain)
+
+    def _maintain(self):
+        '''
+        Runs in a worker thread, like commands, since maintenance uses :func:`asyncio.run` internally.
+        '''
+        for manager in self.context.managers():
+            try:
+                manager.maintain()
+            except Exception:
+                # Maintenance is an optimization, so a failure must not bring the daemon down
+                _traceback.print_exc()
+
+
+class LimonDaemonClient():
+
+    '''
+    Sends CLI commands to a :class:`LimonDaemon`.
+
+    :param str socket_path: location in the file system of the Unix socket the daemon listens on.
+    '''
+    def __init__(self, socket_path):
+        self.socket_path                                = socket_path
+
+    def is_running(self):
+        '''
+        :return: True if a daemon is listening on ``self.socket_path``
+        :rtype: bool
+        '''
+        if not _os.path.exists(self.socket_path):
+            return False
+        try:
+            return self.request({"command": LimonDaemon.PING}, timeout=2)["ok"]
+        except (OSError, ValueError):
+            # ValueError if the daemon closed the connection without a (full) response, e.g. because it crashed
+            return False
+
+    def request(self, request, timeout=None):
+        '''
+        :param dict request: the request to send to the daemon.
+        :param float timeout: optional number of seconds to wait for the response. By default it is None, which
+            means to wait until the command completes.
+        :return: the daemon's response
+        :rtype: dict
+        '''
+        with _socket.socket(_socket.AF_UNIX, _socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(self.socket_path)
+            sock.sendall((json.dumps(request) + "\n").encode())
+
+            chunks_l                                    = []
+            while True:
+                chunk                                   = sock.recv(65536)
+                if chunk == b"":
+                    break
+                chunks_l.append(chunk)
+
+        return json.loads(b"".join(chunks_l))
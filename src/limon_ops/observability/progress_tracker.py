@@ -0,0 +1,266 @@
+import html                                                         as _html
+import os                                                           as _os
+import threading                                                    as _threading
+import time
+
+from limon_ops.observability.tracer                                 import Tracer
+
+
+class RepoProgress():
+
+    '''
+    Progress of one repo in the workflow followed by a :class:`ProgressTracker`.
+    '''
+    __slots__                                           = ("state", "start_ns", "end_ns", "last_activity_ns", "git_calls",
+                                                           "error")
+
+    def __init__(self):
+        self.state                                      = ProgressTracker.PENDING
+        self.start_ns                                   = None
+        self.end_ns                                     = None
+        self.last_activity_ns                           = None
+        self.git_calls                                  = 0
+        self.error                                      = None
+
+    def latency_ms(self):
+        '''
+        :return: how long the workflow spent on the repo so far, in milliseconds, or None if it didn't start
+        :rtype: float
+        '''
+        if self.start_ns is None:
+            return None
+        end_ns                                          = self.end_ns if not self.end_ns is None else time.time_ns()
+        return (end_ns - self.start_ns) / 1e6
+
+
+class ProgressTracker():
+
+    '''
+    Follows the progress of limon workflows (like :meth:`RepoSetup.setup` or the workflows of
+    :class:`BranchLifecycleManager`) as they run, from the spans that they already record with the
+    :class:`Tracer`, so that notebooks can show more than a stream of log text.
+
+    It counts repos pending, running, done and failed, per-repo latencies, throughput, and GIT and GitHub API
+    calls. These can be polled with :meth:`metrics`, or shown in a Jupyter notebook, refreshed as the workflow runs,
+    with :meth:`display`.
+
+    Spans are interpreted as follows:
+
+    * a "workflow" span starts a workflow, and its ``repos`` attribute lists the repos it acts on, which start as
+      pending. When it ends, the repos it started are done or, if the workflow failed (even on a precondition,
+      without any failed GIT command), failed, and the workflow's error is kept. Workflows run from within another
+      workflow are part of it.
+    * a "repo" span (like each repo's setup) marks a repo as running while it is open, and as done or failed when
+      it ends.
+    * "git" spans mark their repo as running and are counted as GIT calls, and "github_api" spans as API calls.
+
+    The tracker only listens to spans between :meth:`start` and :meth:`stop` (or within a ``with`` block). When no
+    tracker is listening and tracing is disabled, spans cost next to nothing, as before. Example::
+
+        with ProgressTracker() as tracker:
+            tracker.display()
+            manager.complete_feature("story_1455")
+    '''
+    def __init__(self, tracer=None):
+        self.tracer                                     = Tracer.tracer() if tracer is None else tracer
+        self.workflow                                   = None
+        self._lock                                      = _threading.Lock()
+        self._reset(None, [])
+        self._refresh_thread                            = None
+        self._stopped                                   = _threading.Event()
+
+    PENDING                                             = "pending"
+    RUNNING                                             = "running"
+    DONE                                                = "done"
+    FAILED                                              = "failed"
+    STATES                                              = [PENDING, RUNNING, DONE, FAILED]
+
+    def start(self):
+        '''
+        Starts listening to spans.
+
+        :return: this tracker
+        :rtype: ProgressTracker
+        '''
+        self._stopped.clear()
+        self.tracer.add_listener(self._on_span)
+        return self
+
+    def stop(self):
+        '''
+        Stops listening to spans and refreshing the display, if any, after a last refresh.
+        '''
+        self.tracer.remove_listener(self._on_span)
+        self._stopped.set()
+        if not self._refresh_thread is None:
+            self._refresh_thread.join()
+            self._refresh_thread                        = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+        return False
+
+    def metrics(self):
+        '''
+        :return: the progress of the current (or last) workflow so far, with keys:
+
+            * "workflow": the workflow's name, or None if none started yet
+            * "error": the error the workflow failed with, or None if it didn't fail (or is still running)
+            * "pending", "running", "done", "failed": how many repos are in each state
+            * "elapsed_s": seconds since the workflow started
+            * "repos_per_s": repos done or failed per second
+            * "git_calls", "api_calls": GIT commands and GitHub API calls made
+            * "git_calls_per_s": GIT commands made per second
+            * "repos": for each repo, a dictionary with its "state", "latency_ms", "git_calls" and "error"
+
+        :rtype: dict
+        '''
+        with self._lock:
+            end_ns                                      = self._end_ns if not self._end_ns is None else time.time_ns()
+            elapsed_s                                   = (end_ns - self._start_ns) / 1e9
+            counts_dict                                 = {state: 0 for state in self.STATES}
+            repos_dict                                  = {}
+            for repo_name, progress in self._repos_dict.items():
+                counts_dict[progress.state]             += 1
+                repos_dict[repo_name]                   = {"state":         progress.state,
+                                                           "latency_ms":    progress.latency_ms(),
+                                                           "git_calls":     progress.git_calls,
+                                                           "error":         progress.error}
+            finished                                    = counts_dict[self.DONE] + counts_dict[self.FAILED]
+            return {"workflow":         self.workflow,
+                    "error":            self._error,
+                    **counts_dict,
+                    "elapsed_s":        elapsed_s,
+                    "repos_per_s":      finished / elapsed_s if elapsed_s > 0 else 0.0,
+                    "git_calls":        self._git_calls,
+                    "api_calls":        self._api_calls,
+                    "git_calls_per_s":  self._git_calls / elapsed_s if elapsed_s > 0 else 0.0,
+                    "repos":            repos_dict}
+
+    def display(self, refresh_s=0.5):
+        '''
+        Shows the progress in a Jupyter notebook, as a small HTML table refreshed every ``refresh_s`` seconds until
+        :meth:`stop` is called.
+
+        :param float refresh_s: seconds between refreshes
+        '''
+        try:
+            from IPython.display                                    import display, HTML
+        except ImportError:
+            raise ValueError("Displaying progress requires IPython, as in Jupyter notebooks")
+
+        handle                                          = display(HTML(self.to_html()), display_id=True)
+
+        def _refresh():
+            while not self._stopped.wait(refresh_s):
+                handle.update(HTML(self.to_html()))
+            handle.update(HTML(self.to_html()))
+
+        self._refresh_thread                            = _threading.Thread(target=_refresh, name="limon-progress",
+                                                                            daemon=True)
+        self._refresh_thread.start()
+
+    def to_html(self):
+        '''
+        :return: the progress so far, as the HTML shown by :meth:`display`
+        :rtype: str
+        '''
+        metrics_dict                                    = self.metrics()
+        summary                                         = " | ".join(f"{state}: {metrics_dict[state]}" for state in self.STATES)
+        rates                                           = f"{metrics_dict['elapsed_s']:.1f} s | {metrics_dict['repos_per_s']:.2f} repos/s" \
+                                                            + f" | GIT calls: {metrics_dict['git_calls']}" \
+                                                            + f" ({metrics_dict['git_calls_per_s']:.1f}/s)" \
+                                                            + f" | API calls: {metrics_dict['api_calls']}"
+        row_l                                           = []
+        for repo_name, repo_dict in metrics_dict["repos"].items():
+            latency_ms                                  = repo_dict["latency_ms"]
+            row_l.append(f"<tr><td>{_html.escape(repo_name)}</td><td>{repo_dict['state']}</td>"
+                         + f"<td>{'' if latency_ms is None else f'{latency_ms:,.0f}'}</td>"
+                         + f"<td>{repo_dict['git_calls']}</td>"
+                         + f"<td>{_html.escape(repo_dict['error'] or '')}</td></tr>")
+        error                                           = "" if metrics_dict["error"] is None \
+                                                            else f"<br/><b>Failed:</b> {_html.escape(metrics_dict['error'])}"
+        return f"<div><b>{_html.escape(str(metrics_dict['workflow']))}</b> - {summary}<br/>{rates}{error}" \
+                + "<table><tr><th>Repo</th><th>State</th><th>Latency (ms)</th><th>GIT calls</th><th>Error</th></tr>" \
+                + "".join(row_l) + "</table></div>"
+
+    def _reset(self, workflow, repo_name_l):
+        self.workflow                                   = workflow
+        self._repos_dict                                = {repo_name: RepoProgress() for repo_name in repo_name_l}
+        self._start_ns                                  = time.time_ns()
+        self._end_ns                                    = None
+        self._git_calls                                 = 0
+        self._api_calls                                 = 0
+        self._workflow_depth                            = 0
+        self._error                                     = None
+
+    def _on_span(self, span, ended):
+        '''
+        Listener given to the :class:`Tracer`. It is called from whatever thread opens or closes the span, so it
+        only updates counters, under the lock.
+        '''
+        category                                        = span.category
+        with self._lock:
+            if category == "workflow":
+                self._on_workflow(span, ended)
+                return
+
+            if category == "github_api" and ended:
+                self._api_calls                         += 1
+            repo                                        = span.attributes.get("repo")
+            if repo is None:
+                return
+            progress                                    = self._repos_dict.get(_os.path.basename(str(repo)))
+            if progress is None:
+                return # Like worktrees, which are not repos of the workflow
+
+            if not ended:
+                if progress.state == self.PENDING:
+                    progress.state                      = self.RUNNING
+                    progress.start_ns                   = span.start_ns
+                return
+
+            progress.last_activity_ns                   = span.end_ns
+            if category == "git":
+                self._git_calls                         += 1
+                progress.git_calls                      += 1
+            # GIT commands record failures as an exit status, and the exception is raised after the span ends
+            exit_status                                 = span.attributes.get("exit_status", 0)
+            if not span.error is None:
+                progress.error                          = span.error
+            elif exit_status != 0:
+                progress.error                          = f"'{span.name}' failed" if exit_status is None \
+                                                            else f"'{span.name}' exited with status {exit_status}"
+            else:
+                progress.error                          = None # Only the last failure matters, see _on_workflow
+            if category == "repo":
+                progress.state                          = self.DONE if span.error is None else self.FAILED
+                progress.end_ns                         = span.end_ns
+
+    def _on_workflow(self, span, ended):
+        if not ended:
+            if self._workflow_depth == 0:
+                self._reset(span.name, span.attributes.get("repos", []))
+            self._workflow_depth                        += 1
+            return
+
+        self._workflow_depth                            -= 1
+        if self._workflow_depth > 0:
+            return
+        self._end_ns                                    = span.end_ns
+        self._error                                     = span.error
+        for progress in self._repos_dict.values():
+            if progress.state == self.RUNNING:
+                # A failed workflow didn't finish with the repos it was acting on, whether or not one of their GIT
+                # commands failed (e.g., it raised on a precondition)
+                if span.error is None:
+                    progress.state                      = self.DONE
+                else:
+                    progress.state                      = self.FAILED
+                    progress.error                      = progress.error or span.error
+                progress.end_ns                         = progress.last_activity_ns or span.end_ns
+            elif progress.state == self.PENDING and span.error is None:
+                progress.state                          = self.DONE # The workflow had nothing to do for the repo
@@ -0,0 +1,266 @@
+import atexit                                                       as _atexit
+import contextlib                                                   as _contextlib
+import itertools                                                    as _itertools
+import json
+import os                                                           as _os
+import queue                                                        as _queue
+import sys
+import threading                                                    as _threading
+import time
+
+
+class LogRecord():
+
+    '''
+    One message logged with :class:`StructuredLog`, kept unformatted until it is written out.
+
+    :param int level: one of :attr:`StructuredLog.LEVELS`
+    :param str message: what happened. Example: "@ 'integration' (local):"
+    :param str repo: optional name of the repo acted on
+    :param str step: optional name of the workflow step. Example: "merge"
+    :param float duration_ms: optional duration of the step, in milliseconds
+    :param str output: optional output of the step, like the output of a GIT command. It is truncated when
+        written out
+    '''
+    __slots__                                           = ("level", "time", "message", "repo", "step", "duration_ms",
+                                                           "output")
+
+    def __init__(self, level, message, repo, step, duration_ms, output):
+        self.level                                      = level
+        self.time                                       = time.time()
+        self.message                                    = message
+        self.repo                                       = repo
+        self.step                                       = step
+        self.duration_ms                                = duration_ms
+        self.output                                     = output
+
+
+class StructuredLog():
+
+    '''
+    Process-wide log for limon workflows that keeps logging off their hot path:
+
+    * Messages below :attr:`level` are discarded right away, before anything is formatted. Callers pass the outputs
+      of GIT commands as is, in the ``output`` argument, rather than formatting them into the message.
+
+    * Other messages are queued as :class:`LogRecord` objects, and a background thread formats them (truncating
+      outputs to :attr:`MAX_OUTPUT_CHARS`) and writes them out in batches: to the Conway ``Logger``, at their level
+      (see :attr:`LOGGER_METHODS`), and, if the ``LIMON_LOG_PATH`` environment variable is set, as JSON lines
+      appended to that file.
+
+    Records are written in the order they were logged, within :attr:`FLUSH_INTERVAL_S` seconds. Call
+    :meth:`flush` to wait until all records logged so far are written out. Workflows do so before they return (see
+    :meth:`RepoAdministration._run_workflow`), so that their messages don't show up after them, e.g. in another
+    notebook cell. It also happens automatically when the process exits.
+
+    The level is INFO by default, and can be set with the ``LIMON_LOG_LEVEL`` environment variable (to DEBUG,
+    INFO, WARNING or ERROR) or with :meth:`set_level`.
+
+    Records can also be collected as they are logged, with :meth:`capture`.
+
+    Writing out never raises into workflows. If the ``Logger`` or the file can't be written to, records keep
+    going to the other one, and the first failure of each is reported on ``sys.stderr``.
+    '''
+    def __init__(self, log_path=None):
+        self.level                                      = self.LEVELS.get(_os.environ.get("LIMON_LOG_LEVEL", "INFO"),
+                                                                          self.INFO)
+        self.log_path                                   = log_path
+        self._queue                                     = _queue.SimpleQueue()
+        self._thread                                    = None # Started on first use
+        self._thread_lock                               = _threading.Lock()
+        # Lists that records are also appended to, while a :meth:`capture` is in effect. Replaced rather than
+        # changed in place, so that other threads can go through it without a lock
+        self._capture_l_l                               = []
+        # Outputs ("Logger" or the log path) that failed to be written to, and were reported on sys.stderr
+        self._failed_s                                  = set()
+
+    DEBUG                                               = 10
+    INFO                                                = 20
+    WARNING                                             = 30
+    ERROR                                               = 40
+    LEVELS                                              = {"DEBUG": DEBUG, "INFO": INFO, "WARNING": WARNING, "ERROR": ERROR}
+
+    # Method of the Conway ``Logger`` that writes out the records of each level. Levels whose method the Logger
+    # lacks are written out with "log_info"
+    LOGGER_METHODS                                      = {DEBUG: "log_debug", INFO: "log_info", WARNING: "log_warning",
+                                                           ERROR: "log_error"}
+
+    # Outputs longer than this are truncated when written out, keeping their beginning and end
+    MAX_OUTPUT_CHARS                                    = 4000
+
+    # Most records written out in one batch, and longest wait for more records before writing a batch out
+    BATCH_SIZE                                          = 256
+    FLUSH_INTERVAL_S                                    = 0.2
+
+    _singleton                                          = None
+    _singleton_lock                                     = _threading.Lock()
+
+    def logger():
+        '''
+        :return: the process-wide log, which also writes JSON lines to the file given by the ``LIMON_LOG_PATH``
+            environment variable, if it is set
+        :rtype: StructuredLog
+        '''
+        if StructuredLog._singleton is None:
+            with StructuredLog._singleton_lock:
+                if StructuredLog._singleton is None:
+                    StructuredLog._singleton            = StructuredLog(_os.environ.get("LIMON_LOG_PATH"))
+                    _atexit.register(StructuredLog._singleton.flush)
+        return StructuredLog._singleton
+
+    def set_level(self, level):
+        '''
+        :param level: the least severe level that is logged, as one of :attr:`LEVELS` or its name
+        '''
+        self.level                                      = self.LEVELS[level] if isinstance(level, str) else level
+
+    def is_enabled(self, level):
+        '''
+        :return: True if messages at ``level`` are logged. Callers can check it to avoid preparing costly messages
+        :rtype: bool
+        '''
+        return level >= self.level
+
+    def log(self, level, message, repo=None, step=None, duration_ms=None, output=None):
+        '''
+        Queues ``message`` to be written out, if ``level`` is enabled. See :class:`LogRecord` for the parameters.
+        '''
+        if level < self.level:
+            return
+        if self._thread is None:
+            self._start()
+        record                                          = LogRecord(level, message, repo, step, duration_ms, output)
+        for capture_l in self._capture_l_l:
+            capture_l.append(record)
+        self._queue.put(record)
+
+    def debug(self, message, **kwargs):
+        self.log(self.DEBUG, message, **kwargs)
+
+    def info(self, message, **kwargs):
+        self.log(self.INFO, message, **kwargs)
+
+    def warning(self, message, **kwargs):
+        self.log(self.WARNING, message, **kwargs)
+
+    def error(self, message, **kwargs):
+        self.log(self.ERROR, message, **kwargs)
+
+    @_contextlib.contextmanager
+    def capture(self):
+        '''
+        Within this context, the records logged from any thread are also appended to the list it yields, besides
+        being written out. For example, :class:`LimonDaemon` sends the messages of a command back to the CLI that
+        asked for it.
+        '''
+        record_l                                        = []
+        with self._thread_lock:
+            self._capture_l_l                           = self._capture_l_l + [record_l]
+        try:
+            yield record_l
+        finally:
+            with self._thread_lock:
+                self._capture_l_l                       = [x for x in self._capture_l_l if not x is record_l]
+
+    def format(self, record):
+        '''
+        :param LogRecord record: a record logged with this log
+        :return: the text written out to the Conway ``Logger`` for ``record``: its message, followed by its
+            output, truncated to :attr:`MAX_OUTPUT_CHARS`, if it has one
+        :rtype: str
+        '''
+        if record.output is None:
+            return record.message
+        return f"{record.message}\n\n{self._truncate(str(record.output))}"
+
+    def flush(self, timeout=10):
+        '''
+        Waits until all records logged so far are written out, or until ``timeout`` seconds have passed.
+        '''
+        if self._thread is None:
+            return
+        flushed                                         = _threading.Event()
+        self._queue.put(flushed)
+        flushed.wait(timeout)
+
+    def _truncate(self, output):
+        if len(output) <= self.MAX_OUTPUT_CHARS:
+            return output
+        half                                            = self.MAX_OUTPUT_CHARS // 2
+        return f"{output[:half]}\n... ({len(output) - 2 * half} characters omitted) ...\n{output[-half:]}"
+
+    def _start(self):
+        with self._thread_lock:
+            if self._thread is None:
+                self._thread                            = _threading.Thread(target=self._drain, name="limon-log",
+                                                                            daemon=True)
+                self._thread.start()
+
+    def _drain(self):
+        '''
+        Runs in the background thread: collects records into batches and writes them out.
+        '''
+        while True:
+            record_l                                    = [self._queue.get()]
+            deadline                                    = time.monotonic() + self.FLUSH_INTERVAL_S
+            while len(record_l) < self.BATCH_SIZE and not isinstance(record_l[-1], _threading.Event):
+                try:
+                    record_l.append(self._queue.get(timeout=max(0, deadline - time.monotonic())))
+                except _queue.Empty:
+                    break
+            self._write([x for x in record_l if isinstance(x, LogRecord)])
+            for flushed in [x for x in record_l if isinstance(x, _threading.Event)]:
+                flushed.set()
+
+    def _write(self, record_l):
+        if len(record_l) == 0:
+            return
+        output_l                                        = [None if record.output is None else self._truncate(str(record.output))
+                                                            for record in record_l]
+        # Each output is guarded on its own, so that a failure of one doesn't lose the records for the other, and
+        # logging never breaks workflows
+        try:
+            self._write_to_logger(record_l, output_l)
+        except Exception as ex:
+            self._report_failure("Logger", ex)
+
+        if not self.log_path is None:
+            try:
+                self._write_to_file(record_l, output_l)
+            except Exception as ex:
+                self._report_failure(self.log_path, ex)
+
+    def _write_to_logger(self, record_l, output_l):
+        from conway.observability.logger                            import Logger
+
+        # Consecutive records of the same level are written out together, so that the order is kept
+        for level, group in _itertools.groupby(zip(record_l, output_l), key=lambda pair: pair[0].level):
+            log                                         = getattr(Logger, self.LOGGER_METHODS.get(level, "log_info"),
+                                                                  Logger.log_info)
+            log("\n".join(record.message if output is None else f"{record.message}\n\n{output}"
+                          for record, output in group))
+
+    def _write_to_file(self, record_l, output_l):
+        lines                                           = "".join(json.dumps({"time":           record.time,
+                                                                              "level":          record.level,
+                                                                              "repo":           record.repo,
+                                                                              "step":           record.step,
+                                                                              "duration_ms":    record.duration_ms,
+                                                                              "message":        record.message,
+                                                                              "output":         output}) + "\n"
+                                                          for record, output in zip(record_l, output_l))
+        with open(self.log_path, "a") as file:
+            file.write(lines)
+
+    def _report_failure(self, destination, ex):
+        '''
+        Reports on ``sys.stderr`` that records could not be written to ``destination``, the first time it happens.
+        '''
+        if destination in self._failed_s:
+            return
+        self._failed_s.add(destination)
+        try:
+            print(f"limon: could not write log records to {destination} ({type(ex).__name__}: {ex}). Further "
+                  + "failures to write to it are not reported", file=sys.stderr)
+        except Exception:
+            pass # sys.stderr may be closed, e.g. when the process exits
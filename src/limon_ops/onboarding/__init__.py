@@ -0,0 +1,8 @@
+from limon_ops.util.lazy_import                                     import lazy_attributes
+
+# Sub-modules pull in GitPython and the Conway user profile, so they are only imported when one of these attributes 
+# is first used
+#
+__getattr__                                                         = lazy_attributes(__name__, {
+                                                                        "RepoSetup":                "repo_setup",
+                                                                    })
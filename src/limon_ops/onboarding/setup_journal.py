@@ -0,0 +1,88 @@
+import json
+import os                                                           as _os
+
+
+class SetupJournal():
+
+    '''
+    Records which steps of setting up each repo have completed, in a JSON state file, so that a
+    :class:`RepoSetup` that was interrupted or had failures can be run again and only redo what is missing.
+
+    The state file looks like::
+
+        {"repos": {"repo_a": {"steps": ["cloned", "branches_created", "configured"]},
+                   "repo_b": {"steps": ["cloned"], "failed_step": "branches_created", "error": "..."}}}
+
+    The file is rewritten (atomically) after every change, so it is up to date even if the process is killed.
+
+    :param str path: location of the state file. It is created if it doesn't exist.
+    '''
+    def __init__(self, path):
+        self.path                                       = path
+        self._repos_dict                                = self._read()
+
+    CLONED                                              = "cloned"
+    BRANCHES_CREATED                                    = "branches_created"
+    CONFIGURED                                          = "configured"
+    STEPS                                               = [CLONED, BRANCHES_CREATED, CONFIGURED]
+
+    # Name of the state file, which :class:`RepoSetup` keeps in the project folder
+    FILE_NAME                                           = ".limon_setup.json"
+
+    def is_done(self, repo_name, step):
+        '''
+        :return: True if ``step`` was completed for the repo ``repo_name``
+        :rtype: bool
+        '''
+        return step in self._repos_dict.get(repo_name, {}).get("steps", [])
+
+    def mark_done(self, repo_name, step):
+        '''
+        Records that ``step`` was completed for the repo ``repo_name``, clearing any failure recorded for it.
+        '''
+        entry_dict                                      = self._repos_dict.setdefault(repo_name, {"steps": []})
+        if not step in entry_dict["steps"]:
+            entry_dict["steps"].append(step)
+        entry_dict.pop("failed_step", None)
+        entry_dict.pop("error", None)
+        self._write()
+
+    def mark_failed(self, repo_name, step, error):
+        '''
+        Records that ``step`` failed for the repo ``repo_name`` with the given ``error`` message.
+        '''
+        entry_dict                                      = self._repos_dict.setdefault(repo_name, {"steps": []})
+        entry_dict["failed_step"]                       = step
+        entry_dict["error"]                             = error
+        self._write()
+
+    def forget(self, repo_name):
+        '''
+        Discards all progress recorded for the repo ``repo_name``, so that it is set up from scratch.
+        '''
+        if self._repos_dict.pop(repo_name, None) is not None:
+            self._write()
+
+    def failures(self):
+        '''
+        :return: the step that failed and the error, for each repo whose last attempt failed
+        :rtype: dict
+        '''
+        return {repo_name: (entry_dict["failed_step"], entry_dict["error"])
+                    for repo_name, entry_dict in self._repos_dict.items() if "failed_step" in entry_dict}
+
+    def _read(self):
+        try:
+            with open(self.path) as file:
+                return json.load(file)["repos"]
+        except FileNotFoundError:
+            return {}
+        except (ValueError, KeyError) as ex:
+            raise ValueError(f"Setup state file '{self.path}' is corrupt, delete it to set up all repos again: {ex}")
+
+    def _write(self):
+        _os.makedirs(_os.path.dirname(self.path), exist_ok=True)
+        tmp_path                                        = self.path + ".tmp"
+        with open(tmp_path, "w") as file:
+            json.dump({"repos": self._repos_dict}, file, indent=4)
+        _os.replace(tmp_path, self.path)
@@ -0,0 +1,177 @@
+import hashlib                                                      as _hashlib
+import json
+import os                                                           as _os
+import threading                                                    as _threading
+
+from dataclasses                                                    import asdict, dataclass, fields
+
+
+@dataclass(frozen=True, slots=True)
+class ProfileSnapshot():
+
+    '''
+    Immutable copy of the values that limon reads from a user profile, compiled once so that setting up hundreds
+    of repos doesn't query the profile for each of them.
+
+    It exposes the same properties and methods as the :class:`UserProfile` it was compiled from, so it can be
+    used wherever the profile was. Repo lists are only compiled for the projects asked for when the snapshot was
+    made.
+
+    Snapshots are shared by all components in the process, and are also cached on disk (without secrets), so
+    that later CLI invocations don't parse the profile again. Either cache is only used while the profile's file
+    has the same size and modification time as when the snapshot was compiled. See :meth:`load`.
+    '''
+    USER:                                               str
+    USER_EMAIL:                                         str
+    BC_PATH:                                            str
+    WIN_CRED_PATH:                                      str
+    GH_ORGANIZATION:                                    str
+    REMOTE_ROOT:                                        str
+    ok_to_display_token:                                bool
+    branches_to_create:                                 tuple   # For development setups
+    operate_branches_to_create:                         tuple   # For operate setups
+    local_root:                                         str
+    operate_local_root:                                 str
+    repo_lists:                                         tuple   # Pairs of a project and a tuple of its repo names
+
+    def REPO_LIST(self, project):
+        for name, repo_name_l in self.repo_lists:
+            if name == project:
+                return list(repo_name_l)
+        raise ValueError(f"Project '{project}' was not compiled into the profile snapshot")
+
+    def BRANCHES_TO_CREATE(self, operate):
+        return list(self.operate_branches_to_create if operate else self.branches_to_create)
+
+    def LOCAL_ROOT(self, operate, root_folder):
+        if not root_folder is None:
+            return root_folder
+        return self.operate_local_root if operate else self.local_root
+
+    def OK_TO_DISPLAY_TOKEN(self):
+        return self.ok_to_display_token
+
+    def projects(self):
+        '''
+        :return: the projects whose repo lists were compiled into this snapshot
+        :rtype: list[str]
+        '''
+        return [name for name, _ in self.repo_lists]
+
+    def compile(profile, project_l):
+        '''
+        :param UserProfile profile: the profile to take a snapshot of
+        :param list[str] project_l: the projects whose repo lists are to be included
+        :rtype: ProfileSnapshot
+        '''
+        return ProfileSnapshot(USER                         = profile.USER,
+                               USER_EMAIL                   = profile.USER_EMAIL,
+                               BC_PATH                      = profile.BC_PATH,
+                               WIN_CRED_PATH                = profile.WIN_CRED_PATH,
+                               GH_ORGANIZATION              = profile.GH_ORGANIZATION,
+                               REMOTE_ROOT                  = profile.REMOTE_ROOT,
+                               ok_to_display_token          = bool(profile.OK_TO_DISPLAY_TOKEN()),
+                               branches_to_create           = tuple(profile.BRANCHES_TO_CREATE(False)),
+                               operate_branches_to_create   = tuple(profile.BRANCHES_TO_CREATE(True)),
+                               local_root                   = profile.LOCAL_ROOT(False, None),
+                               operate_local_root           = profile.LOCAL_ROOT(True, None),
+                               repo_lists                   = tuple((project, tuple(profile.REPO_LIST(project)))
+                                                                    for project in dict.fromkeys(project_l)))
+
+    # Snapshots loaded in this process, by profile path, along with the profile's signature when compiled
+    _loaded_dict                                        = {}
+    _loaded_lock                                        = _threading.Lock()
+
+    def load(profile_path, project_l, make_profile):
+        '''
+        :param str profile_path: location of the profile's file, like ".../sdlc.profiles/<name>/profile.toml"
+        :param list[str] project_l: the projects whose repo lists are needed
+        :param make_profile: function without arguments that parses the profile. It is only called if neither
+            the in-process nor the on-disk cache has an up-to-date snapshot with all the projects in ``project_l``
+        :return: a snapshot of the profile at ``profile_path``
+        :rtype: ProfileSnapshot
+        '''
+        signature                                       = ProfileSnapshot._signature(profile_path)
+        with ProfileSnapshot._loaded_lock:
+            cached_signature, snapshot                  = ProfileSnapshot._loaded_dict.get(profile_path, (None, None))
+        if snapshot is None or cached_signature != signature:
+            snapshot                                    = ProfileSnapshot._read_cache(profile_path, signature)
+
+        if not snapshot is None and all(project in snapshot.projects() for project in project_l):
+            with ProfileSnapshot._loaded_lock:
+                ProfileSnapshot._loaded_dict[profile_path] = (signature, snapshot)
+            return snapshot
+
+        # Keep the projects already compiled, so that alternating between projects doesn't recompile each time
+        previous_l                                      = [] if snapshot is None else snapshot.projects()
+        snapshot                                        = ProfileSnapshot.compile(make_profile(), previous_l + list(project_l))
+        with ProfileSnapshot._loaded_lock:
+            ProfileSnapshot._loaded_dict[profile_path]  = (signature, snapshot)
+        ProfileSnapshot._write_cache(profile_path, signature, snapshot)
+        return snapshot
+
+    def cache_path(profile_path):
+        '''
+        :return: where the on-disk snapshot for ``profile_path`` is kept: under the folder given by the
+            ``LIMON_CACHE_DIR`` environment variable if it is set, else under ``~/.limon/cache``
+        :rtype: str
+        '''
+        cache_dir                                       = _os.environ.get("LIMON_CACHE_DIR",
+                                                                          _os.path.expanduser("~/.limon/cache"))
+        digest                                          = _hashlib.sha1(_os.path.abspath(profile_path).encode()).hexdigest()
+        return f"{cache_dir}/profiles/{digest}.json"
+
+    def _signature(profile_path):
+        stat                                            = _os.stat(profile_path)
+        return [stat.st_size, stat.st_mtime_ns]
+
+    def _read_cache(profile_path, signature):
+        try:
+            with open(ProfileSnapshot.cache_path(profile_path)) as file:
+                content                                 = json.load(file)
+            if content["signature"] != signature:
+                return None
+            values                                      = content["snapshot"]
+            values["branches_to_create"]                = tuple(values["branches_to_create"])
+            values["operate_branches_to_create"]        = tuple(values["operate_branches_to_create"])
+            values["repo_lists"]                        = tuple((project, tuple(repo_name_l))
+                                                                for project, repo_name_l in values["repo_lists"])
+            return ProfileSnapshot(**{field.name: values[field.name] for field in fields(ProfileSnapshot)})
+        except (OSError, ValueError, KeyError, TypeError):
+            # A missing, corrupt or outdated cache just means that the profile gets parsed again
+            return None
+
+    def _write_cache(profile_path, signature, snapshot):
+        path                                            = ProfileSnapshot.cache_path(profile_path)
+        try:
+            _os.makedirs(_os.path.dirname(path), exist_ok=True)
+            # Write to a temporary file and rename it, so that concurrent readers never see a partial file
+            tmp_path                                    = f"{path}.{_os.getpid()}.tmp"
+            with open(tmp_path, "w") as file:
+                json.dump({"signature": signature, "snapshot": asdict(snapshot)}, file)
+            _os.replace(tmp_path, path)
+        except OSError:
+            pass # The cache is an optimization, so not being able to write it is not an error
+
+
+@dataclass(frozen=True, slots=True)
+class BundleSnapshot():
+
+    '''
+    Immutable copy of the repos of a :class:`RepoBundle`, so that workflows that ask for the repo names at every
+    step don't rebuild the bundle's list each time.
+
+    Bundles are defined in code rather than in files, so their snapshots are only cached in memory, by the
+    :class:`RepoAdministration` that owns the bundle.
+    '''
+    repo_infos:                                         tuple
+    repo_names:                                         tuple   # Sorted
+
+    def compile(repo_bundle):
+        '''
+        :param RepoBundle repo_bundle: the bundle to take a snapshot of
+        :rtype: BundleSnapshot
+        '''
+        repo_info_l                                     = tuple(repo_bundle.bundled_repos())
+        return BundleSnapshot(repo_infos    = repo_info_l,
+                              repo_names    = tuple(sorted(repo_info.name for repo_info in repo_info_l)))
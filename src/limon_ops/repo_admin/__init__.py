@@ -0,0 +1,10 @@
+from limon_ops.util.lazy_import                                     import lazy_attributes
+
+# Sub-modules pull in pandas and the Conway inspectors, so they are only imported when one of these attributes is 
+# first used
+#
+__getattr__                                                         = lazy_attributes(__name__, {
+                                                                        "RepoAdministration":       "repo_administration",
+                                                                        "BranchLifecycleManager":   "branch_lifecycle_manager",
+                                                                        "BundleOrchestrator":       "bundle_orchestrator",
+                                                                    })
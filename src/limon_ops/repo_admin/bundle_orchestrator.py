@@ -0,0 +1,279 @@
+import asyncio
+import inspect                                                      as _inspect
+import os                                                           as _os
+
+from conway_ops.onboarding.git_usage                                import GitUsage
+from conway_ops.repo_admin.repo_statics                             import RepoStatics
+from limon_ops.observability.tracer                                 import Tracer
+from limon_ops.repo_admin.repo_administration                       import RepoAdministration
+from limon_ops.repo_admin.repo_maintenance                          import RepoMaintenance
+from limon_ops.util.lazy_import                                     import LazyImport
+from limon_ops.util.rate_budget                                     import RateBudget
+
+_pd                                                                 = LazyImport("pandas")
+
+
+class BundleOrchestrator():
+
+    '''
+    Runs limon's work across many repo bundles and projects at once, where :class:`RepoAdministration` (and so
+    :class:`BranchLifecycleManager`) acts on one :class:`RepoBundle` and :class:`RepoSetup` on one project.
+
+    All the work of a call (stats, reports, maintenance, branch workflows or setups) is scheduled on one event loop,
+    so that it shares global budgets:
+
+    * at most ``max_concurrency`` units of work are in flight at once: repos for :meth:`repo_stats`,
+      :meth:`divergence` and :meth:`maintain`, bundles for :meth:`create_repo_reports` and :meth:`run_workflow`,
+      and projects for :meth:`setup`. GIT processes are also bounded by :attr:`GitSubprocess.MAX_PROCESSES`, which
+      now applies across all bundles since they share the event loop.
+    * if ``remote_calls_per_s`` is given, GIT commands that talk to a remote and GitHub API calls are paced by one
+      :class:`RateBudget`, across all bundles.
+
+    Bundles often share repos. A repo is identified by its local folder, and a repo in several bundles is assigned
+    to the first of them (in the order of ``admins_dict``), so that it is only acted on once. See
+    :meth:`assignments`.
+
+    A bundle that fails doesn't stop the others: all failures are reported together at the end, with a
+    ``ValueError``. Example::
+
+        orchestrator = BundleOrchestrator({"scratch": scratch_manager, "billing": billing_manager},
+                                          max_concurrency=32, remote_calls_per_s=10)
+        stats_df     = orchestrator.repo_stats()
+        orchestrator.run_workflow("work_on_feature", "story_1455")
+
+    :param dict admins_dict: the :class:`RepoAdministration` objects to orchestrate, one per bundle, keyed by a name
+        for the bundle. Example: {"scratch": manager}
+    :param int max_concurrency: most units of work in flight at once, across all bundles
+    :param float remote_calls_per_s: optional average number of calls per second to remotes (GIT fetches, pushes,
+        clones, etc., and GitHub API calls) across all bundles. By default they are not paced
+    :param int remote_burst: most calls to remotes at once when they were not made for a while. Defaults to
+        ``remote_calls_per_s``
+    '''
+    def __init__(self, admins_dict, max_concurrency=16, remote_calls_per_s=None, remote_burst=None):
+        self.admins_dict                                = dict(admins_dict)
+        self.max_concurrency                            = max_concurrency
+        self.remote_calls_per_s                         = remote_calls_per_s
+        self.remote_burst                               = remote_burst
+
+        # Budget of the last call, kept so that callers can see how much it throttled. See :meth:`_run`
+        self.rate_budget                                = None
+
+    BUNDLE_COL                                          = "Bundle"
+
+    def assignments(self):
+        '''
+        :return: for each bundle name, the names of the repos of its bundle that are acted on through it. A repo
+            that is in several bundles, with the same local folder, is only assigned to the first of them
+        :rtype: dict
+        '''
+        seen_s                                          = set()
+        result_dict                                     = {}
+        for name, admin in self.admins_dict.items():
+            result_dict[name]                           = []
+            for repo_name in admin.repo_names():
+                key                                     = _os.path.realpath(_os.path.join(admin.local_root, repo_name))
+                if not key in seen_s:
+                    seen_s.add(key)
+                    result_dict[name].append(repo_name)
+        return result_dict
+
+    def repo_stats(self, git_usage=GitUsage.git_local_and_remote):
+        '''
+        :param GitUsage git_usage: which GIT areas to get stats for, as in :meth:`RepoAdministration.repo_stats`
+        :return: the stats of :meth:`RepoAdministration.repo_stats` for the repos of all bundles, with the bundle
+            each repo was assigned to. Sorted by bundle, repo, and local or remote
+        :rtype: :class:`pandas.DataFrame`
+        '''
+        RS                                              = RepoStatics
+
+        async def _one_repo(name, admin, repo_name):
+            stats_df                                    = await admin._repo_stats(git_usage, [repo_name])
+            stats_df.insert(0, self.BUNDLE_COL, name)
+            return stats_df
+
+        df_l                                            = self._run("repo_stats", self._per_repo(_one_repo))
+        if len(df_l) == 0:
+            return _pd.DataFrame(columns=[self.BUNDLE_COL])
+        result_df                                       = _pd.concat(df_l, ignore_index=True)
+        return result_df.sort_values(by=[self.BUNDLE_COL, RS.REPO_NAME_COL, RS.LOCAL_OR_REMOTE_COL], ignore_index=True)
+
+    def divergence(self):
+        '''
+        :return: the divergences of :meth:`RepoAdministration.divergence` between local and remote branches, for
+            the repos of all bundles, with the bundle each repo was assigned to. Sorted by bundle, repo and branch
+        :rtype: :class:`pandas.DataFrame`
+        '''
+        RA                                              = RepoAdministration
+
+        async def _one_repo(name, admin, repo_name):
+            return [[name] + row for row in await admin._repo_divergence(repo_name)]
+
+        row_l_l                                         = self._run("divergence", self._per_repo(_one_repo))
+        columns                                         = [self.BUNDLE_COL, RepoStatics.REPO_NAME_COL, RA.LOCAL_BRANCH_COL,
+                                                           RA.REMOTE_BRANCH_COL, RA.AHEAD_COL, RA.BEHIND_COL]
+        result_df                                       = _pd.DataFrame(data    = [row for row_l in row_l_l for row in row_l],
+                                                                        columns = columns)
+        return result_df.sort_values(by=[self.BUNDLE_COL, RepoStatics.REPO_NAME_COL, RA.LOCAL_BRANCH_COL],
+                                     ignore_index=True)
+
+    def maintain(self, force=False):
+        '''
+        Maintains the local repos of all bundles that are due for it, as per :class:`RepoMaintenance`.
+
+        :param bool force: If True, repos are maintained even if they are not due
+        :return: for each repo that was maintained, how long the queries that maintenance speeds up took before and
+            after it, with the bundle the repo was assigned to
+        :rtype: :class:`pandas.DataFrame`
+        '''
+        RM                                              = RepoMaintenance
+        maintenance_dict                                = {name: RM(admin) for name, admin in self.admins_dict.items()}
+
+        async def _one_repo(name, admin, repo_name):
+            return [[name] + row for row in await maintenance_dict[name]._maintain(repo_name, force)]
+
+        row_l_l                                         = self._run("maintain", self._per_repo(_one_repo))
+        return _pd.DataFrame(data       = [row for row_l in row_l_l for row in row_l],
+                             columns    = [self.BUNDLE_COL, RM.REPO_COL, RM.QUERY_COL, RM.BEFORE_COL, RM.AFTER_COL])
+
+    def create_repo_reports(self, publications_folder, **kwargs):
+        '''
+        Creates the report of :meth:`RepoAdministration.create_repo_report` for each bundle, in the folder
+        ``<publications_folder>/<bundle name>``. Each report covers the repos assigned to its bundle.
+
+        :param str publications_folder: Root directory under which each bundle's reports are saved
+        :param kwargs: other parameters of :meth:`RepoAdministration.create_repo_report`, like ``git_usage`` or
+            ``include_analytics``
+        :return: the folder of each bundle's report, keyed by bundle name
+        :rtype: dict
+        '''
+        folder_dict                                     = {name: f"{publications_folder}/{name}"
+                                                            for name in self.admins_dict.keys()}
+
+        def _one_bundle(name, admin, repo_name_l):
+            return admin._create_repo_report(folder_dict[name], repos_in_scope_l=repo_name_l, **kwargs)
+
+        self._run("create_repo_reports", self._per_bundle("create_repo_report", _one_bundle))
+        return folder_dict
+
+    def run_workflow(self, workflow, *args, **kwargs):
+        '''
+        Runs the same branch workflow for all bundles, concurrently. Each bundle's workflow acts on the repos
+        assigned to it, so a repo shared by several bundles goes through the workflow once.
+
+        :param str workflow: name of the workflow, as a method of the administrations. Example: "work_on_feature"
+        :param args: positional parameters of the workflow. Example: "story_1455"
+        :param kwargs: keyword parameters of the workflow
+        :return: the result of the workflow for each bundle, keyed by bundle name
+        :rtype: dict
+        :raises ValueError: if some administration has no workflow called ``workflow``, before any bundle is run
+        '''
+        entry_dict                                      = {name: BundleOrchestrator._workflow_entry(admin, workflow)
+                                                            for name, admin in self.admins_dict.items()}
+
+        def _one_bundle(name, admin, repo_name_l):
+            return entry_dict[name](*args, repos_in_scope_l=repo_name_l, **kwargs)
+
+        task_l                                          = self._per_bundle(workflow, _one_bundle)
+        return dict(zip([name for name, _ in task_l], self._run(workflow, task_l)))
+
+    def _workflow_entry(admin, workflow):
+        '''
+        :param RepoAdministration admin: the administration that runs the workflow
+        :param str workflow: name of the workflow. Example: "work_on_feature"
+        :return: the async implementation of the workflow ``workflow`` of ``admin``, i.e., its method
+            ``_<workflow>``, which takes the repos to act on as its ``repos_in_scope_l`` parameter
+        :raises ValueError: if ``admin`` has no such workflow
+        '''
+        entry                                           = getattr(admin, "_" + workflow, None)
+        if workflow.startswith("_") or not callable(getattr(admin, workflow, None)) \
+                or not _inspect.iscoroutinefunction(entry) \
+                or not "repos_in_scope_l" in _inspect.signature(entry).parameters:
+            raise ValueError(f"'{workflow}' is not a workflow of {type(admin).__name__}, so it can't be orchestrated")
+        return entry
+
+    def setup(self, repo_setup, project_l, operate=False, root_folder=None, journaled=False):
+        '''
+        Sets up several projects at once, as :meth:`RepoSetup.setup` does for one. Projects are cloned in their own
+        folders, so they don't share repos.
+
+        :param RepoSetup repo_setup: the setup for the user profile that lists the projects
+        :param list[str] project_l: names of the projects to set up
+        :param bool operate: as in :meth:`RepoSetup.setup`
+        :param str root_folder: as in :meth:`RepoSetup.setup`
+        :param bool journaled: as in :meth:`RepoSetup.setup`
+        :return: the result of :meth:`RepoSetup.setup` for each project, keyed by project name
+        :rtype: dict
+        '''
+        def _one_project(project):
+            return lambda: repo_setup._supervisor(project, None, operate, root_folder, journaled)
+
+        task_l                                          = [(project, _one_project(project)) for project in project_l]
+        return dict(zip(project_l, self._run("setup", task_l)))
+
+    def _per_repo(self, one_repo):
+        '''
+        :param one_repo: coroutine function that acts on one repo, given the bundle name, administration and repo name
+        :return: the tasks for :meth:`_run`, one per repo assigned to a bundle
+        :rtype: list[tuple]
+        '''
+        task_l                                          = []
+        for name, repo_name_l in self.assignments().items():
+            admin                                       = self.admins_dict[name]
+            for repo_name in repo_name_l:
+                task_l.append((f"{name}/{repo_name}",
+                               lambda name=name, admin=admin, repo_name=repo_name: one_repo(name, admin, repo_name)))
+        return task_l
+
+    def _per_bundle(self, workflow, one_bundle):
+        '''
+        :param str workflow: name of the bundles' workflow, for tracing. Example: "work_on_feature"
+        :param one_bundle: coroutine function that runs a bundle's workflow, given the bundle name, administration
+            and the names of the repos assigned to the bundle, which are the only ones it must act on
+        :return: the tasks for :meth:`_run`, one per bundle with repos assigned to it
+        :rtype: list[tuple]
+        '''
+        async def _traced(name, repo_name_l):
+            # Like RepoAdministration._run_workflow does, so that the bundle's progress can be followed
+            with Tracer.tracer().span(workflow, "workflow", repos=list(repo_name_l)):
+                return await one_bundle(name, self.admins_dict[name], repo_name_l)
+
+        return [(name, lambda name=name, repo_name_l=repo_name_l: _traced(name, repo_name_l))
+                for name, repo_name_l in self.assignments().items() if len(repo_name_l) > 0]
+
+    def _run(self, name, task_l):
+        '''
+        Runs the tasks ``task_l`` on one event loop, within the global budgets.
+
+        :param str name: name of the work, for tracing. Example: "repo_stats"
+        :param list[tuple] task_l: pairs of a name for the task (e.g., a bundle or repo) and a function that returns
+            its coroutine. Functions are only called when their task starts, so that workflows start (and check
+            their preconditions) within the budgets
+        :return: the results of the tasks, in the order of ``task_l``
+        :rtype: list
+        :raises ValueError: if any task failed, once all tasks are done
+        '''
+        assignments_dict                                = self.assignments()
+        repos_l                                         = [repo_name for repo_name_l in assignments_dict.values()
+                                                            for repo_name in repo_name_l]
+        self.rate_budget                                = None
+        if not self.remote_calls_per_s is None:
+            self.rate_budget                            = RateBudget(self.remote_calls_per_s, self.remote_burst)
+
+        async def _one_task(semaphore, task):
+            async with semaphore:
+                return await task()
+
+        async def _supervisor():
+            RateBudget.install(self.rate_budget)
+            semaphore                                   = asyncio.Semaphore(self.max_concurrency)
+            return await asyncio.gather(*[_one_task(semaphore, task) for _, task in task_l], return_exceptions=True)
+
+        with Tracer.tracer().span(name, "workflow", repos=repos_l, bundles=list(self.admins_dict.keys())):
+            result_l                                    = asyncio.run(_supervisor())
+
+        failed_l                                        = [f"{task_name}: {result}" for (task_name, _), result in zip(task_l, result_l)
+                                                            if isinstance(result, Exception)]
+        if len(failed_l) > 0:
+            raise ValueError(f"'{name}' failed for {len(failed_l)} of {len(task_l)} task(s):\n\t"
+                             + "\n\t".join(failed_l))
+        return result_l
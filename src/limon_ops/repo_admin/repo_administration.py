@@ -1,20 +1,37 @@
 import asyncio
+import collections                                                  as _collections
+import contextlib                                                   as _contextlib
+import os                                                           as _os
+import threading                                                    as _threading
 
 from pathlib                                                        import Path
 
-import pandas                                                       as _pd
-import xlsxwriter
-
 from conway.async_utils.ushering_to                                 import UsheringTo
-from conway.observability.logger                                    import Logger
-from conway.reports.report_writer                                   import ReportWriter
 from conway.util.yaml_utils                                         import YAML_Utils
 
 from conway_ops.onboarding.git_usage                                import GitUsage
 from conway_ops.repo_admin.repo_statics                             import RepoStatics
-from conway_ops.repo_admin.repo_inspector_factory                   import RepoInspectorFactory
-from conway_ops.repo_admin.repo_inspector                           import RepoInspector
+from limon_ops.observability.structured_log                         import StructuredLog
+from limon_ops.observability.tracer                                 import Tracer
+from limon_ops.onboarding.snapshots                                 import BundleSnapshot
+from limon_ops.repo_admin.repo_analytics                            import RepoAnalytics
+from limon_ops.repo_admin.repo_maintenance                          import RepoMaintenance
+from limon_ops.util.git_credentials                                 import GitCredentials
 from limon_ops.util.git_local_client                                import GitLocalClient
+from limon_ops.util.git_object_reader                               import GitObjectReader, GitObjectReaderError
+from limon_ops.util.lazy_import                                     import LazyImport
+
+# Heavy dependencies (pandas, xlsxwriter and the GitPython-based inspectors) are only needed by reports and stats,
+# so defer their import until first use to keep branch workflows and CLI invocations fast to start
+#
+_pd                                                                 = LazyImport("pandas")
+xlsxwriter                                                          = LazyImport("xlsxwriter")
+ReportWriter                                                        = LazyImport("conway.reports.report_writer",
+                                                                                 "ReportWriter")
+RepoInspectorFactory                                                = LazyImport("conway_ops.repo_admin.repo_inspector_factory",
+                                                                                 "RepoInspectorFactory")
+RepoInspector                                                       = LazyImport("conway_ops.repo_admin.repo_inspector",
+                                                                                 "RepoInspector")
 
 
 
@@ -55,24 +72,99 @@ class RepoAdministration():
             self.github_token                           = secrets_dict['secrets']['github_token']  
         else:
             self.github_token                           = None          
- 
-    async def branches(self, repo_name):
+
+        # When the remote is in GitHub, GIT needs our specific user and token to push to it. They are handed to GIT
+        # in memory, for all commands, rather than written into the remotes' URLs
+        #
+        if not self.github_token is None and not self.remote_gh_user is None:
+            GitCredentials.register("https://github.com", self.remote_gh_user, self.github_token)
+
+        # Repos of the bundle, compiled on first use. See :meth:`repo_names`
+        self._bundle_snapshot                           = None
+
+        # Inspectors opened so far, most recently used last. See :meth:`inspector`
+        self._inspectors_dict                           = _collections.OrderedDict()
+        self._inspectors_lock                           = _threading.Lock()
+
+    # Most inspectors kept open at once. Each holds an opened GitPython repo or, for GitHub remotes, an HTTP session
+    MAX_INSPECTORS                                      = 64
+
+    def inspector(self, root, repo_name):
         '''
+        :param str root: parent folder or URL of the repo, typically ``self.local_root`` or ``self.remote_root``
+        :return: the inspector for the repo ``repo_name`` under ``root``. Inspectors are cached, so that workflows
+            with several steps (and, under the :class:`LimonDaemon`, successive CLI commands) reuse the opened repo
+            or HTTP session instead of building them again. A cached inspector is discarded if the repo's folder
+            was replaced since it was opened (e.g., the repo was cloned again), and the least recently used
+            inspectors are discarded once there are more than :attr:`MAX_INSPECTORS`.
+        :rtype: RepoInspector
+        '''
+        key                                             = (root, repo_name)
+        signature                                       = self._repo_signature(root, repo_name)
+        with self._inspectors_lock:
+            cached                                      = self._inspectors_dict.get(key)
+            if not cached is None and cached[0] == signature:
+                self._inspectors_dict.move_to_end(key)
+                return cached[1]
+
+        inspector                                       = RepoInspectorFactory.findInspector(root, repo_name)
+        with self._inspectors_lock:
+            self._inspectors_dict[key]                  = (signature, inspector)
+            self._inspectors_dict.move_to_end(key)
+            while len(self._inspectors_dict) > self.MAX_INSPECTORS:
+                self._inspectors_dict.popitem(last=False)
+        return inspector
+
+    def forget_inspectors(self):
+        '''
+        Discards all cached inspectors, so that the next call to :meth:`inspector` opens each repo again.
+        '''
+        with self._inspectors_lock:
+            self._inspectors_dict.clear()
+
+    def _repo_signature(self, root, repo_name):
+        '''
+        :return: the identity of the GIT metadata of the repo ``repo_name`` under ``root``, which changes if the
+            repo was deleted and created again (e.g., cloned anew). None if ``root`` is not a folder (e.g., a URL)
+            or the repo doesn't exist.
+        :rtype: tuple
+        '''
+        # GOTCHA:
+        #       Inode numbers alone are not enough, since file systems reuse them right away when a folder is
+        #   deleted and created again. So also use the change time of the repo's config file, which GIT only
+        #   rewrites when a setting changes. Bare repos (like remotes in the file system) have it at the top level
+        #
+        repo_path                                       = f"{root}/{repo_name}"
+        for config_path in [repo_path + "/.git/config", repo_path + "/config", repo_path + "/.git"]:
+            try:
+                config_stat                             = _os.stat(config_path)
+            except (OSError, ValueError):
+                continue
+            return (config_path, config_stat.st_dev, config_stat.st_ino, config_stat.st_ctime_ns)
+        return None
+
+    async def branches(self, repo_name, prefix=""):
+        '''
+        :param str prefix: optional start of the names of the branches wanted. Example: "story_". By default all
+            branches are returned.
         :return: branches in local repo
         :rtype: list[str]
         '''
         executor                = GitLocalClient(self.local_root + "/" + repo_name)
 
-        git_result              = await executor.execute("git branch")
-
-        # git_result is something like
+        # Branches are read in-process from the repo's refs, which is much faster than parsing the output of
+        # "git branch". The executor falls back to running GIT if the refs can't be read in-process.
         #
-        #       '  ah-dev\n  integration\n  operate\n* story_1455\n  story_1485'
-        #
-        # so to get a list we must split by new lines and strip spaces and the '*'
-
-        branch_l                = [b.strip("*").strip() for b in git_result.split("\n")]
+        branch_l                = await executor.branches(prefix)
         return branch_l
+
+    async def branch_exists(self, repo_name, branch_name):
+        '''
+        :return: True if the local repo called ``repo_name`` has a branch called ``branch_name``
+        :rtype: bool
+        '''
+        executor                = GitLocalClient(self.local_root + "/" + repo_name)
+        return await executor.branch_exists(branch_name)
     
     async def is_branch_merged_to_destination(self, repo_name, branch_name, destination_branch):
         '''
@@ -82,39 +174,101 @@ class RepoAdministration():
         '''
         executor                = GitLocalClient(self.local_root + "/" + repo_name)
 
-        git_result              = await executor.execute("git branch --merged " + str(destination_branch))
-
-        # git_result is something like
-        #
-        #       '  ah-dev\n  integration\n  operate\n* story_1455\n  story_1485'
+        # Stream the merged branches, so that repos with many branches stop as soon as ``branch_name`` is found
         #
-        # so to get a list we must split by new lines and strip spaces and the '*'
+        argv                    = ["git", "for-each-ref", "--format=%(refname:short)", 
+                                   "--merged", str(destination_branch), "refs/heads/"]
+        async with _contextlib.aclosing(executor.stream_argv(argv)) as merged_branches:
+            async for merged_branch in merged_branches:
+                if merged_branch == branch_name:
+                    return True
+        return False
 
-        branch_l                = [b.strip("*").strip() for b in git_result.split("\n")]
-
-        if branch_name in branch_l:
-            return True
-        else:
-            return False
-    
     def repo_names(self):
         '''
         :return: names of all the repos in this :class:`RepoAdministration`'s repo bundle.
         :rtype: list[str]
         '''
-        return sorted([repo_info.name for repo_info in self.repo_bundle.bundled_repos()])
+        if self._bundle_snapshot is None:
+            self._bundle_snapshot                       = BundleSnapshot.compile(self.repo_bundle)
+        return list(self._bundle_snapshot.repo_names)
        
+    def prefetch(self, branch_l, optional_branch_l=None, repos_in_scope_l=None, max_concurrency=8):
+        '''
+        Synchronous version of :meth:`_prefetch`, for callers that are not already in an event loop.
+        '''
+        return asyncio.run(self._prefetch(branch_l, optional_branch_l, repos_in_scope_l, max_concurrency))
+
+    async def _prefetch(self, branch_l, optional_branch_l=None, repos_in_scope_l=None, max_concurrency=8):
+        '''
+        Bundle-wide fetch stage, meant to run at the start of a workflow so that its subsequent steps can work
+        against local refs only, instead of each step opening its own session with the remote.
+
+        In each repo a single ``git fetch --prune`` is made for just the branches given, into their
+        remote-tracking refs (like ``refs/remotes/origin/integration``), with:
+
+        * ``fetch.negotiationAlgorithm=skipping``, which sends fewer "have" lines to the remote when the local repo
+          has many commits the remote does not, so negotiation takes fewer round trips
+        * ``fetch.writeCommitGraph=true``, so that later ancestry checks and logs are faster
+
+        Repos are fetched concurrently, but no more than ``max_concurrency`` at a time.
+
+        :param list[str] branch_l: branches that must exist in the remote. Example: ["integration", "master"]
+        :param list[str] optional_branch_l: branches to fetch if they exist in the remote (like a feature branch
+            that may not have been pushed yet)
+        :param list[str] repos_in_scope_l: repos to fetch. Defaults to all repos in the bundle.
+        :param int max_concurrency: maximum number of repos fetched at the same time
+        '''
+        repo_name_l                                     = self.repo_names() if repos_in_scope_l is None else repos_in_scope_l
+        optional_branch_l                               = [] if optional_branch_l is None else \
+                                                            [branch for branch in optional_branch_l if not branch in branch_l]
+        semaphore                                       = asyncio.Semaphore(max_concurrency)
+
+        def _argv(branches):
+            return ["git", "-c", "fetch.negotiationAlgorithm=skipping", "-c", "fetch.writeCommitGraph=true",
+                    "fetch", "--prune", "origin"] \
+                    + [f"+refs/heads/{branch}:refs/remotes/origin/{branch}" for branch in branches]
+
+        async def _prefetch_one(repo_name):
+            async with semaphore:
+                executor                                = GitLocalClient(self.local_root + "/" + repo_name)
+                exit_status, _, stderr                  = await executor.execute_argv_unchecked(
+                                                                _argv(branch_l + optional_branch_l))
+                if exit_status != 0 and len(optional_branch_l) > 0 and "couldn't find remote ref" in stderr:
+                    # GIT fails the whole fetch if any branch is missing, so try again with required branches only
+                    exit_status, _, stderr              = await executor.execute_argv_unchecked(_argv(branch_l))
+                return repo_name, exit_status, stderr
+
+        with Tracer.tracer().span("prefetch", "workflow", repos=len(repo_name_l)):
+            results_l                                   = await asyncio.gather(*[_prefetch_one(repo_name) 
+                                                                                 for repo_name in repo_name_l])
+
+        failed_l                                        = [f"{repo_name}: {stderr.strip()}" 
+                                                            for repo_name, exit_status, stderr in results_l
+                                                            if exit_status != 0]
+        if len(failed_l) > 0:
+            raise ValueError("Could not fetch from the remote in these repo(s):\n\t" + "\n\t".join(failed_l))
+        optional                                        = "" if len(optional_branch_l) == 0 \
+                                                            else f" (and {', '.join(optional_branch_l)} where they exist)"
+        self.log_info(f"Fetched {', '.join(branch_l)}{optional} in {len(repo_name_l)} repo(s)")
+
     def current_local_branch(self, repo_name):
         '''
         Returns the name of the current branch in the local repo identified by ``repo_name``
         '''
-        inspector                                   = RepoInspectorFactory.findInspector(self.local_root, repo_name)
+        # Read HEAD in-process if possible, since this is called for every repo at the start of many workflows
+        try:
+            return GitObjectReader(self.local_root + "/" + repo_name).current_branch()
+        except (GitObjectReaderError, OSError):
+            pass
+        inspector                                   = self.inspector(self.local_root, repo_name)
         return inspector.current_branch()
 
     def create_repo_report(self, publications_folder, 
                            repos_in_scope_l             = None, 
                            git_usage                    = GitUsage.git_local_and_remote,
-                           mask_nondeterministic_data   = False):
+                           mask_nondeterministic_data   = False,
+                           include_analytics            = False):
         '''
         Creates an Excel report with multiple worksheets, as follows:
 
@@ -123,6 +277,9 @@ class RepoAdministration():
         * For each repo name, there are two worksheets, containing log information for the local and remote
             repos with those names.
 
+        * Optionally, there are worksheets with analytics across all local repos (see :class:`RepoAnalytics`):
+            commits per author per week, churn per file, and divergence between local and remote branches.
+
         :param str publications_folder: Root directory for a folder structure under which all reports
             must be saved. The Excel report created by this method will be saved in the subdirectory
             ``/Operator Reports/DevOps/`` under this root ``publications_folder``.
@@ -133,8 +290,23 @@ class RepoAdministration():
         :param bool mask_nondeterministic_data: If True, then any data that is non-deterministic (such as dates or hash 
             codes) is masked. This is False by default. Typical use case for masking is in test cases that need 
             determinism.
+        :param bool include_analytics: If True, then the analytics worksheets are added after the log worksheets.
+            This is False by default.
         :rtype: None
         '''
+        return self._run_workflow("create_repo_report",
+                                  self._create_repo_report(publications_folder, repos_in_scope_l, git_usage,
+                                                           mask_nondeterministic_data, include_analytics),
+                                  repos_in_scope_l)
+
+    async def _create_repo_report(self, publications_folder,
+                                  repos_in_scope_l              = None,
+                                  git_usage                     = GitUsage.git_local_and_remote,
+                                  mask_nondeterministic_data    = False,
+                                  include_analytics             = False):
+        '''
+        Async implementation of :meth:`create_repo_report`.
+        '''
 
         # First, set up common static variables 
         RS                                                  = RepoStatics
@@ -150,62 +322,89 @@ class RepoAdministration():
         workbook                                            = xlsxwriter.Workbook(STATS_DIRECTORY + "/" + STATS_FILENAME)
         writer                                              = ReportWriter()
 
-
         # Now generate and save the stats worksheet
-        stats_df                                            = self.repo_stats(git_usage, repos_in_scope_l)
+        stats_df                                                = await self._repo_stats(git_usage, repos_in_scope_l)
         if mask_nondeterministic_data:
-            stats_df[RS.LAST_COMMIT_TIMESTAMP_COL]          = MASKED_MSG
-            stats_df[RS.LAST_COMMIT_HASH_COL]               = MASKED_MSG
+            stats_df[RS.LAST_COMMIT_TIMESTAMP_COL]              = MASKED_MSG
+            stats_df[RS.LAST_COMMIT_HASH_COL]                   = MASKED_MSG
 
-        async def _supervisor():    
-            worksheet                                           = workbook.add_worksheet(RS.REPORT_REPO_STATS_WORKSHEET)
-            widths_dict                                         = {RS.REPO_NAME_COL:               20,
+        worksheet                                               = workbook.add_worksheet(RS.REPORT_REPO_STATS_WORKSHEET)
+        widths_dict                                             = {RS.REPO_NAME_COL:               20,
                                                                     RS.LOCAL_OR_REMOTE_COL:         15,
                                                                     RS.LAST_COMMIT_COL:             40,
                                                                     RS.LAST_COMMIT_TIMESTAMP_COL:   30,
                                                                     RS.LAST_COMMIT_HASH_COL:        45}
-            async with UsheringTo(result_l = []) as usher: # We don't care about the results, so use an discardable list
-                
-                usher                                           += asyncio.to_thread(
-                                                                    writer.populate_excel_worksheet,
+        async with UsheringTo(result_l = []) as usher: # We don't care about the results, so use an discardable list
+
+            usher                                               += asyncio.to_thread(
+                                                                    self._populate_worksheet,
+                                                                    writer,
                                                                     stats_df, 
                                                                     workbook, 
                                                                     worksheet, 
                                                                     widths_dict=widths_dict
                                                                     )
-                
-                # Now generate and save the multiple log worksheets
-                all_repos_logs_dict                             = self._repo_logs(git_usage, repos_in_scope_l)
-                for repo_name in all_repos_logs_dict.keys():
-                    a_repo_logs_dict                            = all_repos_logs_dict[repo_name]
-                    for instance_type in a_repo_logs_dict.keys(): # instance_type refers to local vs remote repos
-                        log_df                                  = a_repo_logs_dict[instance_type]
-                        if mask_nondeterministic_data:
-                            log_df[RS.COMMIT_DATE_COL]          = MASKED_MSG
-                            log_df[RS.COMMIT_HASH_COL]          = MASKED_MSG
-                            log_df[RS.COMMIT_AUTHOR_COL]        = MASKED_MSG
-
-                        sheet_name                              = RepoAdministration.worksheet_for_log(repo_name, 
+
+            # Now generate and save the multiple log worksheets
+            all_repos_logs_dict                                 = await self._repo_logs(git_usage, repos_in_scope_l)
+            for repo_name in all_repos_logs_dict.keys():
+                a_repo_logs_dict                                = all_repos_logs_dict[repo_name]
+                for instance_type in a_repo_logs_dict.keys(): # instance_type refers to local vs remote repos
+                    log_df                                      = a_repo_logs_dict[instance_type]
+                    if mask_nondeterministic_data:
+                        log_df[RS.COMMIT_DATE_COL]              = MASKED_MSG
+                        log_df[RS.COMMIT_HASH_COL]              = MASKED_MSG
+                        log_df[RS.COMMIT_AUTHOR_COL]            = MASKED_MSG
+
+                    sheet_name                                  = RepoAdministration.worksheet_for_log(repo_name, 
                                                                                                         instance_type)
-                        worksheet                               = workbook.add_worksheet(sheet_name)
-                        widths_dict                             = {RS.COMMIT_DATE_COL:             30,
+                    worksheet                                   = workbook.add_worksheet(sheet_name)
+                    widths_dict                                 = {RS.COMMIT_DATE_COL:             30,
                                                                     RS.COMMIT_SUMMARY_COL:          35,
                                                                     RS.COMMIT_FILE_COL:             65,
                                                                     RS.COMMIT_HASH_COL:             45,
                                                                     RS.COMMIT_AUTHOR_COL:           40
                         }
-                        usher                                           += asyncio.to_thread(
-                                                                            writer.populate_excel_worksheet,
+                    usher                                               += asyncio.to_thread(
+                                                                            self._populate_worksheet,
+                                                                            writer,
                                                                             log_df, 
                                                                             workbook, 
                                                                             worksheet, 
                                                                             widths_dict=widths_dict, 
                                                                             freeze_col_nb=3
                                                                             )
-                                                            
+
+            if include_analytics:
+                analytics                                       = RepoAnalytics(self)
+                analytics_dict                                  = await analytics.worksheets(repos_in_scope_l)
+                for sheet_name, analytics_df in analytics_dict.items():
+                    if mask_nondeterministic_data:
+                        for col in [RepoAnalytics.WEEK_COL, RepoAnalytics.AUTHOR_COL]:
+                            if col in analytics_df.columns:
+                                analytics_df[col]               = MASKED_MSG
+                    worksheet                                   = workbook.add_worksheet(sheet_name)
+                    widths_dict                                 = {col: 30 for col in analytics_df.columns}
+                    if RepoAnalytics.FILE_COL in analytics_df.columns:
+                        widths_dict[RepoAnalytics.FILE_COL] = 65
+                    usher                                       += asyncio.to_thread(
+                                                                    self._populate_worksheet,
+                                                                    writer,
+                                                                    analytics_df, 
+                                                                    workbook, 
+                                                                    worksheet, 
+                                                                    widths_dict=widths_dict
+                                                                    )
+
+        with Tracer.tracer().span("save workbook", "report", path=STATS_DIRECTORY + "/" + STATS_FILENAME):
             workbook.close()
 
-        return asyncio.run(_supervisor())
+    def _populate_worksheet(self, writer, df, workbook, worksheet, **kwargs):
+        '''
+        Helper method to write ``df`` to ``worksheet`` with ``writer``, recording how long it takes.
+        '''
+        with Tracer.tracer().span("populate worksheet", "report", worksheet=worksheet.get_name(), rows=len(df)):
+            writer.populate_excel_worksheet(df, workbook, worksheet, **kwargs)
 
     def worksheet_for_log(repo_name, instance_type):
         '''
@@ -232,6 +431,12 @@ class RepoAdministration():
             remote, whether it has unchecked or untracked files, and most recent commit.
         :rtype: :class:`pandas.DataFrame`
         '''
+        return self._run_workflow("repo_stats", self._repo_stats(git_usage, repos_in_scope_l), repos_in_scope_l)
+
+    async def _repo_stats(self, git_usage, repos_in_scope_l=None):
+        '''
+        Async implementation of :meth:`repo_stats`, which processes all repos concurrently.
+        '''
         RS                                              = RepoStatics()
 
         data_l                                          = []
@@ -246,21 +451,17 @@ class RepoAdministration():
                                                            RS.LAST_COMMIT_TIMESTAMP_COL,
                                                            RS.LAST_COMMIT_HASH_COL,
                                                            ]
-        def _process_one_repo(repo_name, inspector, local_or_remote):
+        def _process_one_repo(repo_name, inspector, local_or_remote, repo_path=None):
             repo_name, current_branch, \
                 commit_message, commit_ts, commit_hash, \
                 untracked_files, modified_files, deleted_files \
-                                                    = self._one_repo_stats(inspector)
+                                                    = self._one_repo_stats(inspector, repo_path)
 
             return [repo_name, local_or_remote, current_branch, 
                         len(untracked_files), len(modified_files), len(deleted_files),
                         commit_message, commit_ts, commit_hash, 
                         ]
 
-        # Need to pass repos_in_scope_l to the supervisor to avoid getting errors like
-        # 
-        #       UnboundLocalError: cannot access local variable 'repos_in_scope_l' where it is not associated with a value
-        #
         async def _supervisor(repos_in_scope_l): 
             if repos_in_scope_l is None:
                 repos_in_scope_l                            = self.repo_names()
@@ -268,13 +469,15 @@ class RepoAdministration():
                 for repo_name in repos_in_scope_l:
 
                     if git_usage in [GitUsage.git_local_and_remote, GitUsage.git_local_only]:
-                        local_inspector                     = RepoInspectorFactory.findInspector(self.local_root, repo_name)
+                        local_inspector                     = self.inspector(self.local_root, repo_name)
 
                         usher                               += asyncio.to_thread(
                                                                         _process_one_repo,
                                                                         repo_name, 
                                                                         inspector           = local_inspector, 
-                                                                        local_or_remote     = RS.LOCAL_REPO)
+                                                                        local_or_remote     = RS.LOCAL_REPO,
+                                                                        repo_path           = self.local_root + "/" 
+                                                                                                + repo_name)
                         '''
                         repo_name, current_branch, \
                             commit_message, commit_ts, commit_hash, \
@@ -288,7 +491,7 @@ class RepoAdministration():
                         '''
 
                     if git_usage in [GitUsage.git_local_and_remote]:
-                        remote_inspector                    = RepoInspectorFactory.findInspector(self.remote_root, repo_name)
+                        remote_inspector                    = self.inspector(self.remote_root, repo_name)
 
                         usher                               += asyncio.to_thread(
                                                                         _process_one_repo,
@@ -314,10 +517,124 @@ class RepoAdministration():
                                                                                             RS.LOCAL_OR_REMOTE_COL])
 
             return result_df
+
+        return await _supervisor(repos_in_scope_l)
+
+    def maintain(self, repos_in_scope_l=None, force=False):
+        '''
+        Writes commit-graphs and repacks the local repos that are due for maintenance, as per :class:`RepoMaintenance`.
+
+        :param list[str] repos_in_scope_l: A list of names for GIT repos to maintain. If set to None, then it will
+            default to ``self.repo_names()``
+        :param bool force: If True, repos are maintained even if they are not due
+        :return: For each repo that was maintained, how long the queries that maintenance speeds up took before and
+            after it.
+        :rtype: :class:`pandas.DataFrame`
+        '''
+        return self._run_workflow("maintain", RepoMaintenance(self).run(repos_in_scope_l, force=force), repos_in_scope_l)
+
+    LOCAL_BRANCH_COL                                    = "Local branch"
+    REMOTE_BRANCH_COL                                   = "Remote branch"
+    AHEAD_COL                                           = "Ahead"
+    BEHIND_COL                                          = "Behind"
+
+    def divergence(self, repos_in_scope_l=None):
+        '''
+        :param list[str] repos_in_scope_l: A list of names for GIT repos for which divergences are requested. If set to 
+            None, then it will default to ``self.repo_names()``
+        :return: For each local repo and each of its branches that tracks a remote branch, how many commits the 
+            local branch has that the remote branch doesn't (ahead) and vice versa (behind). A branch tracks the
+            remote branch configured as its upstream or, if it has none, the branch of ``origin`` with the same
+            name. Remote branches are as of the last fetch. Sorted by repo and local branch.
+        :rtype: :class:`pandas.DataFrame`
+        '''
+        return self._run_workflow("divergence", self._divergence(repos_in_scope_l), repos_in_scope_l)
+
+    async def _divergence(self, repos_in_scope_l=None):
+        '''
+        Async implementation of :meth:`divergence`, which processes all repos concurrently.
+        '''
+        if repos_in_scope_l is None:
+            repos_in_scope_l                            = self.repo_names()
+
+        row_l_l                                         = await asyncio.gather(*[self._repo_divergence(repo_name)
+                                                                                 for repo_name in repos_in_scope_l])
+        columns                                         = [RepoStatics.REPO_NAME_COL, self.LOCAL_BRANCH_COL, 
+                                                           self.REMOTE_BRANCH_COL, self.AHEAD_COL, self.BEHIND_COL]
+        result_df                                       = _pd.DataFrame(data    = [row for row_l in row_l_l for row in row_l], 
+                                                                        columns = columns)
+        return result_df.sort_values(by=[RepoStatics.REPO_NAME_COL, self.LOCAL_BRANCH_COL], ignore_index=True)
+
+    # Ahead/behind counts computed with "git rev-list", keyed by repo path and the two branches compared, with the
+    # SHAs they were computed for. An entry is replaced when either branch moves, and dropped when the pair is no
+    # longer compared (e.g., the branch was deleted), so the cache stays as large as the branches being compared
+    _divergence_cache_dict                              = {} # (repo path, local ref, remote ref) -> (SHA, SHA, ahead, behind)
+
+    async def _repo_divergence(self, repo_name):
+        '''
+        :return: the rows of :meth:`divergence` for the repo ``repo_name``, or no rows if it has no local repo
+        :rtype: list[list]
+        '''
+        repo_path                                       = self.local_repo_path(repo_name)
+        if repo_path is None:
+            return []
+        executor                                        = GitLocalClient(repo_path)
+
+        # One pass over the refs gives each branch's SHA and, for branches with an upstream, GIT's own ahead/behind
+        # counts, like "ahead 2, behind 1" (empty if they are in sync, "gone" if the upstream no longer exists)
+        #
+        output                                          = await executor.execute_argv(
+                                                                ["git", "for-each-ref", 
+                                                                 "--format=%(refname)%00%(objectname)%00%(upstream)%00%(upstream:track,nobracket)",
+                                                                 "refs/heads", "refs/remotes"])
+        sha_dict                                        = {}
+        upstream_l                                      = []
+        for line in output.splitlines():
+            ref, sha, upstream, track                   = line.split("\0")
+            sha_dict[ref]                               = sha
+            if ref.startswith("refs/heads/"):
+                upstream_l.append((ref, upstream, track))
+
+        def _short(ref):
+            return ref.split("/", 2)[2]
+
+        async def _one_pair(local_ref, remote_ref):
+            key                                         = (repo_path, local_ref, remote_ref)
+            local_sha, remote_sha                       = sha_dict[local_ref], sha_dict[remote_ref]
+            cached                                      = RepoAdministration._divergence_cache_dict.get(key)
+            if cached is None or cached[:2] != (local_sha, remote_sha):
+                counts                                  = await executor.execute_argv(
+                                                                ["git", "rev-list", "--left-right", "--count", 
+                                                                 f"{local_sha}...{remote_sha}"])
+                ahead, behind                           = counts.split()
+                cached                                  = (local_sha, remote_sha, int(ahead), int(behind))
+                RepoAdministration._divergence_cache_dict[key] \
+                                                        = cached
+            return [repo_name, _short(local_ref), _short(remote_ref), cached[2], cached[3]]
+
+        row_l                                           = []
+        to_do                                           = []
+        compared_s                                      = set()
+        for local_ref, upstream, track in upstream_l:
+            if upstream != "" and track != "gone":
+                counts_dict                             = {"ahead": 0, "behind": 0}
+                for part in track.split(", ") if track != "" else []:
+                    direction, count                    = part.split(" ")
+                    counts_dict[direction]              = int(count)
+                row_l.append([repo_name, _short(local_ref), _short(upstream), counts_dict["ahead"], counts_dict["behind"]])
+            elif upstream == "":
+                remote_ref                              = "refs/remotes/origin/" + _short(local_ref)
+                if remote_ref in sha_dict:
+                    compared_s.add((repo_path, local_ref, remote_ref))
+                    to_do.append(_one_pair(local_ref, remote_ref))
+
+        for stale_key in [k for k in RepoAdministration._divergence_cache_dict.keys()
+                            if k[0] == repo_path and not k in compared_s]:
+            del RepoAdministration._divergence_cache_dict[stale_key]
+
+        return row_l + list(await asyncio.gather(*to_do))
     
-        return asyncio.run(_supervisor(repos_in_scope_l))
-    
-    def _repo_logs(self, git_usage, repos_in_scope_l=None):
+    async def _repo_logs(self, git_usage, repos_in_scope_l=None):
         '''
         :param GitUsage get_usage: enum used to determine which GIT areas were created, if any, to scope the report to the GIT
         areas actually used.
@@ -333,33 +650,145 @@ class RepoAdministration():
         result_dict                                             = {}
         if repos_in_scope_l is None:
             repos_in_scope_l                                    = self.repo_names()
+
+        async def _one_log(repo_name, root, local_or_remote):
+            result_dict[repo_name][local_or_remote]             = await self._log_to_dataframe(root, repo_name)
+
+        to_do                                                   = []
         for repo_name in repos_in_scope_l:
             result_dict[repo_name]                              = {}
 
-            local_log_df                                        = None
             if git_usage in [GitUsage.git_local_and_remote, GitUsage.git_local_only]:
-                local_inspector                                 = RepoInspectorFactory.findInspector(self.local_root, repo_name)
-                local_log_df                                    = local_inspector.log_to_dataframe()
-                result_dict[repo_name][RepoStatics.LOCAL_REPO]  = local_log_df
+                to_do.append(_one_log(repo_name, self.local_root, RepoStatics.LOCAL_REPO))
 
-            remote_log_df                                       = None
             if git_usage in [GitUsage.git_local_and_remote]:
-                remote_inspector                                = RepoInspectorFactory.findInspector(self.remote_root,repo_name)
-                remote_log_df                                   = remote_inspector.log_to_dataframe()
-                result_dict[repo_name][RepoStatics.REMOTE_REPO] = remote_log_df
- 
-        return result_dict
+                to_do.append(_one_log(repo_name, self.remote_root, RepoStatics.REMOTE_REPO))
+
+        await asyncio.gather(*to_do)
+
+        # Keep local logs before remote logs, as callers create worksheets in this order
+        return {repo_name: {key: logs_dict[key] for key in [RepoStatics.LOCAL_REPO, RepoStatics.REMOTE_REPO] 
+                                if key in logs_dict}
+                    for repo_name, logs_dict in result_dict.items()}
+
+    async def _log_to_dataframe(self, root, repo_name):
+        '''
+        :return: the log of the repo ``repo_name`` under ``root``, with one row per file changed by each commit. If
+            the repo is in the local file system, the log is streamed from ``git log``, so that it is parsed as GIT
+            produces it rather than after buffering all of it. Otherwise (e.g., for repos in GitHub), the log is
+            obtained from the repo's inspector.
+        :rtype: :class:`pandas.DataFrame`
+        '''
+        repo_path                                               = self._repo_path(root, repo_name)
+        if not repo_path is None:
+            return await self._stream_log(repo_path)
 
-    def _one_repo_stats(self, repo: RepoInspector):
+        inspector                                               = self.inspector(root, repo_name)
+        return await asyncio.to_thread(inspector.log_to_dataframe)
+
+    def local_repo_path(self, repo_name):
+        '''
+        :return: the location of the local repo ``repo_name`` in the file system, or None if it doesn't exist
+        :rtype: str
+        '''
+        return self._repo_path(self.local_root, repo_name)
+
+    def _repo_path(self, root, repo_name):
+        '''
+        :return: the location of the repo ``repo_name`` under ``root``, either as a working tree or as a bare repo,
+            or None if ``root`` is not a folder in the local file system or has no such repo
+        :rtype: str
+        '''
+        for repo_path in [f"{root}/{repo_name}", f"{root}/{repo_name}.git"]:
+            if _os.path.isdir(repo_path):
+                return repo_path
+        return None
+
+    # Format of commit headers in the "git log" output parsed by _log_records: a record separator, then the fields,
+    # separated by unit separators (neither of which can appear in the fields)
+    _LOG_FORMAT                                                 = "%x1e%H%x1f%an%x1f%cI%x1f%s"
+
+    async def _stream_log(self, repo_path):
+        '''
+        :return: the log of the current branch of the repo at ``repo_path``, with the columns of
+            ``RepoInspector.log_to_dataframe``: one row per file changed by each commit (merges being compared to
+            their first parent), and one row with an empty file for commits that changed none.
+        :rtype: :class:`pandas.DataFrame`
+        '''
+        RS                                                      = RepoStatics
+        row_l                                                   = []
+        async for commit_hash, author, commit_date, summary, path, _, _ in self._log_records(repo_path):
+            # Same date format as str(datetime), e.g. "2024-05-01 10:31:07-04:00"
+            row_l.append([commit_date.replace("T", " "), summary, path, commit_hash, author])
+
+        return _pd.DataFrame(data       = row_l, 
+                             columns    = [RS.COMMIT_DATE_COL, RS.COMMIT_SUMMARY_COL, RS.COMMIT_FILE_COL, 
+                                           RS.COMMIT_HASH_COL, RS.COMMIT_AUTHOR_COL])
+
+    async def _log_records(self, repo_path, rev="HEAD"):
         '''
+        Async generator that streams the log of ``rev`` in the repo at ``repo_path``, parsing it as GIT produces it.
+
+        :return: for each file changed by each commit (merges being compared to their first parent), a tuple with
+            the commit's hash, author name, ISO 8601 commit date and summary, the file's path, and the number of
+            lines added and deleted (None for binary files). Commits that changed no files yield one tuple with an
+            empty path and None for the line counts.
+        '''
+        executor                                                = GitLocalClient(repo_path)
+
+        # With -z, the output is a sequence of NUL-terminated records: each commit's header, followed by one
+        # "<added>\t<deleted>\t<path>" record per file. For renames, the path is empty and is followed by two more
+        # records, with the paths before and after.
+        #
+        argv                                                    = ["git", "log", "--numstat", "-z", "--diff-merges=first-parent",
+                                                                   f"--format={self._LOG_FORMAT}", rev]
+        header_l                                                = None
+        nb_files                                                = 0
+        nb_rename_paths                                         = 0
+        counts                                                  = None
+        async for record in executor.stream_argv(argv, separator=b"\0"):
+            record                                              = record.lstrip("\n")
+            if record.startswith("\x1e"):
+                if not header_l is None and nb_files == 0:
+                    yield (*header_l, "", None, None)
+                header_l                                        = record[1:].split("\x1f", 3)
+                nb_files                                        = 0
+            elif nb_rename_paths > 0:
+                nb_rename_paths                                 -= 1
+                if nb_rename_paths == 0: # Path after the rename
+                    nb_files                                    += 1
+                    yield (*header_l, record, *counts)
+            elif record != "":
+                added, deleted, path                            = record.split("\t", 2)
+                counts                                          = (None if added == "-" else int(added), 
+                                                                   None if deleted == "-" else int(deleted))
+                if path == "":
+                    nb_rename_paths                             = 2
+                else:
+                    nb_files                                    += 1
+                    yield (*header_l, path, *counts)
+        if not header_l is None and nb_files == 0:
+            yield (*header_l, "", None, None)
+
+    def _one_repo_stats(self, repo: RepoInspector, repo_path=None):
+        '''
+        :param RepoInspector repo: inspector for the repo whose stats are wanted.
+        :param str repo_path: optional location of the repo in the local file system. If given, the current branch and
+            last commit are read in-process from the repo's files, and ``repo`` is only used for the status of files.
         '''
         repo_name                                       = repo.repo_name
-        current_branch                                  = repo.current_branch()
 
-        commit_info                                     = repo.last_commit()
-        commit_hash                                     = commit_info.commit_hash
-        commit_message                                  = commit_info.commit_msg
-        commit_ts                                       = commit_info.commit_ts
+        head_info                                       = None if repo_path is None else self._read_head(repo_path)
+        if head_info is None:
+            current_branch                              = repo.current_branch()
+
+            commit_info                                 = repo.last_commit()
+            commit_hash                                 = commit_info.commit_hash
+            commit_message                              = commit_info.commit_msg
+            commit_ts                                   = commit_info.commit_ts
+        else:
+            current_branch, commit_hash, commit_message, commit_ts \
+                                                        = head_info
 
         untracked_files                                 = repo.untracked_files()
         modified_files                                  = repo.modified_files()
@@ -369,11 +798,52 @@ class RepoAdministration():
             untracked_files, modified_files, deleted_files
 
 
-    def log_info(self, msg):
+    def _read_head(self, repo_path):
+        '''
+        :return: the current branch and the hash, message and timestamp of the last commit of the repo at
+            ``repo_path``, read in-process. Returns None if the repo can't be read in-process.
+        :rtype: tuple
+        '''
+        try:
+            reader                                      = GitObjectReader(repo_path)
+            try:
+                commit                                  = reader.last_commit()
+                return reader.current_branch(), commit.commit_hash, commit.message, str(commit.committed_datetime())
+            finally:
+                reader.close()
+        except (GitObjectReaderError, OSError):
+            return None
+
+    def _run_workflow(self, name, coro, repos_in_scope_l=None):
+        '''
+        Runs the workflow ``coro`` in a new event loop, within a "workflow" span that lists the repos it acts on, so
+        that its progress can be followed with a :class:`ProgressTracker`.
+
+        :param str name: name of the workflow. Example: "complete_feature"
+        :param coro: the coroutine that implements the workflow
+        :param list[str] repos_in_scope_l: the repos the workflow acts on. Defaults to ``self.repo_names()``
+        :return: the result of ``coro``
+        '''
+        if repos_in_scope_l is None:
+            repos_in_scope_l                            = self.repo_names()
+        try:
+            with Tracer.tracer().span(name, "workflow", repos=list(repos_in_scope_l)):
+                return asyncio.run(coro)
+        finally:
+            # Callers (like notebook cells) expect the workflow's messages to be out when it returns or raises
+            StructuredLog.logger().flush()
+
+    def log_info(self, msg, repo=None, step=None, duration_ms=None, output=None):
         '''
-        Logs the ``msg`` at the INFO log level.
+        Logs the ``msg`` at the INFO log level. Logging happens in the background (see :class:`StructuredLog`), so
+        callers don't wait for it.
 
         :param str msg: Information to be logged
+        :param str repo: optional name of the repo that ``msg`` is about
+        :param str step: optional name of the workflow step that ``msg`` is about. Example: "merge"
+        :param float duration_ms: optional duration of the step, in milliseconds
+        :param str output: optional output of the step, like the output of a GIT command. It is logged after
+            ``msg``, truncated if it is very long, and not formatted at all if INFO messages are not logged
         '''
         #Application.app().log(msg, Logger.LEVEL_INFO, show_caller=False)
-        Logger.log_info(msg)
+        StructuredLog.logger().info(msg, repo=repo, step=step, duration_ms=duration_ms, output=output)
@@ -0,0 +1,161 @@
+import asyncio
+
+from limon_ops.observability.tracer                                 import Tracer
+from limon_ops.util.git_local_client                                import GitLocalClient
+from limon_ops.util.lazy_import                                     import LazyImport
+
+_pd                                                                 = LazyImport("pandas")
+
+
+class RepoAnalytics():
+
+    '''
+    Computes analytics across all the local repos of a :class:`RepoAdministration`: commits per author per week,
+    churn per file, and how far the local integration, master and operate branches have diverged from the remote
+    ones.
+
+    The logs of all repos are concatenated into a single DataFrame (the "commit store", see :meth:`commit_store`)
+    with one row per file changed by each commit, and the analytics are vectorized group-bys over that store.
+
+    Each repo's part of the store is cached by the SHA of the repo's HEAD, so that repeated reports only parse the
+    logs of repos that have new commits. Divergences come from :meth:`RepoAdministration.divergence`.
+
+    :param RepoAdministration admin: the administration whose repos are analyzed. Only repos under its
+        ``local_root`` are analyzed.
+    '''
+    def __init__(self, admin):
+        self.admin                                      = admin
+
+    REPO_COL                                            = "Repo"
+    HASH_COL                                            = "Commit hash"
+    AUTHOR_COL                                          = "Author"
+    DATE_COL                                            = "Commit date"
+    FILE_COL                                            = "File"
+    ADDED_COL                                           = "Lines added"
+    DELETED_COL                                         = "Lines deleted"
+    WEEK_COL                                            = "Week"
+    NB_COMMITS_COL                                      = "Commits"
+    CHURN_COL                                           = "Churn"
+
+    STORE_COLUMNS                                       = [REPO_COL, HASH_COL, AUTHOR_COL, DATE_COL, FILE_COL,
+                                                           ADDED_COL, DELETED_COL]
+
+    # Branches whose local and remote versions are compared by divergence()
+    DIVERGENCE_BRANCHES                                 = ["master", "integration", "operate"]
+
+    # Names of the worksheets added to reports by worksheets(). Excel limits worksheet names to 31 characters
+    COMMITS_WORKSHEET                                   = "Commits per author per week"
+    CHURN_WORKSHEET                                     = "Churn per file"
+    DIVERGENCE_WORKSHEET                                = "Local vs remote divergence"
+
+    # Cache shared by all instances, since it is keyed by repo location and commit SHA
+    _log_cache_dict                                     = {}    # (repo path, HEAD SHA) -> the repo's part of the store
+
+    async def commit_store(self, repos_in_scope_l=None):
+        '''
+        :param list[str] repos_in_scope_l: names of the repos to include. Defaults to all the repos of the
+            administration's bundle. Repos that don't exist locally, or have no commits, are skipped
+        :return: the logs of all the repos, with the columns in :attr:`STORE_COLUMNS`: one row per file changed by
+            each commit (merges being compared to their first parent), and one row with an empty file for commits
+            that changed none. Line counts are NaN for binary files and for commits that changed no files
+        :rtype: :class:`pandas.DataFrame`
+        '''
+        if repos_in_scope_l is None:
+            repos_in_scope_l                            = self.admin.repo_names()
+
+        df_l                                            = await asyncio.gather(*[self._repo_log(repo_name)
+                                                                                 for repo_name in repos_in_scope_l])
+        df_l                                            = [df for df in df_l if not df is None]
+        if len(df_l) == 0:
+            return _pd.DataFrame(columns=self.STORE_COLUMNS)
+        with Tracer.tracer().span("concatenate logs", "analytics", repos=len(df_l)):
+            return _pd.concat(df_l, ignore_index=True)
+
+    def commits_per_author_per_week(self, store_df):
+        '''
+        :param pandas.DataFrame store_df: a commit store, as returned by :meth:`commit_store`
+        :return: the number of commits of each author in each week (starting on Mondays), across all repos, sorted
+            by week and author
+        :rtype: :class:`pandas.DataFrame`
+        '''
+        commits_df                                      = store_df.drop_duplicates([self.REPO_COL, self.HASH_COL])
+        # Dates have the committers' UTC offsets, so normalize them to UTC before bucketing them into weeks
+        week_s                                          = _pd.to_datetime(commits_df[self.DATE_COL], utc=True) \
+                                                                .dt.tz_localize(None).dt.to_period("W").dt.start_time
+        result_df                                       = commits_df.groupby([week_s.rename(self.WEEK_COL),
+                                                                              commits_df[self.AUTHOR_COL]]) \
+                                                                .size().rename(self.NB_COMMITS_COL).reset_index()
+        result_df[self.WEEK_COL]                        = result_df[self.WEEK_COL].dt.strftime("%Y-%m-%d")
+        return result_df
+
+    def churn_per_file(self, store_df):
+        '''
+        :param pandas.DataFrame store_df: a commit store, as returned by :meth:`commit_store`
+        :return: for each file of each repo, the number of commits that changed it and the lines added and deleted
+            by them, with the files changed the most (by lines added plus deleted) first
+        :rtype: :class:`pandas.DataFrame`
+        '''
+        files_df                                        = store_df[store_df[self.FILE_COL] != ""]
+        result_df                                       = files_df.groupby([self.REPO_COL, self.FILE_COL]) \
+                                                                .agg(**{self.NB_COMMITS_COL:    (self.HASH_COL, "nunique"),
+                                                                        self.ADDED_COL:         (self.ADDED_COL, "sum"),
+                                                                        self.DELETED_COL:       (self.DELETED_COL, "sum")}) \
+                                                                .reset_index()
+        result_df[self.CHURN_COL]                       = result_df[self.ADDED_COL] + result_df[self.DELETED_COL]
+        return result_df.sort_values([self.CHURN_COL, self.REPO_COL, self.FILE_COL],
+                                     ascending=[False, True, True], ignore_index=True)
+
+    async def divergence(self, repos_in_scope_l=None):
+        '''
+        :param list[str] repos_in_scope_l: names of the repos to include. Defaults to all the repos of the
+            administration's bundle
+        :return: the rows of :meth:`RepoAdministration.divergence` for the branches in :attr:`DIVERGENCE_BRANCHES`
+        :rtype: :class:`pandas.DataFrame`
+        '''
+        divergence_df                                   = await self.admin._divergence(repos_in_scope_l)
+        return divergence_df[divergence_df[self.admin.LOCAL_BRANCH_COL].isin(self.DIVERGENCE_BRANCHES)] \
+                    .reset_index(drop=True)
+
+    async def worksheets(self, repos_in_scope_l=None):
+        '''
+        :param list[str] repos_in_scope_l: names of the repos to include. Defaults to all the repos of the
+            administration's bundle
+        :return: the analytics DataFrames, keyed by the names of the report worksheets they are to be saved in
+        :rtype: dict
+        '''
+        store_df, divergence_df                         = await asyncio.gather(self.commit_store(repos_in_scope_l),
+                                                                               self.divergence(repos_in_scope_l))
+        with Tracer.tracer().span("compute analytics", "analytics", rows=len(store_df)):
+            return {self.COMMITS_WORKSHEET:             self.commits_per_author_per_week(store_df),
+                    self.CHURN_WORKSHEET:               self.churn_per_file(store_df),
+                    self.DIVERGENCE_WORKSHEET:          divergence_df}
+
+    async def _repo_log(self, repo_name):
+        '''
+        :return: the part of the commit store for the repo ``repo_name``, or None if it has no local repo or no
+            commits
+        '''
+        repo_path                                       = self.admin.local_repo_path(repo_name)
+        if repo_path is None:
+            return None
+        exit_status, head_sha, _                        = await GitLocalClient(repo_path).execute_argv_unchecked(
+                                                                ["git", "rev-parse", "--verify", "-q", "HEAD"])
+        if exit_status != 0:
+            return None # No commits yet
+
+        key                                             = (repo_path, head_sha)
+        df                                              = RepoAnalytics._log_cache_dict.get(key)
+        if df is None:
+            with Tracer.tracer().span("parse log", "analytics", repo=repo_name):
+                row_l                                   = [(repo_name, commit_hash, author, commit_date, path, added, deleted)
+                                                            async for commit_hash, author, commit_date, _, path, added, deleted
+                                                                in self.admin._log_records(repo_path, head_sha)]
+                df                                      = _pd.DataFrame(data=row_l, columns=self.STORE_COLUMNS)
+                # None (binary files, commits without files) becomes NaN, which group-by sums ignore
+                df[self.ADDED_COL]                      = df[self.ADDED_COL].astype("float64")
+                df[self.DELETED_COL]                    = df[self.DELETED_COL].astype("float64")
+            # Only the latest HEAD of each repo is worth keeping
+            for stale_key in [k for k in RepoAnalytics._log_cache_dict.keys() if k[0] == repo_path]:
+                del RepoAnalytics._log_cache_dict[stale_key]
+            RepoAnalytics._log_cache_dict[key]          = df
+        return df
@@ -0,0 +1,184 @@
+import asyncio
+import json
+import os                                                           as _os
+import time
+
+from limon_ops.observability.tracer                                 import Tracer
+from limon_ops.util.git_local_client                                import GitLocalClient
+from limon_ops.util.lazy_import                                     import LazyImport
+
+_pd                                                                 = LazyImport("pandas")
+
+
+class RepoMaintenance():
+
+    '''
+    Keeps the local repos of a :class:`RepoAdministration` fast to query, by doing for each repo what
+    ``git maintenance`` would, but only when it is due:
+
+    * Writes commit-graphs with Bloom filters of changed paths (``git commit-graph write --changed-paths``), so
+      that history walks (logs, merge-base and ``--merged`` checks) read commits from one compact file instead of
+      parsing objects, and path-limited logs skip commits that didn't change the path.
+
+    * Repacks incrementally (``git repack --geometric``), folding loose objects and small packs into larger packs
+      without rewriting the large ones, and indexes all packs with a multi-pack-index.
+
+    * Enables ``core.commitGraph``, ``core.multiPackIndex`` and ``fetch.writeCommitGraph`` in the repo, so that GIT
+      uses these files and keeps the commit-graph current on fetches.
+
+    A repo is due if it was never maintained, if it was last maintained more than ``interval_s`` seconds ago, or if
+    it has accumulated many loose objects or packs, as happens after big workflows. :meth:`run` can be called after
+    such workflows, or periodically (the :class:`LimonDaemon` does so while idle), and only does work for the
+    repos that are due.
+
+    To show what maintenance buys, the queries that limon relies on (see :attr:`QUERIES`) are timed before and
+    after maintaining each repo. The timings are returned, and also kept with the repo's maintenance state, in the
+    file :attr:`STATE_FILE` of the repo's GIT folder.
+
+    :param RepoAdministration admin: the administration whose local repos are maintained
+    :param float interval_s: how long after maintaining a repo it is due again, in seconds. Defaults to a day
+    '''
+    def __init__(self, admin, interval_s=24 * 3600):
+        self.admin                                      = admin
+        self.interval_s                                 = interval_s
+
+    # A repo is due for maintenance, however recently it was maintained, once it has this many loose objects or packs
+    MAX_LOOSE_OBJECTS                                   = 1000
+    MAX_PACKS                                           = 20
+
+    # Name of the file, in each repo's GIT folder, where the last maintenance and its timings are recorded
+    STATE_FILE                                          = "limon_maintenance.json"
+
+    # Repo configuration set on first maintenance, so that GIT uses (and updates) what maintenance writes
+    CONFIG_DICT                                         = {"core.commitGraph":          "true",
+                                                           "core.multiPackIndex":       "true",
+                                                           "fetch.writeCommitGraph":    "true"}
+
+    # Queries timed before and after maintenance: the history walks behind _repo_logs and merge checks, and the
+    # status of the working tree
+    QUERIES                                             = {"log":               ["git", "log", "--format=%H%x1f%an%x1f%cI%x1f%s"],
+                                                           "merged branches":   ["git", "for-each-ref", "--merged", "HEAD",
+                                                                                 "refs/heads/"],
+                                                           "status":            ["git", "status", "--porcelain"]}
+
+    REPO_COL                                            = "Repo"
+    QUERY_COL                                           = "Query"
+    BEFORE_COL                                          = "Before (s)"
+    AFTER_COL                                           = "After (s)"
+
+    async def run(self, repos_in_scope_l=None, force=False, max_concurrency=4):
+        '''
+        :param list[str] repos_in_scope_l: names of the repos to maintain, if due. Defaults to all the repos of the
+            administration's bundle. Repos that don't exist locally are skipped
+        :param bool force: if True, repos are maintained even if they are not due
+        :param int max_concurrency: maximum number of repos maintained at once. Repacking is CPU and IO intensive,
+            and timings are less meaningful when many repos are maintained at once
+        :return: for each repo that was maintained and each query in :attr:`QUERIES`, how long the query took
+            before and after maintenance, in seconds
+        :rtype: :class:`pandas.DataFrame`
+        '''
+        if repos_in_scope_l is None:
+            repos_in_scope_l                            = self.admin.repo_names()
+
+        semaphore                                       = asyncio.Semaphore(max_concurrency)
+
+        async def _one_repo(repo_name):
+            async with semaphore:
+                return await self._maintain(repo_name, force)
+
+        row_l_l                                         = await asyncio.gather(*[_one_repo(repo_name)
+                                                                                 for repo_name in repos_in_scope_l])
+        return _pd.DataFrame(data       = [row for row_l in row_l_l for row in row_l],
+                             columns    = [self.REPO_COL, self.QUERY_COL, self.BEFORE_COL, self.AFTER_COL])
+
+    async def is_due(self, repo_path):
+        '''
+        :param str repo_path: location of a local repo
+        :return: True if the repo at ``repo_path`` is due for maintenance
+        :rtype: bool
+        '''
+        state_dict                                      = self._read_state(repo_path)
+        if time.time() - state_dict.get("last_run", 0) >= self.interval_s:
+            return True
+
+        output                                          = await GitLocalClient(repo_path).execute_argv(
+                                                                ["git", "count-objects", "-v"])
+        counts_dict                                     = dict(line.split(": ", 1) for line in output.splitlines())
+        return int(counts_dict["count"]) >= self.MAX_LOOSE_OBJECTS or int(counts_dict["packs"]) >= self.MAX_PACKS
+
+    async def _maintain(self, repo_name, force):
+        '''
+        Maintains the local repo ``repo_name`` if it exists and is due, or if ``force`` is True.
+
+        :return: the rows of :meth:`run` for the repo
+        :rtype: list[list]
+        '''
+        repo_path                                       = self.admin.local_repo_path(repo_name)
+        if repo_path is None or not (force or await self.is_due(repo_path)):
+            return []
+
+        executor                                        = GitLocalClient(repo_path)
+        query_l                                         = [name for name in self.QUERIES.keys()
+                                                            if name != "status" or not self._is_bare(repo_path)]
+        with Tracer.tracer().span("maintain repo", "maintenance", repo=repo_name) as span:
+            before_dict                                 = await self._time_queries(executor, query_l)
+
+            start                                       = time.perf_counter()
+            state_dict                                  = self._read_state(repo_path)
+            if not state_dict.get("configured", False):
+                for key, value in self.CONFIG_DICT.items():
+                    await executor.execute_argv(["git", "config", key, value])
+                state_dict["configured"]                = True
+
+            await executor.execute_argv(["git", "repack", "-d", "-q", "--geometric=2"])
+            await executor.execute_argv(["git", "multi-pack-index", "write"])
+            # Write the commit-graph last, so that it covers the objects just packed
+            await executor.execute_argv(["git", "commit-graph", "write", "--reachable", "--changed-paths", "--split"])
+            duration_s                                  = time.perf_counter() - start
+
+            after_dict                                  = await self._time_queries(executor, query_l)
+            span.set("duration_s", duration_s)
+
+        state_dict["last_run"]                          = time.time()
+        state_dict["duration_s"]                        = duration_s
+        state_dict["timings"]                           = {name: [before_dict[name], after_dict[name]] for name in query_l}
+        self._write_state(repo_path, state_dict)
+
+        return [[repo_name, name, before_dict[name], after_dict[name]] for name in query_l]
+
+    async def _time_queries(self, executor, query_l):
+        '''
+        :return: how long each of the queries named in ``query_l`` takes, in seconds. Queries are run one after the
+            other, so that they don't slow each other down
+        :rtype: dict
+        '''
+        result_dict                                     = {}
+        for name in query_l:
+            start                                       = time.perf_counter()
+            # Unchecked, since some queries legitimately fail, e.g. "--merged HEAD" in a repo without commits
+            await executor.execute_argv_unchecked(self.QUERIES[name])
+            result_dict[name]                           = time.perf_counter() - start
+        return result_dict
+
+    def _is_bare(self, repo_path):
+        return not _os.path.exists(_os.path.join(repo_path, ".git"))
+
+    def _state_path(self, repo_path):
+        git_dir                                         = repo_path if self._is_bare(repo_path) \
+                                                            else _os.path.join(repo_path, ".git")
+        return _os.path.join(git_dir, self.STATE_FILE)
+
+    def _read_state(self, repo_path):
+        try:
+            with open(self._state_path(repo_path)) as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            # Missing or corrupt state just means that the repo is due for maintenance
+            return {}
+
+    def _write_state(self, repo_path, state_dict):
+        path                                            = self._state_path(repo_path)
+        tmp_path                                        = path + ".tmp"
+        with open(tmp_path, "w") as file:
+            json.dump(state_dict, file, indent=4)
+        _os.replace(tmp_path, path)
@@ -0,0 +1,13 @@
+from limon_ops.util.lazy_import                                     import lazy_attributes
+
+# Some sub-modules pull in heavy dependencies (like httpx), so they are only imported when one of these attributes is
+# first used
+#
+__getattr__                                                         = lazy_attributes(__name__, {
+                                                                        "GitLocalClient":     "git_local_client",
+                                                                        "GitHub_Client":      "github_client",
+                                                                        "LazyImport":         "lazy_import",
+                                                                        "PullRequestService": "pull_request_service",
+                                                                        "PushCoordinator":    "push_coordinator",
+                                                                        "WorktreePool":       "worktree_pool",
+                                                                    })
@@ -0,0 +1,97 @@
+import os                                                           as _os
+import threading                                                    as _threading
+
+
+class GitCredentials():
+
+    '''
+    Process-wide credentials for the HTTPS remotes of GIT commands run by limon, so that GIT authenticates without
+    tokens being written into remote URLs, repo configurations or credential stores.
+
+    Credentials are registered once per run with :meth:`register`, and :class:`GitSubprocess` adds
+    :meth:`environment` to the environment of every GIT command. That environment configures, through GIT's
+    ``GIT_CONFIG_COUNT`` variables (so nothing is written to disk):
+
+    * a credential helper for each registered URL prefix, which answers GIT's ``get`` requests with the username
+      and password that this process passed in the command's environment. Any helpers configured for the same
+      URLs by the user (like a system credential manager) are not consulted, so there is no extra round trip to
+      them and no prompt.
+    * ``http.version`` for each registered URL prefix, so that GIT talks HTTP/2 to the remote and reuses one
+      connection for all the requests of a fetch or push.
+
+    Example::
+
+        GitCredentials.register("https://github.com", "my-user", token)
+        await GitLocalClient(repo_path).execute_argv(["git", "push", "origin", "my-branch"])
+
+    Since credentials are process-wide, registering a URL prefix again replaces its credentials.
+    '''
+
+    _credentials_dict                                   = {}    # URL prefix -> (username, password)
+    _environment_dict                                   = {}    # Rebuilt whenever credentials change
+    _lock                                               = _threading.Lock()
+
+    HTTP_VERSION                                        = "HTTP/2"
+
+    # GIT runs helpers that start with "!" as shell commands, with the action ("get", "store" or "erase") appended.
+    # Only "get" is answered, from the environment variables for the URL prefix's index
+    HELPER                                              = '!f() { test "$1" = get && printf "username=%s\\npassword=%s\\n"' \
+                                                          + ' "$LIMON_GIT_USERNAME_{index}" "$LIMON_GIT_PASSWORD_{index}"; }; f'
+
+    def register(url_prefix, username, password):
+        '''
+        :param str url_prefix: the remotes the credentials are for. Example: "https://github.com"
+        :param str username: the user to authenticate as
+        :param str password: the password or access token of ``username``
+        '''
+        with GitCredentials._lock:
+            GitCredentials._credentials_dict[url_prefix.rstrip("/")] \
+                                                        = (username, password)
+            GitCredentials._environment_dict            = GitCredentials._build_environment()
+
+    def forget(url_prefix=None):
+        '''
+        :param str url_prefix: the remotes whose credentials are to be forgotten. If None, all credentials are
+            forgotten.
+        '''
+        with GitCredentials._lock:
+            if url_prefix is None:
+                GitCredentials._credentials_dict.clear()
+            else:
+                GitCredentials._credentials_dict.pop(url_prefix.rstrip("/"), None)
+            GitCredentials._environment_dict            = GitCredentials._build_environment()
+
+    def environment():
+        '''
+        :return: the environment variables that give GIT the registered credentials, or an empty dictionary if
+            none are registered
+        :rtype: dict
+        '''
+        return GitCredentials._environment_dict
+
+    def _build_environment():
+        if len(GitCredentials._credentials_dict) == 0:
+            return {}
+
+        result_dict                                     = {}
+        config_l                                        = []
+        for index, (url_prefix, (username, password)) in enumerate(GitCredentials._credentials_dict.items()):
+            result_dict[f"LIMON_GIT_USERNAME_{index}"]  = username
+            result_dict[f"LIMON_GIT_PASSWORD_{index}"]  = password
+            # An empty helper first, which resets the list of helpers for the URL
+            config_l                                    += [(f"credential.{url_prefix}.helper", ""),
+                                                            (f"credential.{url_prefix}.helper",
+                                                                GitCredentials.HELPER.replace("{index}", str(index))),
+                                                            (f"http.{url_prefix}.version", GitCredentials.HTTP_VERSION)]
+
+        # Keep any configuration that the user passes to GIT the same way
+        first                                           = int(_os.environ.get("GIT_CONFIG_COUNT", 0))
+        for offset, (key, value) in enumerate(config_l):
+            result_dict[f"GIT_CONFIG_KEY_{first + offset}"] \
+                                                        = key
+            result_dict[f"GIT_CONFIG_VALUE_{first + offset}"] \
+                                                        = value
+        result_dict["GIT_CONFIG_COUNT"]                 = str(first + len(config_l))
+        # If the credentials are rejected, fail rather than wait for someone to type others in
+        result_dict["GIT_TERMINAL_PROMPT"]              = "0"
+        return result_dict
@@ -1,16 +1,41 @@
-import asyncio
+import functools                                                    as _functools
+import shlex                                                        as _shlex
 
-import git                                                          as _git
 from pathlib                                                        import Path
 
-from conway.application.application                                 import Application
 from conway.util.command_parser                                     import CommandParser
+from limon_ops.observability.tracer                                 import Tracer, redact
+from limon_ops.util.git_object_reader                               import GitObjectReader, GitObjectReaderError, \
+                                                                            parse_commit
+from limon_ops.util.git_subprocess                                  import GitCommandError, GitSubprocess
+
+@_functools.lru_cache(maxsize=1024)
+def _tokenize(command):
+    '''
+    Splits a GIT command string into its arguments. Since the same commands are run again and again, across repos and
+    across workflows, results are cached so each distinct string is only parsed once.
+
+    :param str command: a GIT command. Example: "git branch --list integration"
+    :return: the arguments of ``command``. Example: ("git", "branch", "--list", "integration")
+    :rtype: tuple[str]
+    '''
+    return tuple(CommandParser().get_argument_list(command))
+
 
 class GitLocalClient():
 
     '''
-    Helper class used to invoke GIT commands as strings. It essentially is a wrapper around GitPython to avoid having
-    awareness of GitPython across Conway modules.
+    Helper class used to invoke GIT commands, either as strings or as argument lists. GIT runs in child processes
+    of the event loop (see :class:`GitSubprocess`), so that many commands can be in flight at once without tying
+    up a thread each.
+
+    Internal callers should prefer :meth:`execute_argv` with pre-built argument lists, which avoids parsing
+    strings altogether and needs no quoting, even for arguments with spaces or quotes in them.
+
+    Frequent read-only queries (:meth:`current_branch`, :meth:`branches`, :meth:`branch_exists`, :meth:`last_commit`)
+    are answered in-process by a :class:`GitObjectReader`, reading the repo's files directly. If the reader can't
+    answer (e.g., for an unsupported repo format), they fall back to running GIT commands. All writes go through GIT
+    commands.
 
     :param str repo_path: Location in the file system for the Git repository to be acted on by this :class:`GitLocalClient` instance.
 
@@ -19,42 +44,208 @@ class GitLocalClient():
 
         # GOTCHA: 
         #   If the repo_path does not exist (as it has happened due to typo by the user in setting inputs)
-        #   then unfortunately the GitPython's cmd.Git constructor will not fail and will just use a previous repo from
-        #   some prior instance of cmd.Git (e.g, looks like it does some static caching). That is very bad since then 
-        #   subsequent processing will be manipulating *the wrong repo*.
+        #   then commands would fail with confusing errors, or worse, if run from some other folder, manipulate 
+        #   *the wrong repo*.
         #
         #   So force an exception in repo_path is not set correctly.
         #
         if not Path(repo_path).exists():
             raise ValueError("Repo folder does not exist: '" + str(repo_path) + "'")
         
-        self.executor                                       = _git.cmd.Git(repo_path)
+        self.repo_path                                      = repo_path
+        self._reader                                        = None # Created on first use
 
-    async def execute(self, command):
+    def reader(self):
+        '''
+        :return: the in-process reader for this repo, or None if this repo can't be read in-process
+        :rtype: GitObjectReader
+        '''
+        if self._reader is None:
+            try:
+                self._reader                                = GitObjectReader(str(self.repo_path))
+            except (GitObjectReaderError, OSError):
+                self._reader                                = False # Don't try again
+        return self._reader or None
+
+    async def current_branch(self):
+        '''
+        :return: the name of the branch checked out, or "HEAD" if HEAD is detached
+        :rtype: str
+        '''
+        reader                                              = self.reader()
+        if not reader is None:
+            try:
+                return reader.current_branch()
+            except (GitObjectReaderError, OSError):
+                pass
+        return await self.execute_argv(["git", "rev-parse", "--abbrev-ref", "HEAD"])
+
+    async def branches(self, prefix=""):
+        '''
+        :param str prefix: optional start of the names of the branches wanted. Example: "story_". By default all
+            branches are returned.
+        :return: the names of local branches, sorted by name
+        :rtype: list[str]
+        '''
+        reader                                              = self.reader()
+        if not reader is None:
+            try:
+                return reader.branches(prefix)
+            except (GitObjectReaderError, OSError):
+                pass
+        return [branch async for branch in self.stream_argv(["git", "for-each-ref", "--format=%(refname:short)",
+                                                             "refs/heads/" + prefix + "*"])]
+
+    async def branch_exists(self, branch):
+        '''
+        :param str branch: name of a local branch. Example: "story_1455"
+        :return: True if the branch exists. For repos with many branches this is much cheaper than searching
+            :meth:`branches`.
+        :rtype: bool
+        '''
+        reader                                              = self.reader()
+        if not reader is None:
+            try:
+                return reader.branch_exists(branch)
+            except (GitObjectReaderError, OSError):
+                pass
+        output                                              = await self.execute_argv(["git", "for-each-ref",
+                                                                                       "--format=%(refname)",
+                                                                                       "refs/heads/" + branch])
+        return output.strip() == "refs/heads/" + branch
+
+    async def last_commit(self, ref_name="HEAD"):
+        '''
+        :param str ref_name: the ref whose commit is wanted. Defaults to "HEAD"
+        :return: the commit ``ref_name`` points to
+        :rtype: :class:`limon_ops.util.git_object_reader.CommitObject`
+        '''
+        reader                                              = self.reader()
+        if not reader is None:
+            try:
+                return reader.last_commit(ref_name)
+            except (GitObjectReaderError, OSError):
+                pass
+        sha                                                 = await self.execute_argv(["git", "rev-parse", ref_name])
+        content                                             = await self.execute_argv(["git", "cat-file", "commit", sha])
+        return parse_commit(sha, content.encode())
+
+    async def execute(self, command, timeout=None):
         '''
         :param str command: a GIT command to execute. Example: "git status"
+        :param float timeout: optional maximum duration of the command, in seconds, after which it is killed
         :return: the result of attempting to invoke the GIT ``command``
         :rtype: str
         '''
         #Application.app().log(f"~~~~    limon     async  GitLocalClient   ~~~~ ")
 
-        # GOTCHA: On Linux, GitPython requires commands with arguments to be passed as a list, not
-        #       as a string. Thus, a command like "git status" should be passed in Linux as
+        # GOTCHA: GIT is run without a shell, so a command like "git status" must be passed as the list
         #       ["git", "status"]
         #
         # That is why we split the command parameter
         #
-        args_list                                           = CommandParser().get_argument_list(command)
-        
-        try:
-            response                                        = await asyncio.to_thread(self.executor.execute,
-                                                                                        args_list)
+        args_list                                           = list(_tokenize(command))
 
+        return await self.execute_argv(args_list, timeout=timeout)
+
+    async def execute_argv(self, argv, env=None, timeout=None):
+        '''
+        :param list[str] argv: a GIT command to execute, already split into its arguments. Example: ["git", "status"]
+        :param dict env: optional environment variables for the GIT process, in addition to those of this process.
+            Example: {"GIT_SSH_COMMAND": "ssh -o ControlMaster=auto"}
+        :param float timeout: optional maximum duration of the command, in seconds, after which it is killed and an
+            exception is raised
+        :return: the result of attempting to invoke the GIT command ``argv``
+        :rtype: str
+        '''
+        command                                             = redact(_shlex.join(argv))
+        with Tracer.tracer().span(" ".join(argv[:2]), "git", repo=str(self.repo_path), command=command) as span:
+            try:
+                exit_status, response, stderr               = await GitSubprocess.run(argv, 
+                                                                                      cwd       = self.repo_path,
+                                                                                      env       = env,
+                                                                                      timeout   = timeout)
+            except GitCommandError as ex:
+                exit_status, ex_to_raise                    = None, ex
+            else:
+                ex_to_raise                                 = None if exit_status == 0 \
+                                                                else GitCommandError(argv, exit_status, stderr)
+            span.set("exit_status", exit_status)
+            if not ex_to_raise is None:
+                # Raised within the span, so that it is recorded as failed
+                raise self._failure(command, ex_to_raise) from ex_to_raise
+            span.set("output_bytes", len(response))
             return response
-        except Exception as ex:
-            raise ValueError("Could not run GIT command '" + str(command) + "'." 
+
+    async def stream_argv(self, argv, env=None, separator=b"\n", decode=True, timeout=None):
+        '''
+        Async generator that runs a GIT command and yields its output one record (by default, one line) at a
+        time, as GIT produces it. Compared to :meth:`execute_argv`, memory use does not grow with the size of the
+        output, and callers can process records as they arrive, or stop early, in which case GIT is killed.
+
+        Callers that may stop early should close the generator deterministically::
+
+            async with contextlib.aclosing(executor.stream_argv(["git", "log", "-z"], separator=b"\\0")) as records:
+                async for record in records:
+                    ...
+
+        :param list[str] argv: a GIT command to execute, already split into its arguments
+        :param dict env: optional environment variables for the GIT process, in addition to those of this process.
+        :param bytes separator: what separates records in the output. Use b"\\0" for GIT's ``-z`` outputs
+        :param bool decode: if True (the default), records are yielded as UTF-8 strings, and otherwise as bytes
+        :param float timeout: optional maximum time to wait for each chunk of output, in seconds, after which GIT
+            is killed and an exception is raised
+        :return: the records of the output, without the separator
+        '''
+        command                                             = redact(_shlex.join(argv))
+        with Tracer.tracer().span(" ".join(argv[:2]), "git", repo=str(self.repo_path), command=command,
+                                  streamed=True) as span:
+            output_bytes                                    = 0
+            try:
+                async for record in GitSubprocess.stream(argv, 
+                                                         cwd        = self.repo_path, 
+                                                         env        = env, 
+                                                         separator  = separator,
+                                                         timeout    = timeout):
+                    output_bytes                            += len(record) + len(separator)
+                    yield record.decode("utf-8", errors="surrogateescape") if decode else record
+            except GitCommandError as ex:
+                span.set("exit_status", ex.status)
+                raise self._failure(command, ex) from ex
+            finally:
+                span.set("output_bytes", output_bytes)
+            span.set("exit_status", 0)
+
+    def _failure(self, command, ex):
+        '''
+        :return: the exception to raise when the GIT ``command`` failed with ``ex``
+        :rtype: ValueError
+        '''
+        return ValueError("Could not run GIT command '" + command + "'." 
                              + "\n\t==> Often this happens due to GIT authentication issues. "
                              + "\n\t==>If so, it's recommended to generate SSH keys as explained in "
                              + "\n\t\thttps://docs.github.com/en/authentication/connecting-to-github-with-ssh/generating-a-new-ssh-key-and-adding-it-to-the-ssh-agent?platform=linux"
                              + "\n\nError message is:\n"
-                             + str(ex))
\ No newline at end of file
+                             + str(ex))
+
+    async def execute_argv_unchecked(self, argv, env=None, timeout=None):
+        '''
+        Like :meth:`execute_argv`, but does not raise an exception if GIT fails. This is for commands whose output
+        is meaningful even when they fail, like ``git push --porcelain``, which reports on each ref pushed.
+
+        :param list[str] argv: a GIT command to execute, already split into its arguments. Example: ["git", "push"]
+        :param dict env: optional environment variables for the GIT process, in addition to those of this process.
+        :param float timeout: optional maximum duration of the command, in seconds. Unlike failures, exceeding it
+            raises an exception, after killing the command
+        :return: the exit status, standard output and standard error of the GIT command ``argv``
+        :rtype: tuple[int, str, str]
+        '''
+        command                                             = redact(_shlex.join(argv))
+        with Tracer.tracer().span(" ".join(argv[:2]), "git", repo=str(self.repo_path), command=command) as span:
+            exit_status, stdout, stderr                     = await GitSubprocess.run(argv, 
+                                                                                      cwd       = self.repo_path,
+                                                                                      env       = env,
+                                                                                      timeout   = timeout)
+            span.set("exit_status", exit_status)
+            span.set("output_bytes", len(stdout))
+        return exit_status, stdout, stderr
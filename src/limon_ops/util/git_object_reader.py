@@ -0,0 +1,528 @@
+import datetime                                                     as _datetime
+import glob                                                         as _glob
+import mmap                                                         as _mmap
+import os                                                           as _os
+import struct                                                       as _struct
+import zlib                                                         as _zlib
+
+from dataclasses                                                    import dataclass
+
+from limon_ops.util.ref_index                                       import RefIndex
+
+
+class GitObjectReaderError(Exception):
+
+    '''
+    Raised when the :class:`GitObjectReader` can't answer a query in-process (e.g., the repo uses a storage format it
+    does not support). Callers are expected to fall back to running a GIT command.
+    '''
+
+
+@dataclass(frozen=True)
+class CommitObject():
+
+    '''
+    The parsed content of a GIT commit object, as read by the :class:`GitObjectReader`.
+    '''
+    commit_hash:            str
+    tree:                   str
+    parents:                tuple
+    author:                 str
+    author_ts:              int
+    author_tz:              str
+    committer:              str
+    committer_ts:           int
+    committer_tz:           str
+    message:                str
+
+    def summary(self):
+        '''
+        :return: the first line of the commit message
+        :rtype: str
+        '''
+        return self.message.split("\n", 1)[0]
+
+    def committed_datetime(self):
+        '''
+        :return: when the commit was made, in the committer's time zone
+        :rtype: :class:`datetime.datetime`
+        '''
+        sign                                            = -1 if self.committer_tz.startswith("-") else 1
+        hours, minutes                                  = int(self.committer_tz[1:3]), int(self.committer_tz[3:5])
+        tz                                              = _datetime.timezone(sign * _datetime.timedelta(hours=hours,
+                                                                                                        minutes=minutes))
+        return _datetime.datetime.fromtimestamp(self.committer_ts, tz)
+
+
+def parse_commit(sha, content):
+    '''
+    :param str sha: hash of the commit
+    :param bytes content: the raw content of a commit object, as stored by GIT or as output by ``git cat-file commit``
+    :return: the parsed commit
+    :rtype: CommitObject
+    '''
+    header, _, message                                  = content.decode("utf-8", errors="replace").partition("\n\n")
+    tree                                                = None
+    parents_l                                           = []
+    people_dict                                         = {}
+    for line in header.split("\n"):
+        key, _, value                                   = line.partition(" ")
+        match key:
+            case "tree":
+                tree                                    = value
+            case "parent":
+                parents_l.append(value)
+            case "author" | "committer":
+                # Like "Jane Doe <jane@example.com> 1700000000 +0100"
+                identity, ts, tz                        = value.rsplit(" ", 2)
+                people_dict[key]                        = (identity, int(ts), tz)
+
+    author, author_ts, author_tz                        = people_dict["author"]
+    committer, committer_ts, committer_tz               = people_dict["committer"]
+    return CommitObject(commit_hash     = sha,
+                        tree            = tree,
+                        parents         = tuple(parents_l),
+                        author          = author,
+                        author_ts       = author_ts,
+                        author_tz       = author_tz,
+                        committer       = committer,
+                        committer_ts    = committer_ts,
+                        committer_tz    = committer_tz,
+                        message         = message)
+
+
+class _PackFile():
+
+    '''
+    A GIT pack file and its version 2 index, both memory-mapped so that lookups don't read whole files.
+    '''
+    def __init__(self, idx_path):
+        self.idx_path                                   = idx_path
+        self.pack_path                                  = idx_path[:-len(".idx")] + ".pack"
+
+        # GOTCHA:
+        #   Empty files can't be memory-mapped (mmap raises a ValueError), and files shorter than the index header
+        #   can't be parsed. Either may be left by a GIT process that is still writing or that crashed
+        #
+        if _os.path.getsize(self.idx_path) < self.IDX_HEADER_SIZE or _os.path.getsize(self.pack_path) == 0:
+            raise GitObjectReaderError(f"Empty or truncated pack files for '{idx_path}'")
+
+        with open(self.idx_path, "rb") as file:
+            self.idx                                    = _mmap.mmap(file.fileno(), 0, access=_mmap.ACCESS_READ)
+        with open(self.pack_path, "rb") as file:
+            self.pack                                   = _mmap.mmap(file.fileno(), 0, access=_mmap.ACCESS_READ)
+
+        if self.idx[:4] != b"\377tOc" or _struct.unpack(">I", self.idx[4:8])[0] != 2:
+            raise GitObjectReaderError(f"Unsupported pack index format in '{idx_path}'")
+
+        self.fanout_start                               = 8
+        self.nb_objects                                 = _struct.unpack(">I", self.idx[8 + 255 * 4: 8 + 256 * 4])[0]
+        self.names_start                                = self.IDX_HEADER_SIZE
+        self.offsets_start                              = self.names_start + self.nb_objects * (20 + 4)
+        self.large_offsets_start                        = self.offsets_start + self.nb_objects * 4
+
+    # Size of the header of a version 2 index: signature, version and fan-out table
+    IDX_HEADER_SIZE                                     = 8 + 256 * 4
+
+    def close(self):
+        self.idx.close()
+        self.pack.close()
+
+    def find(self, sha_bytes):
+        '''
+        :param bytes sha_bytes: the binary (20-byte) hash of an object
+        :return: the offset of the object in the pack file, or None if it is not in this pack
+        :rtype: int
+        '''
+        first                                           = sha_bytes[0]
+        low                                             = 0 if first == 0 else \
+                                                            _struct.unpack_from(">I", self.idx,
+                                                                                self.fanout_start + (first - 1) * 4)[0]
+        high                                            = _struct.unpack_from(">I", self.idx,
+                                                                              self.fanout_start + first * 4)[0]
+        while low < high:
+            middle                                      = (low + high) // 2
+            position                                    = self.names_start + middle * 20
+            candidate                                   = self.idx[position: position + 20]
+            if candidate < sha_bytes:
+                low                                     = middle + 1
+            elif candidate > sha_bytes:
+                high                                    = middle
+            else:
+                offset                                  = _struct.unpack_from(">I", self.idx, self.offsets_start + middle * 4)[0]
+                if offset & 0x80000000:
+                    large_idx                           = offset & 0x7fffffff
+                    offset                              = _struct.unpack_from(">Q", self.idx,
+                                                                              self.large_offsets_start + large_idx * 8)[0]
+                return offset
+        return None
+
+
+class GitObjectReader():
+
+    '''
+    Reads GIT refs and commit objects directly from the files under a repo's GIT directory, with no subprocess and
+    no GitPython. It is meant for read-only queries that are made very frequently (like "what branch is checked out"
+    or "what is the last commit"), which it answers in microseconds instead of the milliseconds a GIT command takes.
+
+    It understands ``HEAD``, loose refs, ``packed-refs`` (through a shared :class:`RefIndex`), loose objects and pack
+    files (through their version 2 indices, which are memory-mapped), including deltified objects. It works for
+    regular repos, bare repos and linked worktrees.
+
+    Anything it does not support (like the reftable ref format, or repos that use SHA-256 object names) raises a
+    :class:`GitObjectReaderError`, so that callers can fall back to running GIT commands.
+
+    :param str repo_path: location in the file system of the repo's working tree, or of a bare repo.
+    '''
+    def __init__(self, repo_path):
+        self.repo_path                                  = repo_path
+        self.git_dir                                    = self._find_git_dir(repo_path)
+
+        # Linked worktrees have their own HEAD, but share refs and objects with the main repo
+        commondir_path                                  = self.git_dir + "/commondir"
+        if _os.path.exists(commondir_path):
+            with open(commondir_path) as file:
+                self.common_dir                         = _os.path.normpath(_os.path.join(self.git_dir, file.read().strip()))
+        else:
+            self.common_dir                             = self.git_dir
+
+        if _os.path.exists(self.common_dir + "/reftable"):
+            raise GitObjectReaderError(f"The reftable format used by '{repo_path}' is not supported")
+
+        # Pack indices and refs are parsed for SHA-1 object names, which are 20 bytes (40 hex digits) long
+        object_format                                   = self._object_format()
+        if object_format != "sha1":
+            raise GitObjectReaderError(f"The '{object_format}' object format used by '{repo_path}' is not supported")
+
+        self.ref_index                                  = RefIndex.for_git_dir(self.common_dir)
+
+        self._packs_l                                   = None # Loaded on first use
+        self._object_dirs_l                             = None
+
+    def _find_git_dir(self, repo_path):
+        dot_git                                         = repo_path + "/.git"
+        if _os.path.isdir(dot_git):
+            return dot_git
+        if _os.path.isfile(dot_git):
+            # A linked worktree or a submodule, where .git is a file like "gitdir: /path/to/repo/.git/worktrees/name"
+            with open(dot_git) as file:
+                content                                 = file.read().strip()
+            if not content.startswith("gitdir:"):
+                raise GitObjectReaderError(f"Unrecognized .git file in '{repo_path}'")
+            return _os.path.normpath(_os.path.join(repo_path, content[len("gitdir:"):].strip()))
+        if _os.path.isfile(repo_path + "/HEAD") and _os.path.isdir(repo_path + "/objects"):
+            return repo_path # A bare repo
+        raise GitObjectReaderError(f"'{repo_path}' is not a GIT repo")
+
+    def _object_format(self):
+        '''
+        :return: the hash algorithm for object names, as set by ``extensions.objectformat`` in the repo's config:
+            "sha1" (the default) or "sha256"
+        :rtype: str
+        '''
+        config_path                                     = self.common_dir + "/config"
+        if not _os.path.isfile(config_path):
+            return "sha1"
+        section                                         = None
+        object_format                                   = "sha1"
+        with open(config_path, encoding="utf-8", errors="replace") as file:
+            for line in file:
+                line                                    = line.split("#", 1)[0].split(";", 1)[0].strip()
+                if line.startswith("["):
+                    section                             = line[1:line.find("]")].strip().lower()
+                elif section == "extensions" and "=" in line:
+                    key, _, value                       = line.partition("=")
+                    if key.strip().lower() == "objectformat":
+                        object_format                   = value.strip().strip('"').lower()
+        return object_format
+
+    def close(self):
+        '''
+        Releases the memory maps of the pack files.
+        '''
+        for pack in self._packs_l or []:
+            pack.close()
+        self._packs_l                                   = None
+
+    # ------------------------------------------------------------------------------------------------------------------
+    #   Refs
+    # ------------------------------------------------------------------------------------------------------------------
+
+    def head(self):
+        '''
+        :return: the content of HEAD: either the full name of the ref it points to (like "refs/heads/integration"),
+            or a commit hash if HEAD is detached.
+        :rtype: str
+        '''
+        with open(self.git_dir + "/HEAD") as file:
+            content                                     = file.read().strip()
+        if content.startswith("ref:"):
+            return content[len("ref:"):].strip()
+        return content
+
+    def current_branch(self):
+        '''
+        :return: the name of the branch checked out, or "HEAD" if HEAD is detached (which is what
+            ``git rev-parse --abbrev-ref HEAD`` returns)
+        :rtype: str
+        '''
+        head                                            = self.head()
+        if head.startswith("refs/heads/"):
+            return head[len("refs/heads/"):]
+        return "HEAD"
+
+    def checked_out_branches(self):
+        '''
+        :return: the names of the branches checked out in the main working tree of the repo or in any of its linked
+            worktrees. GIT refuses to check out these branches elsewhere, and they must not be moved without
+            updating the working tree that has them checked out.
+        :rtype: set[str]
+        '''
+        head_path_l                                     = [self.common_dir + "/HEAD"]
+        worktrees_dir                                   = self.common_dir + "/worktrees"
+        if _os.path.isdir(worktrees_dir):
+            head_path_l                                 += [worktrees_dir + "/" + name + "/HEAD" 
+                                                            for name in _os.listdir(worktrees_dir)]
+        branch_s                                        = set()
+        for head_path in head_path_l:
+            try:
+                with open(head_path) as file:
+                    content                             = file.read().strip()
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+            if content.startswith("ref: refs/heads/"):
+                branch_s.add(content[len("ref: refs/heads/"):])
+        return branch_s
+
+    def resolve_ref(self, ref_name):
+        '''
+        :param str ref_name: full name of a ref (like "refs/heads/integration"), or "HEAD"
+        :return: the commit hash the ref points to, after following symbolic refs, or None if the ref does not exist
+        :rtype: str
+        '''
+        for _ in range(10): # Guard against cycles of symbolic refs
+            if ref_name == "HEAD":
+                value                                   = self.head()
+            else:
+                value                                   = self._read_ref(ref_name)
+                if value is None:
+                    return None
+            if not value.startswith("refs/"):
+                return value
+            ref_name                                    = value
+        raise GitObjectReaderError(f"Too many levels of symbolic refs resolving '{ref_name}'")
+
+    def _read_ref(self, ref_name):
+        '''
+        :return: the hash ``ref_name`` points to or, for symbolic refs, the name of the ref it points to. Returns None
+            if ``ref_name`` does not exist.
+        :rtype: str
+        '''
+        content                                         = None
+        # Per-worktree refs live in the worktree's GIT dir, and shared refs in the common dir (via the ref index)
+        if self.git_dir != self.common_dir and _os.path.isfile(self.git_dir + "/" + ref_name):
+            with open(self.git_dir + "/" + ref_name) as file:
+                content                                 = file.read().strip()
+        if content is None:
+            content                                     = self.ref_index.get(ref_name)
+        if not content is None and content.startswith("ref:"):
+            return content[len("ref:"):].strip()
+        return content
+
+    def refs(self, prefix):
+        '''
+        :param str prefix: start of the full names of the refs to list. Examples: "refs/heads/", "refs/heads/story_"
+        :return: the refs whose name starts with ``prefix``, loose and packed, as (full ref name, commit hash) pairs
+            sorted by name
+        '''
+        for name, content in self.ref_index.iter_prefix(prefix):
+            if content.startswith("ref:"):
+                yield name, self.resolve_ref(content[len("ref:"):].strip())
+            else:
+                yield name, content
+
+    def branches(self, prefix=""):
+        '''
+        :param str prefix: optional start of the names of the branches wanted. Example: "story_". By default all
+            branches are returned.
+        :return: the names of local branches, sorted as ``git branch`` does
+        :rtype: list[str]
+        '''
+        return list(self.ref_index.names("refs/heads/", prefix))
+
+    def branch_exists(self, branch):
+        '''
+        :return: True if there is a local branch called ``branch``
+        :rtype: bool
+        '''
+        return self.ref_index.contains("refs/heads/" + branch)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    #   Objects
+    # ------------------------------------------------------------------------------------------------------------------
+
+    def last_commit(self, ref_name="HEAD"):
+        '''
+        :param str ref_name: the ref whose commit is wanted. Defaults to "HEAD"
+        :return: the commit ``ref_name`` points to
+        :rtype: CommitObject
+        '''
+        sha                                             = self.resolve_ref(ref_name)
+        if sha is None:
+            raise GitObjectReaderError(f"Ref '{ref_name}' does not exist")
+        return self.commit(sha)
+
+    def commit(self, sha):
+        '''
+        :param str sha: hash of a commit
+        :return: the parsed commit
+        :rtype: CommitObject
+        '''
+        object_type, content                            = self.read_object(sha)
+        if object_type != "commit":
+            raise GitObjectReaderError(f"Object '{sha}' is a {object_type}, not a commit")
+        return parse_commit(sha, content)
+
+    OBJECT_TYPES                                        = {1: "commit", 2: "tree", 3: "blob", 4: "tag"}
+    OFS_DELTA                                           = 6
+    REF_DELTA                                           = 7
+
+    def read_object(self, sha):
+        '''
+        :param str sha: hash of any GIT object
+        :return: the type of the object (like "commit") and its uncompressed content
+        :rtype: tuple[str, bytes]
+        '''
+        for object_dir in self._object_dirs():
+            path                                        = f"{object_dir}/{sha[:2]}/{sha[2:]}"
+            if _os.path.exists(path):
+                with open(path, "rb") as file:
+                    raw                                 = _zlib.decompress(file.read())
+                header, _, content                      = raw.partition(b"\0")
+                return header.split(b" ")[0].decode(), content
+
+        sha_bytes                                       = bytes.fromhex(sha)
+        for refresh in [False, True]: # If not found, GIT may have written a new pack since we listed them
+            for pack in self._packs(refresh):
+                offset                                  = pack.find(sha_bytes)
+                if not offset is None:
+                    return self._read_packed(pack, offset)
+
+        raise GitObjectReaderError(f"Object '{sha}' not found in '{self.repo_path}'")
+
+    def _object_dirs(self):
+        if self._object_dirs_l is None:
+            object_dirs_l                               = [self.common_dir + "/objects"]
+            alternates_path                             = self.common_dir + "/objects/info/alternates"
+            if _os.path.exists(alternates_path):
+                with open(alternates_path) as file:
+                    object_dirs_l                       += [_os.path.normpath(_os.path.join(object_dirs_l[0], line.strip()))
+                                                            for line in file if line.strip() != ""]
+            self._object_dirs_l                         = object_dirs_l
+        return self._object_dirs_l
+
+    def _packs(self, refresh=False):
+        if self._packs_l is None or refresh:
+            known_dict                                  = {pack.idx_path: pack for pack in self._packs_l or []}
+            packs_l                                     = []
+            for object_dir in self._object_dirs():
+                for idx_path in sorted(_glob.glob(object_dir + "/pack/*.idx")):
+                    packs_l.append(known_dict.pop(idx_path) if idx_path in known_dict else _PackFile(idx_path))
+            for stale_pack in known_dict.values():
+                stale_pack.close()
+            self._packs_l                               = packs_l
+        return self._packs_l
+
+    def _read_packed(self, pack, offset):
+        '''
+        :return: the type and content of the object at ``offset`` in ``pack``, after resolving deltas
+        :rtype: tuple[str, bytes]
+        '''
+        data                                            = pack.pack
+        byte                                            = data[offset]
+        object_type                                     = (byte >> 4) & 7
+        size                                            = byte & 0x0f
+        shift                                           = 4
+        position                                        = offset + 1
+        while byte & 0x80:
+            byte                                        = data[position]
+            size                                        |= (byte & 0x7f) << shift
+            shift                                       += 7
+            position                                    += 1
+
+        if object_type == self.OFS_DELTA:
+            byte                                        = data[position]
+            position                                    += 1
+            distance                                    = byte & 0x7f
+            while byte & 0x80:
+                byte                                    = data[position]
+                position                                += 1
+                distance                                = ((distance + 1) << 7) | (byte & 0x7f)
+            base_type, base                             = self._read_packed(pack, offset - distance)
+            return base_type, self._apply_delta(base, self._inflate(data, position, size))
+
+        if object_type == self.REF_DELTA:
+            base_sha                                    = data[position: position + 20].hex()
+            base_type, base                             = self.read_object(base_sha)
+            return base_type, self._apply_delta(base, self._inflate(data, position + 20, size))
+
+        if not object_type in self.OBJECT_TYPES:
+            raise GitObjectReaderError(f"Unknown object type {object_type} in '{pack.pack_path}'")
+        return self.OBJECT_TYPES[object_type], self._inflate(data, position, size)
+
+    def _inflate(self, data, position, size):
+        '''
+        Decompresses the zlib stream starting at ``position``, whose uncompressed length is ``size``. The compressed
+        length is not known up front, so the stream is fed in chunks until it ends.
+        '''
+        decompressor                                    = _zlib.decompressobj()
+        chunks_l                                        = []
+        chunk_size                                      = max(size, 64) + 64
+        while not decompressor.eof:
+            chunk                                       = data[position: position + chunk_size]
+            if len(chunk) == 0:
+                raise GitObjectReaderError("Truncated object in pack file")
+            chunks_l.append(decompressor.decompress(chunk))
+            position                                    += len(chunk)
+            chunk_size                                  *= 2
+        return b"".join(chunks_l)
+
+    def _apply_delta(self, base, delta):
+        def _varint(position):
+            value, shift                                = 0, 0
+            while True:
+                byte                                    = delta[position]
+                position                                += 1
+                value                                   |= (byte & 0x7f) << shift
+                shift                                   += 7
+                if not byte & 0x80:
+                    return value, position
+
+        _, position                                     = _varint(0) # Size of the base, which we already have
+        result_size, position                           = _varint(position)
+        result                                          = bytearray()
+        while position < len(delta):
+            opcode                                      = delta[position]
+            position                                    += 1
+            if opcode & 0x80: # Copy a range of the base
+                copy_offset, copy_size                  = 0, 0
+                for bit in range(4):
+                    if opcode & (1 << bit):
+                        copy_offset                     |= delta[position] << (8 * bit)
+                        position                        += 1
+                for bit in range(3):
+                    if opcode & (1 << (4 + bit)):
+                        copy_size                       |= delta[position] << (8 * bit)
+                        position                        += 1
+                if copy_size == 0:
+                    copy_size                           = 0x10000
+                result                                  += base[copy_offset: copy_offset + copy_size]
+            elif opcode > 0: # Insert the next `opcode` bytes of the delta
+                result                                  += delta[position: position + opcode]
+                position                                += opcode
+            else:
+                raise GitObjectReaderError("Invalid delta instruction")
+
+        if len(result) != result_size:
+            raise GitObjectReaderError("Delta produced an object of the wrong size")
+        return bytes(result)
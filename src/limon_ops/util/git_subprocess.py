@@ -0,0 +1,193 @@
+import asyncio
+import os                                                           as _os
+import signal                                                       as _signal
+import subprocess
+import weakref                                                      as _weakref
+
+from limon_ops.util.git_credentials                                 import GitCredentials
+from limon_ops.util.rate_budget                                     import RateBudget
+
+
+class GitCommandError(Exception):
+
+    '''
+    Raised when a GIT command exits with a non-zero status, or is killed after exceeding its timeout.
+
+    :param list[str] argv: the GIT command that failed
+    :param int status: its exit status, or None if it was killed after a timeout
+    :param str stderr: its standard error, without the trailing newline
+    '''
+    def __init__(self, argv, status, stderr):
+        self.argv                                       = argv
+        self.status                                     = status
+        self.stderr                                     = stderr
+        reason                                          = "timed out" if status is None else f"exit code({status})"
+        super().__init__(f"Cmd('{argv[0]}') failed due to: {reason}\n  cmdline: {' '.join(argv)}\n  stderr: '{stderr}'")
+
+
+class GitSubprocess():
+
+    '''
+    Runs GIT commands as child processes of the event loop, with ``asyncio.create_subprocess_exec``.
+
+    Waiting for a command costs no thread, so the number of commands in flight is bounded only by
+    :attr:`MAX_PROCESSES` (per event loop), which keeps the number of child processes and open pipes reasonable
+    even when a workflow starts thousands of commands at once. Commands that talk to a remote are also paced by the
+    :class:`RateBudget` of the event loop, if one is installed.
+
+    Output is read concurrently from stdout and stderr as the command runs, so commands with large outputs don't
+    block on full pipes. Commands that are cancelled, or that exceed their timeout, are killed rather than left
+    running.
+
+    To behave like the GitPython-based execution used previously, GIT runs with the ``C`` locale (so that its
+    messages can be parsed), without standard input, and outputs are decoded as UTF-8 with one trailing newline
+    removed.
+    '''
+
+    # Maximum number of GIT processes running at the same time in one event loop. Can be overridden with the
+    # LIMON_GIT_MAX_PROCESSES environment variable
+    MAX_PROCESSES                                       = int(_os.environ.get("LIMON_GIT_MAX_PROCESSES", 64))
+
+    # Semaphores are bound to the event loop they are first used in, and workflows run one event loop after another
+    _semaphores                                         = _weakref.WeakKeyDictionary()
+
+    def semaphore():
+        '''
+        :return: the semaphore that bounds the GIT processes of the running event loop
+        :rtype: asyncio.Semaphore
+        '''
+        loop                                            = asyncio.get_running_loop()
+        semaphore                                       = GitSubprocess._semaphores.get(loop)
+        if semaphore is None:
+            semaphore                                   = asyncio.Semaphore(GitSubprocess.MAX_PROCESSES)
+            GitSubprocess._semaphores[loop]             = semaphore
+        return semaphore
+
+    def environment(env=None):
+        '''
+        :param dict env: optional environment variables to add to those of this process
+        :return: the environment for GIT processes, including the credentials registered with
+            :class:`GitCredentials`
+        :rtype: dict
+        '''
+        result_dict                                     = dict(_os.environ)
+        result_dict.update({"LANGUAGE": "C", "LC_ALL": "C"})
+        result_dict.update(GitCredentials.environment())
+        if not env is None:
+            result_dict.update(env)
+        return result_dict
+
+    async def run(argv, cwd, env=None, timeout=None):
+        '''
+        :param list[str] argv: the GIT command to run. Example: ["git", "status"]
+        :param str cwd: the folder to run it in
+        :param dict env: optional environment variables for GIT, in addition to those of this process
+        :param float timeout: optional maximum duration of the command, in seconds. If exceeded, the command is
+            killed and :class:`GitCommandError` is raised, with a ``status`` of None
+        :return: the exit status, standard output and standard error of the command
+        :rtype: tuple[int, str, str]
+        '''
+        if RateBudget.is_remote(argv):
+            await RateBudget.spend()
+        async with GitSubprocess.semaphore():
+            process                                     = await asyncio.create_subprocess_exec(
+                                                                *argv,
+                                                                cwd         = cwd,
+                                                                env         = GitSubprocess.environment(env),
+                                                                stdin       = subprocess.DEVNULL,
+                                                                stdout      = subprocess.PIPE,
+                                                                stderr      = subprocess.PIPE)
+            try:
+                stdout, stderr                          = await asyncio.wait_for(process.communicate(), timeout)
+            except asyncio.TimeoutError:
+                await GitSubprocess._kill(process)
+                raise GitCommandError(argv, None, f"no result after {timeout} seconds")
+            except BaseException:
+                # Typically asyncio.CancelledError. Don't leave GIT running unattended
+                await GitSubprocess._kill(process)
+                raise
+
+        return process.returncode, GitSubprocess._decode(stdout), GitSubprocess._decode(stderr)
+
+    async def stream(argv, cwd, env=None, separator=b"\n", timeout=None):
+        '''
+        Async generator that runs a GIT command and yields its standard output one record at a time, as soon as
+        each record is complete, so that large outputs are never held in memory at once and callers can start
+        processing (or stop early) before GIT finishes.
+
+        Callers that may stop before the end should close the generator deterministically, so that GIT is killed
+        right away rather than whenever the generator is garbage collected::
+
+            async with contextlib.aclosing(GitSubprocess.stream(argv, cwd)) as records:
+                async for record in records:
+                    ...
+
+        :param list[str] argv: the GIT command to run. Example: ["git", "log", "-z"]
+        :param str cwd: the folder to run it in
+        :param dict env: optional environment variables for GIT, in addition to those of this process
+        :param bytes separator: what separates records. Defaults to newlines. Use b"\\0" for GIT's ``-z`` outputs
+        :param float timeout: optional maximum time to wait for each chunk of output, in seconds
+        :return: the records, as bytes and without the separator. If the output doesn't end with ``separator``,
+            the text after the last one is the last record
+        :raises GitCommandError: once all output was yielded, if GIT failed
+        '''
+        if RateBudget.is_remote(argv):
+            await RateBudget.spend()
+        async with GitSubprocess.semaphore():
+            process                                     = await asyncio.create_subprocess_exec(
+                                                                *argv,
+                                                                cwd         = cwd,
+                                                                env         = GitSubprocess.environment(env),
+                                                                stdin       = subprocess.DEVNULL,
+                                                                stdout      = subprocess.PIPE,
+                                                                stderr      = subprocess.PIPE)
+            # Drain stderr on the side, so that GIT never blocks on a full stderr pipe
+            stderr_task                                 = asyncio.ensure_future(process.stderr.read())
+            try:
+                buffer                                  = b""
+                while True:
+                    try:
+                        chunk                           = await asyncio.wait_for(process.stdout.read(GitSubprocess.CHUNK_SIZE),
+                                                                                 timeout)
+                    except asyncio.TimeoutError:
+                        raise GitCommandError(argv, None, f"no output for {timeout} seconds")
+                    if chunk == b"":
+                        break
+                    record_l                            = (buffer + chunk).split(separator)
+                    buffer                              = record_l.pop()
+                    for record in record_l:
+                        yield record
+                if buffer != b"":
+                    yield buffer
+
+                stderr                                  = await stderr_task
+                await process.wait()
+            finally:
+                await GitSubprocess._kill(process)
+                stderr_task.cancel()
+
+        if process.returncode != 0:
+            raise GitCommandError(argv, process.returncode, GitSubprocess._decode(stderr))
+
+    # Size of the reads from the output of streamed commands, in bytes
+    CHUNK_SIZE                                          = 64 * 1024
+
+    async def _kill(process):
+        if process.returncode is None:
+            try:
+                if hasattr(_signal, "SIGKILL"):
+                    # GOTCHA:
+                    #       process.kill() first polls the child, and if it just exited, reaps it behind the back of
+                    #   asyncio's child watcher, which then logs "Unknown child process pid ...". Signalling the pid
+                    #   directly is safe, since the pid can't be reused until the watcher reaps the child.
+                    #
+                    _os.kill(process.pid, _signal.SIGKILL)
+                else:
+                    process.kill()
+            except ProcessLookupError:
+                pass # It just finished
+            await process.wait()
+
+    def _decode(output):
+        text                                            = output.decode("utf-8", errors="surrogateescape")
+        return text[:-1] if text.endswith("\n") else text
@@ -1,9 +1,14 @@
-from httpx                                                  import AsyncClient
+import os                                                   as _os
 
-from conway.application.application                         import Application
 from conway.util.secrets                                    import Secrets
 
 from conway_ops.util.github_response_handler                import GitHub_ReponseHandler
+from limon_ops.observability.tracer                         import Tracer
+from limon_ops.util.lazy_import                             import LazyImport
+from limon_ops.util.rate_budget                             import RateBudget
+
+# httpx is only needed once the client is entered, so defer its import until then
+AsyncClient                                                 = LazyImport("httpx", "AsyncClient")
 
 class GitHub_Client():
 
@@ -12,11 +17,24 @@ class GitHub_Client():
 
     :param str github_owner: the GitHub account under which we will be invoking GitHub APIs. May be a user or an
         organization.
+    :param str api_url: optional base URL of the GitHub API. By default it is None, in which case the value of
+        the ``LIMON_GITHUB_API_URL`` environment variable is used if set, and "https://api.github.com" otherwise.
+        Benchmarks set it to point to a local stand-in for the GitHub API.
+    :param str token: optional GitHub token to authenticate with. By default it is None, in which case the token
+        given by ``Secrets.GIT_HUB_TOKEN()`` is used.
     '''
-    def __init__(self, github_owner):
+    def __init__(self, github_owner, api_url=None, token=None):
         self.github_owner                       = github_owner
+        self.token                              = token
+        if api_url is None:
+            api_url                             = _os.environ.get("LIMON_GITHUB_API_URL", "https://api.github.com")
+        self.api_url                            = api_url
         self.async_client                       = None # will be created in enter
 
+        # Updated from the headers of each response, so that callers can pace themselves
+        self.rate_limit_remaining               = None
+        self.rate_limit_reset                   = None
+
     async def __aenter__(self):
         '''
         '''
@@ -86,6 +104,19 @@ class GitHub_Client():
         result                                  = await self._http_call("DELETE", sub_path=sub_path, resource=resource)
         return result
         
+    async def GRAPHQL(self, query, variables):
+        '''
+        Runs a query against the GitHub GraphQL API, which can fetch data about many repos in a single call.
+
+        :param str query: the GraphQL query
+        :param dict variables: values for the variables declared by ``query``
+        :return: the JSON response, with the query results under "data" and any errors under "errors"
+        :rtype: dict
+        '''
+        result                                  = await self._http_call("POST", resource="graphql", sub_path="", 
+                                                                        body={"query": query, "variables": variables})
+        return result
+
     async def _http_call(self, method, resource, sub_path, body={}):
         '''
         Invokes the Git Hub API specified by the parameters.
@@ -99,7 +130,7 @@ class GitHub_Client():
         :return: A Json representation of the resource as given by the GitHub API
         :rtype: str
         '''
-        GIT_HUB_API                         = f"https://api.github.com"
+        GIT_HUB_API                         = self.api_url
         #Application.app().log(f"~~~~    limon      GitHubClient   ~~~~ ")
 
         match resource:
@@ -111,6 +142,8 @@ class GitHub_Client():
                 #   resource, which can manipulate "other" users different from the currently authenticated user.
                 #   To create/update repos for a user, use the "user" resource, not the "users" resource.
                 url                   = f"{GIT_HUB_API}/user{sub_path}"
+            case "graphql":
+                url                   = f"{GIT_HUB_API}/graphql"
             case "": # Return meta information
                 url                   = f"{GIT_HUB_API}"
             case _:
@@ -120,7 +153,7 @@ class GitHub_Client():
         #APP.log(f"... calling '{method} {url}'")
         
         headers = {
-            'Authorization': 'Bearer ' + Secrets.GIT_HUB_TOKEN(),
+            'Authorization': 'Bearer ' + (Secrets.GIT_HUB_TOKEN() if self.token is None else self.token),
             'Content-Type' : 'application/json',
             # GOTCHA:
             #       Painfully found that GitHub post APIs will only work with the "vnd.github*" MIME types
@@ -128,29 +161,39 @@ class GitHub_Client():
             'Accept'        : 'application/vnd.github+json'
             
         }
-        try:
-            response                        = await self.async_client.request(   
+        # Shared with the other workflows of the event loop, if they run under a common budget
+        await RateBudget.spend()
+        with Tracer.tracer().span(f"{method} {resource}{sub_path}", "github_api", method=method, url=url) as span:
+            try:
+                response                    = await self.async_client.request(   
                                                                 method          = method, 
                                                                 url             = url, 
                                                                 json            = body,
                                                                 headers         = headers, 
                                                                 timeout         = 20) 
-            
-            '''
-            async request(self, method, url, *, 
-            content=None, data=None, files=None, 
-            json=None, 
-            params=None, 
-            headers=None, 
-            cookies=None, 
-            auth=, 
-            follow_redirects=, 
-            timeout=, 
-            extensions=None)
-            '''
-
-        except Exception as ex:
-            raise ValueError("Problem connecting to Git Hub. Error is: " + str(ex))
+                
+                '''
+                async request(self, method, url, *, 
+                content=None, data=None, files=None, 
+                json=None, 
+                params=None, 
+                headers=None, 
+                cookies=None, 
+                auth=, 
+                follow_redirects=, 
+                timeout=, 
+                extensions=None)
+                '''
+
+            except Exception as ex:
+                raise ValueError("Problem connecting to Git Hub. Error is: " + str(ex))
+
+            span.set("status_code", response.status_code)
+            span.set("output_bytes", len(response.content))
+
+        if "X-RateLimit-Remaining" in response.headers:
+            self.rate_limit_remaining           = int(response.headers["X-RateLimit-Remaining"])
+            self.rate_limit_reset               = int(response.headers.get("X-RateLimit-Reset", 0))
         
         return GitHub_ReponseHandler().process(response)    
 
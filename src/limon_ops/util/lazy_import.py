@@ -0,0 +1,76 @@
+import importlib                                                    as _importlib
+
+
+class LazyImport():
+
+    '''
+    Stand-in for a module, or for an attribute of a module, whose import is deferred until it is first used.
+
+    It lets modules keep their usual top-level aliases (e.g., ``_pd.DataFrame`` or ``RepoInspectorFactory.findInspector``)
+    while only paying for heavy imports like pandas, xlsxwriter, httpx or GitPython in the workflows that actually
+    need them.
+
+    Example::
+
+        _pd                     = LazyImport("pandas")
+        ReportWriter            = LazyImport("conway.reports.report_writer", "ReportWriter")
+
+    :param str module_name: fully qualified name of the module to import on first use.
+    :param str attribute: optional name of an attribute of the module to stand in for, instead of the module itself.
+        By default it is None, in which case the module itself is what is stood in for.
+    '''
+    def __init__(self, module_name, attribute=None):
+        self._module_name                               = module_name
+        self._attribute                                 = attribute
+        self._target                                    = None
+
+    def resolve(self):
+        '''
+        Imports the module (if not already imported) and returns the real object this :class:`LazyImport` stands in for.
+        '''
+        if self._target is None:
+            module                                      = _importlib.import_module(self._module_name)
+            self._target                                = module if self._attribute is None \
+                                                                else getattr(module, self._attribute)
+        return self._target
+
+    def is_resolved(self):
+        '''
+        :return: True if the import has already happened.
+        :rtype: bool
+        '''
+        return self._target is not None
+
+    def __getattr__(self, name):
+        # GOTCHA:
+        #   __getattr__ is only called for attributes not found the usual way, so the private attributes set in
+        #   the constructor never recurse into here.
+        #
+        return getattr(self.resolve(), name)
+
+    def __call__(self, *args, **kwargs):
+        return self.resolve()(*args, **kwargs)
+
+    def __repr__(self):
+        target                                          = self._module_name if self._attribute is None \
+                                                                else f"{self._module_name}.{self._attribute}"
+        status                                          = "resolved" if self.is_resolved() else "deferred"
+        return f"<LazyImport {target} ({status})>"
+
+
+def lazy_attributes(package_name, attribute_map):
+    '''
+    Builds a module-level ``__getattr__`` (as per PEP 562) for a package ``__init__.py``, so that the package can
+    re-export classes from its sub-modules without importing those sub-modules until an attribute is first accessed.
+
+    :param str package_name: the ``__name__`` of the package whose attributes are being defined.
+    :param dict attribute_map: maps each exported attribute name to the (relative) sub-module defining it.
+    :return: a function suitable to be assigned to the package's ``__getattr__``
+    '''
+    def __getattr__(name):
+        if not name in attribute_map:
+            raise AttributeError(f"module '{package_name}' has no attribute '{name}'")
+        module                                          = _importlib.import_module(f"{package_name}.{attribute_map[name]}")
+        return getattr(module, name)
+
+    return __getattr__
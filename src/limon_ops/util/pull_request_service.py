@@ -0,0 +1,245 @@
+import asyncio
+import time
+
+from dataclasses                                                    import dataclass
+
+
+@dataclass(frozen=True)
+class PullRequestSpec():
+
+    '''
+    A pull request that a workflow wants to exist.
+
+    :param str repo_name: name of the GitHub repo, under the client's owner
+    :param str from_branch: the branch with the changes (GitHub's "head")
+    :param str to_branch: the branch to merge them into (GitHub's "base")
+    :param str title: title of the pull request, if it has to be created
+    :param str body: description of the pull request, if it has to be created
+    '''
+    repo_name:                                          str
+    from_branch:                                        str
+    to_branch:                                          str
+    title:                                              str
+    body:                                               str
+
+
+@dataclass(frozen=True)
+class PullRequestResult():
+
+    '''
+    What the :class:`PullRequestService` did for a :class:`PullRequestSpec`.
+
+    :param PullRequestSpec spec: the pull request asked for
+    :param str status: one of :attr:`PullRequestService.CREATED`, :attr:`PullRequestService.EXISTING` (an open pull
+        request for the same branches was found), :attr:`PullRequestService.NO_CHANGES` (``from_branch`` has no
+        commits that ``to_branch`` lacks, so there is nothing to merge) or :attr:`PullRequestService.FAILED`
+    :param int number: number of the pull request, if there is one
+    :param str url: web page of the pull request, if there is one
+    :param str error: why it failed, if it did
+    '''
+    spec:                                               PullRequestSpec
+    status:                                             str
+    number:                                             int         = None
+    url:                                                str         = None
+    error:                                              str         = None
+
+
+class PullRequestService():
+
+    '''
+    Creates pull requests across the repos of a bundle with as few GitHub API calls as possible:
+
+    1. For all requested pull requests at once, a single GraphQL query (per :attr:`BATCH_SIZE` requests) compares
+       the branches and looks for open pull requests between them. If the GraphQL API is not available (e.g.,
+       with GitHub Enterprise servers that disable it), the REST API is used instead, listing the open pull
+       requests of each repo only once.
+    2. Pull requests with nothing to merge are skipped, and open pull requests that already exist are reused.
+       Open pull requests found are cached for the lifetime of this service, so workflows that ask for the
+       same pull request again don't query for it.
+    3. The remaining pull requests are created concurrently, with at most ``max_concurrency`` calls in flight.
+       When the rate limit reported by GitHub falls to ``rate_limit_reserve``, creation pauses until the limit
+       resets (or for at most ``max_rate_limit_wait_s`` seconds).
+
+    Example::
+
+        async with GitHub_Client("my-org") as client:
+            service = PullRequestService(client)
+            results = await service.pull_requests([PullRequestSpec("repo_a", "integration", "master", title, body)])
+
+    :param GitHub_Client client: an entered client, whose owner is the owner of all repos
+    :param int max_concurrency: maximum number of pull requests created at the same time
+    :param int rate_limit_reserve: number of API calls left at which creation pauses, leaving them for other tools
+    :param float max_rate_limit_wait_s: longest pause waiting for the rate limit to reset, in seconds
+    '''
+    def __init__(self, client, max_concurrency=4, rate_limit_reserve=50, max_rate_limit_wait_s=60):
+        self.client                                     = client
+        self.max_concurrency                            = max_concurrency
+        self.rate_limit_reserve                         = rate_limit_reserve
+        self.max_rate_limit_wait_s                      = max_rate_limit_wait_s
+        self._open_prs_dict                             = {} # (repo_name, from_branch, to_branch) -> (number, url)
+
+    CREATED                                             = "created"
+    EXISTING                                            = "existing"
+    NO_CHANGES                                          = "no_changes"
+    FAILED                                              = "failed"
+
+    # GitHub limits the cost of a single GraphQL query, so large bundles are split across several queries
+    BATCH_SIZE                                          = 50
+
+    async def pull_requests(self, spec_l):
+        '''
+        Makes sure that each of the pull requests in ``spec_l`` exists, unless it would have nothing to merge.
+
+        :param list[PullRequestSpec] spec_l: the pull requests wanted
+        :return: what was done for each pull request, in the same order as ``spec_l``
+        :rtype: list[PullRequestResult]
+        '''
+        results_dict                                    = {}
+        to_query_l                                      = []
+        for spec in spec_l:
+            key                                         = (spec.repo_name, spec.from_branch, spec.to_branch)
+            if key in self._open_prs_dict:
+                number, url                             = self._open_prs_dict[key]
+                results_dict[spec]                      = PullRequestResult(spec, self.EXISTING, number, url)
+            else:
+                to_query_l.append(spec)
+
+        to_create_l                                     = []
+        for start in range(0, len(to_query_l), self.BATCH_SIZE):
+            batch_l                                     = to_query_l[start: start + self.BATCH_SIZE]
+            try:
+                result_l                                = await self._query(batch_l)
+            except Exception:
+                result_l                                = await self._query_rest(batch_l)
+            for spec, result in zip(batch_l, result_l):
+                if result is None:
+                    to_create_l.append(spec)
+                else:
+                    results_dict[spec]                  = result
+
+        semaphore                                       = asyncio.Semaphore(self.max_concurrency)
+        async def _create_one(spec):
+            async with semaphore:
+                await self._respect_rate_limit()
+                results_dict[spec]                      = await self._create(spec)
+
+        await asyncio.gather(*[_create_one(spec) for spec in to_create_l])
+        return [results_dict[spec] for spec in spec_l]
+
+    async def _query(self, spec_l):
+        '''
+        Compares branches and lists open pull requests for all of ``spec_l`` in one GraphQL query.
+
+        :return: for each spec, its result if nothing needs to be created, or None if the pull request must be
+            created
+        :rtype: list[PullRequestResult]
+        '''
+        declaration_l                                   = ["$owner: String!"]
+        field_l                                         = []
+        variables                                       = {"owner": self.client.github_owner}
+        for idx, spec in enumerate(spec_l):
+            declaration_l                               += [f"$repo{idx}: String!", f"$base{idx}: String!",
+                                                            f"$head{idx}: String!", f"$baseName{idx}: String!",
+                                                            f"$headName{idx}: String!"]
+            variables.update({f"repo{idx}":         spec.repo_name,
+                              f"base{idx}":         f"refs/heads/{spec.to_branch}",
+                              f"head{idx}":         f"refs/heads/{spec.from_branch}",
+                              f"baseName{idx}":     spec.to_branch,
+                              f"headName{idx}":     spec.from_branch})
+            field_l.append(f'''
+                q{idx}: repository(owner: $owner, name: $repo{idx}) {{
+                    ref(qualifiedName: $base{idx}) {{
+                        compare(headRef: $head{idx}) {{ aheadBy behindBy }}
+                    }}
+                    pullRequests(states: OPEN, baseRefName: $baseName{idx}, headRefName: $headName{idx}, first: 1) {{
+                        nodes {{ number url }}
+                    }}
+                }}''')
+        query                                           = f"query({', '.join(declaration_l)}) {{{''.join(field_l)}\n}}"
+
+        response                                        = await self.client.GRAPHQL(query, variables)
+        if not isinstance(response, dict) or not "data" in response:
+            raise ValueError(f"Unexpected response from the GitHub GraphQL API: {response}")
+        data                                            = response.get("data") or {}
+        errors_dict                                     = {}
+        for error in response.get("errors") or []:
+            path_l                                      = error.get("path") or ["?"]
+            errors_dict.setdefault(path_l[0], error.get("message"))
+
+        result_l                                        = []
+        for idx, spec in enumerate(spec_l):
+            repo_data                                   = data.get(f"q{idx}")
+            if repo_data is None:
+                result_l.append(PullRequestResult(spec, self.FAILED,
+                                                  error=errors_dict.get(f"q{idx}", "repository not found")))
+                continue
+            open_pr_l                                   = repo_data["pullRequests"]["nodes"]
+            if len(open_pr_l) > 0:
+                number, url                             = open_pr_l[0]["number"], open_pr_l[0]["url"]
+                self._open_prs_dict[(spec.repo_name, spec.from_branch, spec.to_branch)] \
+                                                        = (number, url)
+                result_l.append(PullRequestResult(spec, self.EXISTING, number, url))
+            elif repo_data["ref"] is None or repo_data["ref"]["compare"] is None:
+                result_l.append(PullRequestResult(spec, self.FAILED,
+                                                  error=f"branch '{spec.to_branch}' or '{spec.from_branch}' not found"))
+            elif repo_data["ref"]["compare"]["aheadBy"] == 0:
+                result_l.append(PullRequestResult(spec, self.NO_CHANGES))
+            else:
+                result_l.append(None)
+        return result_l
+
+    async def _query_rest(self, spec_l):
+        '''
+        Same as :meth:`_query`, but with the REST API: one call to list the open pull requests of each repo, and
+        one comparison per spec, all of them concurrent.
+
+        :rtype: list[PullRequestResult]
+        '''
+        repo_name_l                                     = list(dict.fromkeys(spec.repo_name for spec in spec_l))
+        listing_l                                       = await asyncio.gather(*[self.client.GET("repos", f"/{repo_name}/pulls?per_page=100")
+                                                                                 for repo_name in repo_name_l])
+        for repo_name, pr_l in zip(repo_name_l, listing_l):
+            for pr in pr_l:
+                self._open_prs_dict[(repo_name, pr["head"]["ref"], pr["base"]["ref"])] \
+                                                        = (pr.get("number"), pr.get("html_url"))
+
+        async def _query_one(spec):
+            key                                         = (spec.repo_name, spec.from_branch, spec.to_branch)
+            if key in self._open_prs_dict:
+                number, url                             = self._open_prs_dict[key]
+                return PullRequestResult(spec, self.EXISTING, number, url)
+            try:
+                comparison                              = await self.client.GET("repos", f"/{spec.repo_name}/compare/"
+                                                                                f"{spec.to_branch}...{spec.from_branch}")
+            except Exception as ex:
+                return PullRequestResult(spec, self.FAILED, error=str(ex))
+            if comparison.get("ahead_by") == 0:
+                return PullRequestResult(spec, self.NO_CHANGES)
+            return None
+
+        return list(await asyncio.gather(*[_query_one(spec) for spec in spec_l]))
+
+    async def _create(self, spec):
+        try:
+            pr                                          = await self.client.POST("repos", f"/{spec.repo_name}/pulls",
+                                                                                 body = {"title":    spec.title,
+                                                                                         "head":     spec.from_branch,
+                                                                                         "base":     spec.to_branch,
+                                                                                         "body":     spec.body})
+        except Exception as ex:
+            return PullRequestResult(spec, self.FAILED, error=str(ex))
+
+        self._open_prs_dict[(spec.repo_name, spec.from_branch, spec.to_branch)] \
+                                                        = (pr.get("number"), pr.get("html_url"))
+        return PullRequestResult(spec, self.CREATED, pr.get("number"), pr.get("html_url"))
+
+    async def _respect_rate_limit(self):
+        '''
+        Waits for the rate limit to reset if the last response from GitHub says that few calls are left.
+        '''
+        remaining                                       = self.client.rate_limit_remaining
+        if remaining is None or remaining > self.rate_limit_reserve:
+            return
+        wait_s                                          = (self.client.rate_limit_reset or 0) - time.time()
+        if wait_s > 0:
+            await asyncio.sleep(min(wait_s, self.max_rate_limit_wait_s))
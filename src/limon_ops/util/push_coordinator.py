@@ -0,0 +1,201 @@
+import asyncio
+import os                                                           as _os
+import shlex                                                        as _shlex
+import sys
+
+from dataclasses                                                    import dataclass
+
+from limon_ops.util.git_local_client                                import GitLocalClient
+
+
+@dataclass(frozen=True)
+class RefPushResult():
+
+    '''
+    Outcome of pushing one refspec, as reported by ``git push --porcelain``.
+
+    :param str flag: GIT's one-character status for the ref: " " (fast-forward), "+" (forced update), "-" (deleted),
+        "*" (new ref), "=" (up to date) or "!" (rejected or failed)
+    :param str source: the local ref pushed, or "" when deleting a remote ref
+    :param str destination: the remote ref updated. Example: "refs/heads/story_1455"
+    :param str summary: GIT's description of what happened. Examples: "[new branch]", "[rejected] (non-fast-forward)"
+    '''
+    flag:                                               str
+    source:                                             str
+    destination:                                        str
+    summary:                                            str
+
+    @property
+    def ok(self):
+        return self.flag != "!"
+
+
+@dataclass(frozen=True)
+class RepoPushResult():
+
+    '''
+    Outcome of the single atomic push made for one repo by a :class:`PushCoordinator`.
+
+    :param str repo_path: the local repo that was pushed from
+    :param list[str] refspecs: the refspecs pushed
+    :param int exit_status: exit status of ``git push``
+    :param list[RefPushResult] ref_results: per-ref outcomes reported by GIT. May be empty if GIT failed before
+        contacting the remote (e.g., authentication failure), in which case ``error`` says why
+    :param str error: GIT's error output if the push failed, else None
+    '''
+    repo_path:                                          str
+    refspecs:                                           list
+    exit_status:                                        int
+    ref_results:                                        list
+    error:                                              str
+
+    @property
+    def ok(self):
+        return self.exit_status == 0 and all(ref_result.ok for ref_result in self.ref_results)
+
+
+class PushCoordinator():
+
+    '''
+    Batches the remote ref updates of a workflow, so that each repo is pushed to exactly once.
+
+    Workflows register the branches to update or delete in each repo with :meth:`update` and :meth:`delete`, and
+    then call :meth:`push`, which:
+
+    * pushes all refspecs of a repo with a single ``git push --atomic --porcelain``, so that there is one
+      authenticated session per repo instead of one per ref, and the remote either accepts all the repo's ref
+      updates or none of them.
+    * pushes repos concurrently, but no more than ``max_concurrency`` at a time, to stay polite with the remote.
+    * reuses SSH connections across pushes to the same host via OpenSSH's ``ControlMaster``, with a control socket
+      folder managed by this class. This has no effect on HTTPS or file system remotes.
+    * returns per-ref results parsed from GIT's porcelain output, instead of raising on the first failure.
+
+    Example::
+
+        coordinator = PushCoordinator()
+        for repo_name in repo_names:
+            coordinator.update(f"{local_root}/{repo_name}", "integration")
+        results = await coordinator.push()
+
+    :param str remote: name of the remote to push to in all repos. Defaults to "origin"
+    :param int max_concurrency: maximum number of repos pushed at the same time
+    :param bool reuse_ssh_connections: whether to multiplex SSH sessions via ``ControlMaster``. It is ignored on
+        Windows, where OpenSSH does not support it.
+    '''
+    def __init__(self, remote="origin", max_concurrency=8, reuse_ssh_connections=True):
+        self.remote                                     = remote
+        self.max_concurrency                            = max_concurrency
+        self.reuse_ssh_connections                      = reuse_ssh_connections and sys.platform != "win32"
+        self._refspecs_dict                             = {}
+
+    # How long an idle master SSH connection stays open after the last push that used it
+    CONTROL_PERSIST                                     = "60s"
+
+    def update(self, repo_path, branch):
+        '''
+        Registers that the remote ``branch`` of the repo at ``repo_path`` must be updated from the local ``branch``.
+        '''
+        self._add(repo_path, f"refs/heads/{branch}:refs/heads/{branch}")
+
+    def delete(self, repo_path, branch):
+        '''
+        Registers that the remote ``branch`` of the repo at ``repo_path`` must be deleted.
+        '''
+        self._add(repo_path, f":refs/heads/{branch}")
+
+    def _add(self, repo_path, refspec):
+        refspec_l                                       = self._refspecs_dict.setdefault(str(repo_path), [])
+        if not refspec in refspec_l:
+            refspec_l.append(refspec)
+
+    def pending(self):
+        '''
+        :return: the refspecs registered so far and not yet pushed, for each repo
+        :rtype: dict
+        '''
+        return {repo_path: list(refspec_l) for repo_path, refspec_l in self._refspecs_dict.items()}
+
+    async def push(self):
+        '''
+        Pushes all registered refspecs, with one atomic push per repo, and forgets them.
+
+        :return: the result for each repo, in the order in which repos were first registered
+        :rtype: list[RepoPushResult]
+        '''
+        refspecs_dict                                   = self._refspecs_dict
+        self._refspecs_dict                             = {}
+        if len(refspecs_dict) == 0:
+            return []
+
+        env                                             = self.ssh_environment()
+        semaphore                                       = asyncio.Semaphore(self.max_concurrency)
+
+        async def _push_one(repo_path, refspec_l):
+            async with semaphore:
+                executor                                = GitLocalClient(repo_path)
+                argv                                    = ["git", "push", "--atomic", "--porcelain", self.remote] \
+                                                            + refspec_l
+                exit_status, stdout, stderr             = await executor.execute_argv_unchecked(argv, env=env)
+                return RepoPushResult(repo_path     = repo_path,
+                                      refspecs      = refspec_l,
+                                      exit_status   = exit_status,
+                                      ref_results   = self.parse_porcelain(stdout),
+                                      error         = None if exit_status == 0 else stderr.strip())
+
+        return list(await asyncio.gather(*[_push_one(repo_path, refspec_l)
+                                            for repo_path, refspec_l in refspecs_dict.items()]))
+
+    def ssh_environment(self):
+        '''
+        :return: the environment variables that make GIT multiplex SSH connections through a master connection
+            per host, or None if connections are not to be reused. Any ``GIT_SSH_COMMAND`` already set by the
+            user is kept, with the multiplexing options appended.
+        :rtype: dict
+        '''
+        if not self.reuse_ssh_connections:
+            return None
+        control_dir                                     = self.control_dir()
+        _os.makedirs(control_dir, mode=0o700, exist_ok=True)
+
+        ssh_command                                     = _os.environ.get("GIT_SSH_COMMAND", "ssh")
+        # GOTCHA:
+        #   Unix socket paths are limited to about 100 characters, so use "%C" (a hash of the connection
+        #   parameters) rather than a path built from the host and user names.
+        #
+        options_l                                       = ["-o", "ControlMaster=auto",
+                                                           "-o", f"ControlPath={control_dir}/%C",
+                                                           "-o", f"ControlPersist={self.CONTROL_PERSIST}"]
+        return {"GIT_SSH_COMMAND": ssh_command + " " + _shlex.join(options_l)}
+
+    def control_dir(self):
+        '''
+        :return: the folder for the SSH control sockets: under ``$XDG_RUNTIME_DIR`` if it is set, else under
+            ``~/.limon``
+        :rtype: str
+        '''
+        runtime_dir                                     = _os.environ.get("XDG_RUNTIME_DIR")
+        if runtime_dir is None:
+            runtime_dir                                 = _os.path.expanduser("~/.limon")
+        return runtime_dir + "/ssh"
+
+    def parse_porcelain(self, output):
+        '''
+        :param str output: the standard output of ``git push --porcelain``, which looks like::
+
+                To github.com:my-org/my-repo.git
+                *	refs/heads/story_1455:refs/heads/story_1455	[new branch]
+                -	:refs/heads/story_1302	[deleted]
+                Done
+
+        :return: one result for each ref line in ``output``
+        :rtype: list[RefPushResult]
+        '''
+        result_l                                        = []
+        for line in output.splitlines():
+            fields_l                                    = line.split("\t")
+            if len(fields_l) != 3 or len(fields_l[0]) != 1:
+                continue # "To <url>" and "Done" lines
+            flag, refs, summary                         = fields_l
+            source, _, destination                      = refs.partition(":")
+            result_l.append(RefPushResult(flag=flag, source=source, destination=destination, summary=summary))
+        return result_l
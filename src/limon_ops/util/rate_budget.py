@@ -0,0 +1,100 @@
+import asyncio
+import time
+import weakref                                                      as _weakref
+
+
+class RateBudget():
+
+    '''
+    Token bucket that paces the calls limon makes to remote services: GIT commands that talk to a remote (see
+    :attr:`REMOTE_COMMANDS`) and GitHub API calls. Up to ``burst`` calls can be made at once, after which calls are
+    spread to ``rate_per_s`` per second.
+
+    A budget applies to the event loop it is installed in, with :meth:`install`, so that all the workflows sharing
+    that event loop (like those scheduled by a :class:`BundleOrchestrator`) share it too. :class:`GitSubprocess`
+    and :class:`GitHub_Client` call :meth:`spend` before each remote call, which returns right away when no budget
+    is installed, as is the case for workflows run on their own.
+
+    :param float rate_per_s: calls allowed per second, on average
+    :param int burst: calls allowed at once, when the budget was not used for a while. Defaults to ``rate_per_s``,
+        and is at least 1
+    '''
+    def __init__(self, rate_per_s, burst=None):
+        if rate_per_s <= 0:
+            raise ValueError(f"A rate budget needs a positive rate, not {rate_per_s}")
+        self.rate_per_s                                 = rate_per_s
+        self.burst                                      = max(1, int(rate_per_s if burst is None else burst))
+        self.tokens                                     = float(self.burst)
+        self.last_refill                                = time.monotonic()
+        self.calls                                      = 0
+        self.waited_s                                   = 0.0
+
+    # GIT commands that talk to a remote, and so spend from the budget
+    REMOTE_COMMANDS                                     = {"clone", "fetch", "pull", "push", "ls-remote"}
+
+    # GIT options that take the next argument as their value, skipped when looking for the command
+    _OPTIONS_WITH_VALUE                                 = {"-c", "-C", "--git-dir", "--work-tree"}
+
+    # Budgets are bound to the event loop they are installed in, like the semaphores of GitSubprocess
+    _budgets                                            = _weakref.WeakKeyDictionary()
+
+    def install(budget):
+        '''
+        :param RateBudget budget: the budget for the calls made from the running event loop, or None to remove it
+        '''
+        loop                                            = asyncio.get_running_loop()
+        if budget is None:
+            RateBudget._budgets.pop(loop, None)
+        else:
+            RateBudget._budgets[loop]                   = budget
+
+    def current():
+        '''
+        :return: the budget installed in the running event loop, or None if there is none
+        :rtype: RateBudget
+        '''
+        return RateBudget._budgets.get(asyncio.get_running_loop())
+
+    async def spend():
+        '''
+        Waits until the budget of the running event loop, if any, allows one more call, and spends it.
+        '''
+        budget                                          = RateBudget.current()
+        if not budget is None:
+            await budget.acquire()
+
+    def is_remote(argv):
+        '''
+        :param list[str] argv: a GIT command. Example: ["git", "-c", "x=y", "push", "origin", "master"]
+        :return: True if the command talks to a remote, so that it must be paced by the budget
+        :rtype: bool
+        '''
+        skip                                            = False
+        for arg in argv[1:]:
+            if skip:
+                skip                                    = False
+            elif arg in RateBudget._OPTIONS_WITH_VALUE:
+                skip                                    = True
+            elif not arg.startswith("-"):
+                return arg in RateBudget.REMOTE_COMMANDS
+        return False
+
+    async def acquire(self):
+        '''
+        Waits until the budget allows one more call, and spends it. Callers are served in the order they ask, since
+        the event loop resumes sleepers in order of their deadlines.
+        '''
+        self.calls                                      += 1
+        self._refill()
+        self.tokens                                     -= 1
+        if self.tokens >= 0:
+            return
+        # Spend the token now, so that later callers queue behind this one, and wait until it is earned
+        wait_s                                          = -self.tokens / self.rate_per_s
+        self.waited_s                                   += wait_s
+        await asyncio.sleep(wait_s)
+
+    def _refill(self):
+        now                                             = time.monotonic()
+        self.tokens                                     = min(self.burst, self.tokens + (now - self.last_refill) * self.rate_per_s)
+        self.last_refill                                = now
@@ -0,0 +1,253 @@
+import array                                                        as _array
+import bisect                                                       as _bisect
+import heapq                                                        as _heapq
+import mmap                                                         as _mmap
+import os                                                           as _os
+import threading                                                    as _threading
+
+
+class _PackedRefsTable():
+
+    '''
+    Sorted name -> hash table over a memory-mapped ``packed-refs`` file.
+
+    Only the offsets of the ref lines are kept, in a compact array, sorted by ref name. Names and hashes are sliced
+    out of the memory map when needed, so that lookups, prefix queries and listings never build a Python list with
+    all the refs of the repo.
+
+    Each ref line in ``packed-refs`` looks like "<40 hex digits> <ref name>\\n", possibly followed by a line
+    "^<40 hex digits>\\n" with the commit an annotated tag points to.
+    '''
+    HASH_LENGTH                                         = 40
+
+    def __init__(self, path, stat):
+        self.path                                       = path
+        self.signature                                  = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+        self._mmap                                      = None
+        self.offsets                                    = _array.array("Q")
+
+        if stat.st_size == 0:
+            return
+
+        with open(path, "rb") as file:
+            self._mmap                                  = _mmap.mmap(file.fileno(), 0, access=_mmap.ACCESS_READ)
+
+        data                                            = self._mmap
+        is_sorted                                       = False
+        position                                        = 0
+        size                                            = len(data)
+        while position < size:
+            end                                         = data.find(b"\n", position)
+            if end == -1:
+                end                                     = size
+            first                                       = data[position]
+            if first == ord("#"):
+                # Header, like "# pack-refs with: peeled fully-peeled sorted"
+                is_sorted                               = b" sorted" in data[position: end]
+            elif first != ord("^"):
+                self.offsets.append(position)
+            position                                    = end + 1
+
+        if not is_sorted:
+            # Older versions of GIT did not guarantee the order, so sort once. It is the only time names get
+            # materialized.
+            self.offsets                                = _array.array("Q", sorted(self.offsets, key=self.name_at))
+
+    def close(self):
+        if not self._mmap is None:
+            self._mmap.close()
+            self._mmap                                  = None
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def name_at(self, offset):
+        '''
+        :return: the (full) ref name in the line starting at ``offset``
+        :rtype: bytes
+        '''
+        start                                           = offset + self.HASH_LENGTH + 1
+        end                                             = self._mmap.find(b"\n", start)
+        return self._mmap[start: end if end != -1 else len(self._mmap)]
+
+    def hash_at(self, offset):
+        '''
+        :return: the hash in the line starting at ``offset``
+        :rtype: str
+        '''
+        return self._mmap[offset: offset + self.HASH_LENGTH].decode()
+
+    def _bisect(self, name):
+        return _bisect.bisect_left(self.offsets, name, key=self.name_at)
+
+    def get(self, name):
+        '''
+        :param bytes name: a full ref name
+        :return: the hash of the ref, or None if it is not packed
+        :rtype: str
+        '''
+        idx                                             = self._bisect(name)
+        if idx < len(self.offsets) and self.name_at(self.offsets[idx]) == name:
+            return self.hash_at(self.offsets[idx])
+        return None
+
+    def iter_prefix(self, prefix):
+        '''
+        :param bytes prefix: start of the ref names wanted
+        :return: (name, hash) pairs for the packed refs whose name starts with ``prefix``, sorted by name
+        '''
+        idx                                             = self._bisect(prefix)
+        while idx < len(self.offsets):
+            offset                                      = self.offsets[idx]
+            name                                        = self.name_at(offset)
+            if not name.startswith(prefix):
+                return
+            yield name, offset
+            idx                                         += 1
+
+
+class RefIndex():
+
+    '''
+    Fast lookup of the refs of a repo, for repos with thousands of refs (e.g., stale feature branches).
+
+    Packed refs are served from a sorted table over the memory-mapped ``packed-refs`` file (see
+    :class:`_PackedRefsTable`), which is only rebuilt when the file changes. Loose refs, which GIT writes as
+    individual files until they are packed, take precedence over packed refs and are read from the file system
+    on each query, restricted to the folders the query needs.
+
+    Use :meth:`for_git_dir` to share indices across all users of the same repo in the process.
+
+    :param str common_dir: the GIT directory holding the repo's shared refs (``.git`` in a regular repo)
+    '''
+    def __init__(self, common_dir):
+        self.common_dir                                 = common_dir
+        self._table                                     = None
+        self._lock                                      = _threading.Lock()
+
+    _indices_dict                                       = {}
+    _indices_lock                                       = _threading.Lock()
+
+    def for_git_dir(common_dir):
+        '''
+        :return: the index shared by all callers for the repo whose GIT directory is ``common_dir``
+        :rtype: RefIndex
+        '''
+        with RefIndex._indices_lock:
+            if not common_dir in RefIndex._indices_dict:
+                RefIndex._indices_dict[common_dir]      = RefIndex(common_dir)
+            return RefIndex._indices_dict[common_dir]
+
+    def _packed(self):
+        '''
+        :return: the table of packed refs, rebuilding it if ``packed-refs`` changed since it was built, or None if
+            there are no packed refs.
+        :rtype: _PackedRefsTable
+        '''
+        path                                            = self.common_dir + "/packed-refs"
+        try:
+            stat                                        = _os.stat(path)
+        except FileNotFoundError:
+            return None
+
+        with self._lock:
+            table                                       = self._table
+            if table is None or table.signature != (stat.st_ino, stat.st_size, stat.st_mtime_ns):
+                # GOTCHA:
+                #   Don't close the previous table's memory map, since another thread may still be reading from it.
+                #   It is released when no longer referenced.
+                #
+                table                                   = _PackedRefsTable(path, stat)
+                self._table                             = table
+            return table
+
+    def _read_loose(self, path):
+        try:
+            with open(path) as file:
+                return file.read().strip()
+        except (FileNotFoundError, IsADirectoryError, NotADirectoryError):
+            return None
+
+    def get(self, ref_name):
+        '''
+        :param str ref_name: a full ref name. Example: "refs/heads/story_1455"
+        :return: the content of the ref (a hash, or "ref: <other ref>" for symbolic refs), or None if it does not exist
+        :rtype: str
+        '''
+        loose                                           = self._read_loose(self.common_dir + "/" + ref_name)
+        if not loose is None:
+            return loose
+        table                                           = self._packed()
+        return None if table is None else table.get(ref_name.encode())
+
+    def contains(self, ref_name):
+        '''
+        :param str ref_name: a full ref name. Example: "refs/heads/story_1455"
+        :return: True if the ref exists
+        :rtype: bool
+        '''
+        if _os.path.isfile(self.common_dir + "/" + ref_name):
+            return True
+        table                                           = self._packed()
+        return not table is None and not table.get(ref_name.encode()) is None
+
+    def iter_prefix(self, prefix):
+        '''
+        :param str prefix: start of the full ref names wanted. Examples: "refs/heads/", "refs/heads/story_"
+        :return: (full ref name, content) pairs for all refs whose name starts with ``prefix``, loose and packed,
+            sorted by name. The content is a hash, or "ref: <other ref>" for symbolic refs.
+        '''
+        loose_l                                         = sorted(self._loose_with_prefix(prefix))
+
+        table                                           = self._packed()
+        if table is None:
+            yield from loose_l
+            return
+
+        loose_names                                     = {name for name, _ in loose_l}
+        packed_iter                                     = ((name.decode(), table.hash_at(offset))
+                                                            for name, offset in table.iter_prefix(prefix.encode()))
+        packed_iter                                     = ((name, sha) for name, sha in packed_iter
+                                                            if not name in loose_names) # Loose refs take precedence
+        yield from _heapq.merge(loose_l, packed_iter)
+
+    def names(self, folder, name_start=""):
+        '''
+        :param str folder: the folder of the refs wanted, with a trailing "/". Example: "refs/heads/"
+        :param str name_start: optional start of the names wanted, relative to ``folder``. Example: "story_"
+        :return: the names of matching refs, relative to ``folder`` (so "refs/heads/feature/story_1455" is returned
+            as "feature/story_1455" for the folder "refs/heads/")
+        '''
+        for name, _ in self.iter_prefix(folder + name_start):
+            yield name[len(folder):]
+
+    def count(self, prefix):
+        '''
+        :return: the number of refs whose name starts with ``prefix``
+        :rtype: int
+        '''
+        return sum(1 for _ in self.iter_prefix(prefix))
+
+    def _loose_with_prefix(self, prefix):
+        '''
+        :return: (name, content) for the loose refs whose name starts with ``prefix``, only walking the folder that
+            can contain them
+        '''
+        folder, _, name_start                           = prefix.rpartition("/")
+        root                                            = self.common_dir + "/" + folder
+        if not _os.path.isdir(root):
+            return
+        for dir_path, dir_names_l, file_names_l in _os.walk(root):
+            relative_dir                                = _os.path.relpath(dir_path, root).replace(_os.sep, "/")
+            relative_dir                                = "" if relative_dir == "." else relative_dir + "/"
+            if relative_dir == "":
+                # Only descend into sub-folders that can hold matching refs
+                dir_names_l[:]                          = [d for d in dir_names_l if d.startswith(name_start)]
+            for file_name in file_names_l:
+                if file_name.endswith(".lock"):
+                    continue # Left by a GIT process updating the ref (or that crashed doing so), so not a ref
+                relative_name                           = relative_dir + file_name
+                if relative_name.startswith(name_start):
+                    content                             = self._read_loose(dir_path + "/" + file_name)
+                    if not content is None:
+                        yield folder + "/" + relative_name, content
@@ -0,0 +1,118 @@
+import asyncio
+import contextlib                                                   as _contextlib
+import os                                                           as _os
+import shutil                                                       as _shutil
+
+from limon_ops.util.git_local_client                                import GitLocalClient
+from limon_ops.util.git_object_reader                               import GitObjectReader
+
+
+class WorktreePool():
+
+    '''
+    Keeps one managed ``git worktree`` per repo, under a common folder, so that merges and other branch operations
+    can run without switching the branch checked out in the user's working tree.
+
+    Worktrees are always in detached HEAD state, so they never "own" a branch: GIT does not stop the user (or
+    other worktrees) from checking out any branch. Results are published by moving branch refs from the worktree's
+    HEAD.
+
+    Worktrees are created on first use and reused afterwards, which is cheap: checking out a commit in an existing
+    worktree only rewrites the files that differ. When there are more than ``max_worktrees`` of them, the least
+    recently used are removed. The time of last use is the modification time of the worktree's folder.
+
+    Example::
+
+        pool = WorktreePool(local_root + "/.limon_worktrees")
+        async with pool.worktree(repo_path) as worktree_path:
+            ...
+
+    :param str pool_root: folder under which the worktrees are created, one sub-folder per repo
+    :param int max_worktrees: maximum number of worktrees kept in ``pool_root``
+    '''
+    def __init__(self, pool_root, max_worktrees=16):
+        self.pool_root                                  = pool_root
+        self.max_worktrees                              = max_worktrees
+        self._locks_dict                                = {}
+
+    FOLDER_NAME                                         = ".limon_worktrees"
+
+    def for_local_root(local_root, max_worktrees=16):
+        '''
+        :return: a pool whose worktrees are under the folder ``.limon_worktrees`` of ``local_root``
+        :rtype: WorktreePool
+        '''
+        return WorktreePool(local_root + "/" + WorktreePool.FOLDER_NAME, max_worktrees=max_worktrees)
+
+    @_contextlib.asynccontextmanager
+    async def worktree(self, repo_path):
+        '''
+        Async context manager that provides the managed worktree for the repo at ``repo_path``, creating it if
+        needed. While the context is open, no other user of this pool gets the same worktree.
+
+        :return: the location of the worktree in the file system
+        :rtype: str
+        '''
+        worktree_path                                   = self.pool_root + "/" + _os.path.basename(str(repo_path))
+        lock                                            = self._locks_dict.setdefault(worktree_path, asyncio.Lock())
+        async with lock:
+            if not self._is_valid(worktree_path):
+                await self._create(repo_path, worktree_path)
+                await self.prune()
+            _os.utime(worktree_path) # Mark as recently used
+            yield worktree_path
+
+    def _is_valid(self, worktree_path):
+        '''
+        :return: True if ``worktree_path`` is a worktree that GIT still knows about
+        :rtype: bool
+        '''
+        dot_git                                         = worktree_path + "/.git"
+        if not _os.path.isfile(dot_git):
+            return False
+        with open(dot_git) as file:
+            content                                     = file.read().strip()
+        git_dir                                         = content[len("gitdir:"):].strip()
+        return content.startswith("gitdir:") and _os.path.isdir(_os.path.join(worktree_path, git_dir))
+
+    async def _create(self, repo_path, worktree_path):
+        executor                                        = GitLocalClient(repo_path)
+        if _os.path.exists(worktree_path):
+            # Left over by a worktree whose metadata GIT already pruned
+            _shutil.rmtree(worktree_path)
+        await executor.execute_argv(["git", "worktree", "prune"])
+        _os.makedirs(self.pool_root, exist_ok=True)
+        await executor.execute_argv(["git", "worktree", "add", "--detach", worktree_path, "HEAD"])
+
+    async def prune(self):
+        '''
+        Removes the least recently used worktrees in excess of ``max_worktrees``. Worktrees in use are kept.
+        '''
+        if not _os.path.isdir(self.pool_root):
+            return
+        path_l                                          = [self.pool_root + "/" + name for name in _os.listdir(self.pool_root)]
+        path_l                                          = sorted([path for path in path_l if _os.path.isdir(path)],
+                                                                 key=lambda path: _os.stat(path).st_mtime_ns)
+        excess                                          = len(path_l) - self.max_worktrees
+        for worktree_path in path_l:
+            if excess <= 0:
+                break
+            lock                                        = self._locks_dict.get(worktree_path)
+            if not lock is None and lock.locked():
+                continue
+            await self.remove(worktree_path)
+            excess                                      -= 1
+
+    async def remove(self, worktree_path):
+        '''
+        Deletes the worktree at ``worktree_path``, both its folder and GIT's metadata about it.
+        '''
+        if self._is_valid(worktree_path):
+            # Run GIT from the repo the worktree belongs to, rather than from the worktree being removed
+            executor                                    = GitLocalClient(GitObjectReader(worktree_path).common_dir)
+            exit_status, _, _                           = await executor.execute_argv_unchecked(
+                                                                ["git", "worktree", "remove", "--force", worktree_path])
+            if exit_status == 0:
+                return
+        # GIT's metadata for the worktree is cleaned up by "git worktree prune" the next time a worktree is created
+        _shutil.rmtree(worktree_path, ignore_errors=True)
@@ -1,8 +1,27 @@
-from conway.application.application                                 import Application
-from scratch_nb_apps.scratch_nb_application                         import Scratch_NB_Application
+from limon_ops.util.lazy_import                                     import lazy_attributes
 
-# Start the global singleton that represents a (mock) application for the
-# :class:`scratch`
+# Importing the Conway application framework loads configuration and sets up loggers, so nothing is imported
+# or constructed until it is first needed
 #
-if Application._singleton_app is None:
-    Scratch_NB_Application()
+__getattr__                                                         = lazy_attributes(__name__, {
+                                                                        "Scratch_NB_Application":   "scratch_nb_application",
+                                                                        "Scratch_NB_Utils":         "scratch_nb_utils",
+                                                                    })
+
+def ensure_application():
+    '''
+    Starts the global singleton that represents a (mock) application for the :class:`scratch`, unless an
+    application is already running.
+
+    It used to be started as a side effect of importing this package. It is now started on demand, so that
+    importing the package is cheap for callers (such as the CLI) that may never need an application.
+
+    :return: the global application
+    :rtype: :class:`conway.application.application.Application`
+    '''
+    from conway.application.application                             import Application
+    from scratch_nb_apps.scratch_nb_application                     import Scratch_NB_Application
+
+    if Application._singleton_app is None:
+        Scratch_NB_Application()
+    return Application.app()
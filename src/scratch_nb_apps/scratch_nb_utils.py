@@ -4,6 +4,8 @@ from conway.application.application                                 import Appli
 
 from conway_ops.notebook_client.notebook_utils                      import NotebookUtils
 
+from scratch_nb_apps                                                import ensure_application
+
 
 class Scratch_NB_Utils(NotebookUtils):
 
@@ -23,10 +25,32 @@ class Scratch_NB_Utils(NotebookUtils):
             directory                   = _os.path.dirname(directory)
         repo_directory                  = directory
 
+        # The application is no longer started when the package is imported, so start it before the notebook
+        # utilities look for it
+        ensure_application()
+
         super().__init__(project_name="scratch", repo_directory=repo_directory)
 
         self._import_scratch_dependencies()
 
+    def track_progress(self, display=True, refresh_s=0.5):
+        '''
+        Starts following the progress of the limon workflows run from the notebook, like ``RepoSetup.setup`` or the
+        workflows of ``BranchLifecycleManager``. Call ``stop()`` on the result to stop following them.
+
+        :param bool display: if True, the progress is shown below the notebook cell and refreshed as workflows run.
+            Otherwise it can be polled with the result's ``metrics()``
+        :param float refresh_s: seconds between refreshes of the display
+        :return: the tracker that follows the workflows
+        :rtype: :class:`limon_ops.observability.progress_tracker.ProgressTracker`
+        '''
+        from limon_ops.observability.progress_tracker               import ProgressTracker
+
+        tracker                                     = ProgressTracker().start()
+        if display:
+            tracker.display(refresh_s)
+        return tracker
+
     def _import_scratch_dependencies(self):
         '''
         Imports common Scratch modules that are often needed in Scratch notebooks, and remembers them as attributes
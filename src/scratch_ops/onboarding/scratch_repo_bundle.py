@@ -8,12 +8,15 @@ class ScratchRepoBundle(RepoBundle):
     def __init__(self):
         PROJECT_NAME                                    = "scratch"
         super().__init__(PROJECT_NAME)
+        self._repo_info_l                               = None # Computed on first use
 
     def bundled_repos(self):
         '''
         :return: The names of the repos comprising this :class:`RepoBundle`.
         :rtype: List[str]
         '''
-        repo_info_l                                     = super().bundled_repos()
+        if self._repo_info_l is None:
+            self._repo_info_l                           = super().bundled_repos()
 
-        return repo_info_l
+        # Return a copy, so that callers can't change the cached list
+        return list(self._repo_info_l)